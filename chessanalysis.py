@@ -0,0 +1,254 @@
+import json
+import time
+import threading
+import collections
+import chess
+from concurrent.futures import ThreadPoolExecutor, Future
+
+import chessengines
+import chessrecords
+
+def position_key(fen):
+    """
+    Cache key of a FEN: the position without the move counters.
+    """
+    return ' '.join(fen.split()[:4])
+
+def _positions(items):
+    """
+    (index, ply, fen) of every position of items: FENs and Boards give one position
+    (ply None), games (GameRecords or chesslogs.parse_log dicts) one per ply from
+    their initial position (ply 0) up to the first illegal move, if any.
+    """
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            yield index, None, chess.Board(item).fen()
+        elif isinstance(item, chess.Board):
+            yield index, None, item.fen()
+        else:
+            if isinstance(item, chessrecords.GameRecord):
+                init_fen, moves = item.setup.get('init_fen'), item.moves()
+            else:
+                init_fen, moves = item.get('init_fen'), item['moves']
+            board = chess.Board(init_fen) if init_fen else chess.Board()
+            yield index, 0, board.fen()
+            for ply, move in enumerate(moves, 1):
+                try:
+                    board.push_uci(move)
+                except ValueError:
+                    break
+                yield index, ply, board.fen()
+
+class Analyser:
+    """
+    Batch analysis of positions on n_engines persistent UCI engines.
+
+    analyse() fans the positions out over the engines (one thread each, holding its
+    engine for the analyser's lifetime, so its hash carries over between positions)
+    and yields the results in the order the positions were given, as soon as each is
+    ready. Results are cached by position (FEN without move counters) and search
+    limits, and optionally kept in a JSON Lines file across runs; a position given
+    again, even within the same batch, is analysed only once.
+
+    Engines see each position as a bare FEN, without the moves that led to it, so
+    repetitions are not taken into account.
+    """
+    def __init__(self, path=None, n_engines=2, options=None, cache_path=None):
+        """
+        path: str (default: None)
+          Engine binary, by default chessengines.find_stockfish().
+
+        n_engines: int (default: 2)
+          Number of engine processes analysing at once.
+
+        options: dict (default: None)
+          UCI options of the engines, e.g. {'Hash': 64, 'Threads': 1}.
+
+        cache_path: str (default: None)
+          JSON Lines file the results are appended to, and read back from when the
+          analyser starts.
+        """
+        self.path = path or chessengines.find_stockfish()
+        self.n_engines = n_engines
+        # A pool of its own rather than the process-wide one: MultiPV is changed on
+        # its engines
+        self.pool = chessengines.EnginePool(self.path, size=n_engines, options=options)
+        self.executor = ThreadPoolExecutor(max_workers=n_engines)
+        self.local = threading.local()
+        self.engines = []
+        self.lock = threading.Lock()
+
+        self.cache = {}
+        self.cache_path = cache_path
+        if cache_path is not None:
+            try:
+                with open(cache_path) as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError: # torn last line
+                            break
+                        self.cache[entry['fen'], tuple(entry['limits'])] = entry['analysis']
+            except FileNotFoundError:
+                pass
+
+        self.n_analysed = 0
+        self.n_cached = 0
+        self.engine_sec = 0.
+
+    def analyse(self, positions, depth=None, nodes=None, movetime=None, multipv=1, window=None):
+        """
+        Analyse positions and yield the results in order.
+
+        ----------
+        Parameters
+        ----------
+        positions: iterable
+          FENs, Boards, GameRecords or chesslogs.parse_log dicts (every position of a
+          game is analysed); it is consumed lazily.
+
+        depth, nodes, movetime: int (default: None)
+          Search limits (movetime in ms); at least one is needed.
+
+        multipv: int (default: 1)
+          Number of principal variations per position.
+
+        window: int (default: None)
+          Max. positions read ahead of the first result not yet yielded; by default
+          4 * n_engines.
+
+        -------
+        Returns
+        -------
+        results: generator of dict
+          {'index': position of the item in positions, 'ply': ply of the position in
+          its game (None for single positions), 'fen', 'bestmove' (UCI, None if the
+          game is over), 'lines': one parsed UCI info dict per principal variation
+          (see chessengines.parse_info), best first, 'cached': bool}
+        """
+        if depth is None and nodes is None and movetime is None:
+            raise ValueError('analyse needs a depth, nodes or movetime limit')
+
+        limits = (depth, nodes, movetime, multipv)
+        window = window or 4 * self.n_engines
+        pending = collections.deque()
+        in_flight = {}
+        for index, ply, fen in _positions(positions):
+            key = (position_key(fen), limits)
+            with self.lock:
+                analysis = self.cache.get(key)
+            if analysis is not None:
+                future, cached = Future(), True
+                future.set_result(analysis)
+            elif key in in_flight:
+                future, cached = in_flight[key], True
+            else:
+                future, cached = self.executor.submit(self._analyse, fen, key), False
+                in_flight[key] = future
+            pending.append((index, ply, fen, key, future, cached))
+
+            while pending and (len(pending) >= window or pending[0][4].done()):
+                yield self._result(pending.popleft(), in_flight)
+
+        while pending:
+            yield self._result(pending.popleft(), in_flight)
+
+    def _result(self, entry, in_flight):
+        """
+        Result dict of a pending entry, waiting for its analysis.
+        """
+        index, ply, fen, key, future, cached = entry
+        analysis = future.result()
+        if in_flight.get(key) is future:
+            del in_flight[key]
+        if cached:
+            with self.lock:
+                self.n_cached += 1
+
+        return dict(analysis, index=index, ply=ply, fen=fen, cached=cached)
+
+    def _engine(self):
+        """
+        This thread's engine, checked out of the pool on first use.
+        """
+        engine = getattr(self.local, 'engine', None)
+        if engine is None:
+            engine = self.local.engine = self.pool.acquire()
+            engine.options.setdefault('MultiPV', 1)
+            with self.lock:
+                self.engines.append(engine)
+
+        return engine
+
+    def _analyse(self, fen, key):
+        """
+        Search one position on this thread's engine, and cache the result.
+        """
+        depth, nodes, movetime, multipv = key[1]
+        engine = self._engine()
+        start = time.perf_counter()
+        try:
+            if engine.options['MultiPV'] != multipv:
+                engine.send(f'setoption name MultiPV value {multipv}')
+                engine.options['MultiPV'] = multipv
+            bestmove, info_lines = engine.go(f'fen {fen}', movetime=movetime, depth=depth, nodes=nodes)
+        except: # the engine is discarded (a dead or busy engine is not reused)
+            self.local.engine = None
+            with self.lock:
+                self.engines.remove(engine)
+            self.pool.release(engine)
+            raise
+        sec = time.perf_counter() - start
+
+        # The last complete line of each principal variation
+        lines = {}
+        for line in info_lines:
+            if line.startswith('info') and ' pv ' in line:
+                info = chessengines.parse_info(line)
+                if 'lowerbound' not in info and 'upperbound' not in info:
+                    lines[info.get('multipv', 1)] = info
+        analysis = {'bestmove': bestmove if bestmove != '(none)' else None,
+                    'lines': [lines[k] for k in sorted(lines)]}
+
+        with self.lock:
+            self.cache[key] = analysis
+            self.n_analysed += 1
+            self.engine_sec += sec
+            if self.cache_path is not None:
+                with open(self.cache_path, 'a') as f:
+                    f.write(json.dumps({'fen': key[0], 'limits': key[1], 'analysis': analysis}) + '\n')
+
+        return analysis
+
+    def stats(self):
+        """
+        'analysed' (engine searches), 'cached' (results served from the cache),
+        'cache_size' and 'engine_sec' (total search time over all engines).
+        """
+        with self.lock:
+            return {'analysed': self.n_analysed,
+                    'cached': self.n_cached,
+                    'cache_size': len(self.cache),
+                    'engine_sec': self.engine_sec}
+
+    def close(self):
+        """
+        Wait for the searches in flight, then quit the engines.
+        """
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            engines, self.engines = self.engines, []
+        for engine in engines:
+            self.pool.release(engine)
+        self.pool.close()
+
+def analyse(positions, path=None, n_engines=2, options=None, cache_path=None, **limits):
+    """
+    Analyse positions on a new Analyser (arguments as there and in Analyser.analyse)
+    and yield the results in order; the engines are quit at the end.
+    """
+    analyser = Analyser(path, n_engines, options, cache_path)
+    try:
+        yield from analyser.analyse(positions, **limits)
+    finally:
+        analyser.close()
@@ -1,12 +1,497 @@
 import time
+import queue
+import asyncio
+import inspect
+import functools
+import threading
 import chess
 import copy
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from func_timeout import func_timeout, FunctionTimedOut
 
+import chessrecords
+from chessclock import Clock, timed
+from chesssandbox import PlayerProcess
+from chessreferee import Referee, Adjudicator
+
+# Exceptions that stop the harness itself (an interrupt, a cancelled game) rather than
+# count against the player whose call they interrupt
+_HARNESS_ERRORS = (KeyboardInterrupt, asyncio.CancelledError)
+
+class PlayerWorker:
+    """
+    Long-lived thread hosting the calls to a single player.
+    
+    Calls are sent to the thread over a queue and the caller waits for the answer against
+    one monotonic deadline, instead of func_timeout starting (and tearing down) a fresh
+    thread for every call. A call that times out cannot be interrupted: the worker keeps
+    running it, its late answer is discarded, and the next call to that player queues
+    behind it (so the overrun is charged to the player that caused it).
+    """
+    def __init__(self, player):
+        """
+        player: object
+          Player instance whose methods are called from the worker thread.
+        """
+        self.player = player
+        self.commands = queue.SimpleQueue()
+        self.results = queue.SimpleQueue()
+        self.n_calls = 0
+        
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+    
+    def _serve(self):
+        """
+        Worker loop: run commands until a None command is received.
+        """
+        while True:
+            command = self.commands.get()
+            if command is None:
+                return
+            
+            call_id, func, args = command
+            try:
+                self.results.put((call_id, True, func(*args)))
+            except Exception as e:
+                self.results.put((call_id, False, e))
+    
+    def call(self, func, args=(), timeout=None):
+        """
+        Run func(*args) in the worker thread and return its result, raising
+        FunctionTimedOut if it does not answer within timeout seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.n_calls += 1
+        call_id = self.n_calls
+        self.commands.put((call_id, func, args))
+        
+        while True:
+            if deadline is None:
+                remaining = None
+            else:
+                remaining = max(0., deadline - time.monotonic())
+            
+            try:
+                result_id, success, value = self.results.get(timeout=remaining)
+            except queue.Empty:
+                raise FunctionTimedOut('', timeout, func, args)
+            
+            if result_id != call_id: # late answer to a call that already timed out
+                continue
+            if success:
+                return value
+            raise value
+    
+    def close(self):
+        """
+        Ask the worker thread to exit once it is idle.
+        """
+        self.commands.put(None)
+
+def _take_turn(player, move, time_left):
+    """
+    Pass the opponent's last move (if any) to player and return its reply, as the
+    5-tuple (move, ponder_hit, start_ns, received_ns, end_ns) with the perf_counter_ns
+    timestamps, taken in the player's thread, of the start of the turn, the end of
+    receiving the opponent's move and the end of thinking.
+    
+    Players may optionally implement a ponder protocol: start_ponder() is called right
+    after make_move, so the player can think on the opponent's time, and
+    stop_ponder(move) is called with the opponent's reply before receive_move. It
+    returns True on a ponder hit, False on a miss, and None if the player was not
+    pondering. Both calls happen inside the player's own timed turn.
+    """
+    start = time.perf_counter_ns()
+    ponder_hit = None
+    if move is not None:
+        if hasattr(player, 'stop_ponder'):
+            ponder_hit = player.stop_ponder(move)
+        player.receive_move(move, time_left=time_left)
+    received = time.perf_counter_ns()
+    
+    move = player.make_move()
+    if hasattr(player, 'start_ponder'):
+        player.start_ponder()
+    
+    return move, ponder_hit, start, received, time.perf_counter_ns()
+
+def _call(worker, func, args, timeout):
+    """
+    Run func(*args) with a timeout, through the player's worker if there is one and
+    through func_timeout otherwise.
+    """
+    if worker is not None:
+        return worker.call(func, args, timeout)
+    
+    return func_timeout(timeout=timeout, func=func, args=args)
+
+class Side:
+    """
+    State of one side of a game in play: its player, the worker running it, its clock
+    and its ponder statistics.
+    """
+    __slots__ = ('player', 'name', 'color', 'worker', 'clock', 'draw_time', 'trash_talk_time',
+                 'ponders', 'ponder_hits')
+    
+    def __init__(self, player, name, clock=None, draw_time=5, trash_talk_time=1, worker=None):
+        """
+        player: Player
+          The player instance.
+        
+        name: str
+          'white' or 'black'.
+        
+        clock: Clock (default: None)
+          The side's chessclock.Clock; by default one without time limits.
+        
+        draw_time, trash_talk_time: float (default: 5, 1)
+          Time allowed for draw offers/responses and for trash talk, in sec.
+        
+        worker: PlayerWorker (default: None)
+          Worker the player's calls run on; None to use func_timeout.
+        """
+        self.player = player
+        self.name = name
+        self.color = name == 'white'
+        self.worker = worker
+        self.clock = clock if clock is not None else Clock()
+        self.draw_time = draw_time
+        self.trash_talk_time = trash_talk_time
+        self.ponders = 0
+        self.ponder_hits = 0
+    
+    def call(self, func, args, timeout):
+        """
+        Run func(*args) for this side with a timeout.
+        """
+        return _call(self.worker, func, args, timeout)
+    
+    def timed_call(self, phase, func, args, timeout):
+        """
+        Run func(*args) for this side within timeout sec of its own time (plus the
+        harness overhead) and return (result, time in sec), recording the time
+        under phase on the clock.
+        """
+        value, ns = self.call(timed, (func, args), self.clock.deadline(timeout))
+        
+        return value, self.clock.record(phase, ns)
+
+class TurnEngine:
+    """
+    Plays a game as a sequence of identical turns. A turn runs the same pipeline for
+    whichever side is to move: the timed move (with the opponent's last move passed
+    in), draw offer and response, trash talk, and finally the referee's legality and
+    game-over checks. The engine keeps no per-ply state beyond the Side objects and
+    the last move, so variants and other schedulers can override single steps.
+    """
+    def __init__(self, board, sides, game, referee=None, verbose=False, tracer=None, adjudicator=None):
+        """
+        board: Board
+          Board of the game; moves are pushed onto it.
+        
+        sides: list of 2 Side
+          The side to move first, then the other one.
+        
+        game: GameRecord
+          Record the moves and events are logged to.
+        
+        referee: Referee (default: None)
+          Referee of the game; by default a new Referee(board).
+        
+        verbose: bool (default: False)
+          If True, print the board after every move.
+        
+        tracer: Tracer (default: None)
+          If given, receives the timings of every phase of every ply (see
+          chesstrace.Tracer).
+        
+        adjudicator: Adjudicator (default: None)
+          If given, scores every position the game has not ended in and may end the
+          game early (see chessreferee.Adjudicator).
+        """
+        self.board = board
+        self.sides = sides
+        self.game = game
+        self.referee = referee if referee is not None else Referee(board)
+        self.verbose = verbose
+        self.tracer = tracer
+        self.adjudicator = adjudicator
+        self.last_move = None
+        self.last_t = None
+    
+    def play(self):
+        """
+        Play turns until the game is over and return the result string.
+        """
+        sides = self.sides
+        turn = 0
+        while True:
+            game_result = self.play_turn(sides[turn], sides[1 - turn])
+            if game_result is not None:
+                return game_result
+            turn = 1 - turn
+    
+    def play_turn(self, side, opponent):
+        """
+        One turn of side against opponent; returns the result string if the game ends
+        and None otherwise.
+        """
+        if self.tracer is not None:
+            return self._play_traced_turn(side, opponent)
+        
+        game_result = self.move(side, opponent)
+        if game_result is not None:
+            return game_result
+        
+        game_result = self.offer_draw(side, opponent)
+        if game_result is not None:
+            return game_result
+        
+        self.trash_talk(side, opponent)
+        
+        game_result = self.push(side, opponent)
+        if game_result is None and self.adjudicator is not None:
+            game_result = self.adjudicate(side)
+        
+        return game_result
+    
+    def _play_traced_turn(self, side, opponent):
+        """
+        play_turn with every phase reported to the tracer.
+        """
+        tracer = self.tracer
+        name = side.name
+        ply = len(self.game.plies) + 1
+        
+        start = time.perf_counter_ns()
+        game_result = self.move(side, opponent)
+        end = time.perf_counter_ns()
+        tracer.span('move', name, ply, start, end)
+        if game_result is not None:
+            return game_result
+        
+        game_result = self.offer_draw(side, opponent)
+        start = time.perf_counter_ns()
+        tracer.span('draw', name, ply, end, start)
+        if game_result is not None:
+            return game_result
+        
+        self.trash_talk(side, opponent)
+        end = time.perf_counter_ns()
+        tracer.span('talk', name, ply, start, end)
+        
+        game_result = self.push(side, opponent)
+        tracer.span('referee', name, ply, end, time.perf_counter_ns())
+        
+        if game_result is None and self.adjudicator is not None:
+            start = time.perf_counter_ns()
+            game_result = self.adjudicate(side)
+            tracer.span('adjudicate', name, ply, start, time.perf_counter_ns())
+        
+        return game_result
+    
+    def push(self, side, opponent):
+        """
+        Have the referee validate and play side's move; returns the result string if the
+        game ends naturally and None otherwise.
+        """
+        game_result = self.referee.push_uci(self.last_move, side.name, opponent.name)
+        if game_result is None and self.verbose:
+            print(f'{side.name}: {self.last_t} s')
+            print(self.board)
+            print('\n')
+        
+        return game_result
+    
+    def adjudicate(self, side):
+        """
+        Look the position after side's move up in the bitbases, or else score it from the
+        referee engine or side's last_info, and return the adjudicated result string or
+        None.
+        """
+        adjudicator = self.adjudicator
+        game_result = adjudicator.known(self.board)
+        if game_result is not None or not adjudicator.scoring:
+            return game_result
+        
+        if adjudicator.engine is not None:
+            cp = adjudicator.evaluate(self.board)
+        else:
+            cp = adjudicator.info_score(self.last_info(side), side.color)
+        
+        return adjudicator.update(self.board, cp)
+    
+    def last_info(self, side):
+        """
+        The last_info side's player keeps about its last move (see
+        chessbots.SampleStockfish), or None if it has none or fails to answer.
+        """
+        try:
+            if isinstance(side.player, PlayerProcess):
+                return side.call(getattr, (side.player, 'last_info', None), side.draw_time)
+            
+            return getattr(side.player, 'last_info', None)
+        except BaseException as error:
+            return self.call_failed(side, None, error)
+    
+    def move(self, side, opponent):
+        """
+        Ask side for its move within its time; the move is stored in self.last_move.
+        """
+        # Receiving the opponent's move and thinking share the move's deadline, but only
+        # thinking is charged
+        timeout = side.clock.timeout()
+        try:
+            reply = side.call(_take_turn, (side.player, self.last_move, timeout), side.clock.deadline(timeout))
+        except BaseException as error:
+            return self.move_failed(opponent, error)
+        
+        return self.moved(side, reply, timeout)
+    
+    def moved(self, side, reply, timeout):
+        """
+        Book side's reply to the move call (see _take_turn), made with timeout sec on
+        its clock: charge the clock, trace, record the move and pondering, and store the
+        move in self.last_move. Returns None (the referee has yet to check the move).
+        """
+        game = self.game
+        clock = side.clock
+        move, ponder_hit, start, received, end = reply
+        clock.record('receive', received - start)
+        t = clock.record('think', end - received)
+        if self.tracer is not None:
+            self.tracer.span('receive', side.name, len(game.plies) + 1, start, received)
+            self.tracer.span('think', side.name, len(game.plies) + 1, received, end)
+        
+        if timeout is not None: # overruns within the harness overhead are not held against the player
+            t = min(t, timeout)
+        
+        # Log move
+        game.add_move(side.name, move, t)
+        
+        # Log pondering
+        if ponder_hit is not None:
+            side.ponders += 1
+            if ponder_hit:
+                side.ponder_hits += 1
+                game.add_event(side.name, 'ponder hit')
+            else:
+                game.add_event(side.name, 'ponder miss')
+        
+        clock.charge_move(t)
+        self.last_move = move
+        self.last_t = t
+        
+        return None
+    
+    def move_failed(self, opponent, error):
+        """
+        Result string of a move call that raised error: a loss on time (a draw if
+        opponent cannot mate) for FunctionTimedOut, a runtime error otherwise.
+        """
+        if isinstance(error, _HARNESS_ERRORS):
+            raise error
+        
+        if isinstance(error, FunctionTimedOut): # runs out of time
+            if self.board.has_insufficient_material(opponent.color):
+                return 'Draw:timeout with insufficient material'
+            
+            return f'Win {opponent.name}:timeout'
+        
+        return f'Win {opponent.name}:runtime error'
+    
+    def call_failed(self, side, call, error):
+        """
+        Log an optional call of side (e.g. call='draw solicitation') that timed out or
+        raised error, and return None, the answer the game goes on with.
+        """
+        if isinstance(error, _HARNESS_ERRORS):
+            raise error
+        
+        if call is not None:
+            outcome = 'timed out' if isinstance(error, FunctionTimedOut) else 'threw error'
+            self.game.add_event(side.name, f'{call} {outcome}')
+        
+        return None
+    
+    def offer_draw(self, side, opponent):
+        """
+        Let side offer a draw and opponent respond; returns 'Draw:agreement' if it is
+        accepted.
+        """
+        try:
+            offer = side.timed_call('draw', side.player.request_draw, (), side.draw_time)[0]
+        except BaseException as error:
+            offer = self.call_failed(side, 'draw solicitation', error)
+        if not self.draw_offered(side, offer):
+            return None
+        
+        try:
+            answer = opponent.timed_call('draw', opponent.player.respond_draw, (), opponent.draw_time)[0]
+        except BaseException as error:
+            return self.call_failed(opponent, 'draw response', error)
+        
+        return self.draw_answered(opponent, answer)
+    
+    def draw_offered(self, side, offer):
+        """
+        Log side's answer to request_draw; returns True if it offers a draw.
+        """
+        if offer:
+            self.game.add_event(side.name, 'offers draw')
+        
+        return bool(offer)
+    
+    def draw_answered(self, opponent, answer):
+        """
+        Log opponent's answer to a draw offer; returns 'Draw:agreement' if it accepts.
+        """
+        if answer:
+            self.game.add_event(opponent.name, 'accepts draw')
+            return 'Draw:agreement'
+        
+        self.game.add_event(opponent.name, 'declines draw')
+        
+        return None
+    
+    def trash_talk(self, side, opponent):
+        """
+        Solicit trash talk from side and pass it on to opponent.
+        """
+        try:
+            talk = side.timed_call('talk', side.player.solicit_trash_talk, (), side.trash_talk_time)[0]
+        except BaseException as error:
+            talk = self.call_failed(side, 'trash talk solicitation', error)
+        if not self.talked(side, talk):
+            return
+        
+        try:
+            opponent.timed_call('talk', opponent.player.receive_trash_talk, (talk,), opponent.trash_talk_time)
+        except BaseException as error:
+            self.call_failed(opponent, 'trash talk reception', error)
+    
+    def talked(self, side, talk):
+        """
+        Log side's answer to solicit_trash_talk; returns True if there is talk to pass
+        on (even of an invalid type, which is logged as such).
+        """
+        if talk is None:
+            return False
+        
+        if isinstance(talk, str):
+            self.game.add_event(side.name, f'says:{talk}')
+        else:
+            self.game.add_event(side.name, 'trash talk solicitation gave invalid type')
+        
+        return True
+
 def play_game(PlayerWhite, PlayerBlack, max_time_per_move_white=None, max_time_per_move_black=None,
-              time_control_white=None, time_control_black=None, seed=0, board=chess.Board(fen=chess.STARTING_FEN),
-              draw_time_white=5, trash_talk_time_white=1, draw_time_black=5, trash_talk_time_black=1, verbose=False, write=None):
+              time_control_white=None, time_control_black=None, seed=0, board=None,
+              draw_time_white=5, trash_talk_time_white=1, draw_time_black=5, trash_talk_time_black=1, verbose=False, write=None,
+              executor='func_timeout', write_record=None, write_pgn=None, charged_phases=('think',),
+              tracer=None, process_limits=None, adjudication=None):
     """
     Initializes game.
     
@@ -28,16 +513,20 @@ def play_game(PlayerWhite, PlayerBlack, max_time_per_move_white=None, max_time_p
     time_control_white: 2-tuple of floats (default: None)
       The time control for white, formatted as (x, y) where the time control is x
       minutes with a y second increment. This argument is distinct from max_time_per_move_white.
+      A third element 'bronstein' makes the increment a Bronstein delay (see
+      chessclock.Clock); the default is 'fischer'.
     
     time_control_black: 2-tuple of floats (default: None)
       The time control for black, formatted as (x, y) where the time control is x
       minutes with a y second increment. This argument is distinct from max_time_per_move_black.
+      A third element 'bronstein' makes the increment a Bronstein delay.
     
     seed: int (default: 0)
       Random seed used to initialize state.
     
-    board: Board (default: chess.Board())
-      Initial board configuration (the default is just the normal board).
+    board: Board or str (default: None)
+      Initial board configuration, as a Board or a FEN (the default is just the
+      normal board).
     
     draw_time_white: float (default: 5)
       Time in seconds that a player is allowed to take to decide to offer a draw
@@ -58,369 +547,454 @@ def play_game(PlayerWhite, PlayerBlack, max_time_per_move_white=None, max_time_p
     
     write: str (default: None)
       If specified, write the game into a file with the filename specified here.
+    
+    executor: str (default: 'func_timeout')
+      How player calls are timed out. 'func_timeout' runs every call in a new thread;
+      'worker' runs each player in one persistent PlayerWorker thread, which costs
+      much less per ply. 'process' hosts each player in a subprocess of its own
+      (chesssandbox.PlayerProcess), which is killed if it is still running a call
+      that missed its deadline when the game ends.
+    
+    process_limits: dict (default: None)
+      Resource limits of the player processes with executor 'process': 'cpu_time'
+      (CPU sec per player process) and 'memory_mb' (address space in MB).
+    
+    write_record: str (default: None)
+      If specified, stream the game as JSON Lines into this file while it is played
+      (see chessrecords.RecordWriter).
+    
+    write_pgn: str (default: None)
+      If specified, append the game in PGN to this file at the end.
+    
+    charged_phases: tuple of str (default: ('think',))
+      Phases of a turn ('receive', 'think', 'draw', 'talk') whose time is taken off
+      a player's time control. Every phase is measured and stored in game.clocks.
+    
+    tracer: Tracer (default: None)
+      If given, receives the start and end of every phase of every ply, see
+      chesstrace (e.g. chesstrace.ChromeTrace or chesstrace.Histogram). Without a
+      tracer nothing is timestamped beyond what the clocks need.
+    
+    adjudication: dict (default: None)
+      If given, keyword arguments of a chessreferee.Adjudicator that ends decided
+      games early, e.g. {'resign_cp': 600, 'resign_plies': 8, 'draw_cp': 10,
+      'draw_plies': 12, 'draw_after': 40, 'engine': 'stockfish', 'depth': 10}; such
+      games end with 'Win white:adjudication', 'Win black:adjudication' or
+      'Draw:adjudication'. Without an engine, the scores are the players' last_info.
+      {'bitbases': True} ends games in the endgames of chessbitbase at once, with
+      'Win white:bitbase', 'Win black:bitbase' or 'Draw:bitbase'.
+    
+    -------
+    Returns
+    -------
+    game: GameRecord
+      Record of the game; game.result is the result string, formatted as e.g.
+      'Win white:checkmate' or 'Draw:stalemate'.
+    """
+    if executor not in ('worker', 'func_timeout', 'process'):
+        raise ValueError(f'unknown executor: {executor}')
+    
+    if executor == 'process':
+        limits = process_limits or {}
+        PlayerWhite = functools.partial(PlayerProcess, PlayerWhite, **limits)
+        PlayerBlack = functools.partial(PlayerProcess, PlayerBlack, **limits)
+    
+    board, sides, game = _start_game(PlayerWhite, PlayerBlack, max_time_per_move_white, max_time_per_move_black,
+                                     time_control_white, time_control_black, seed, board,
+                                     draw_time_white, trash_talk_time_white, draw_time_black, trash_talk_time_black,
+                                     write_record, charged_phases)
+    # Play the game; workers and players are closed even if the game fails, so that
+    # pooled engines go back to their pool
+    adjudicator = None
+    try:
+        for side in sides:
+            if executor == 'worker':
+                side.worker = PlayerWorker(side.player)
+            elif executor == 'process':
+                side.worker = side.player
+            if side.clock.timeout() is not None:
+                side.clock.calibrate(side.call)
+        
+        if adjudication is not None:
+            adjudicator = Adjudicator(**adjudication)
+            adjudicator.start()
+        game_result = TurnEngine(board, sides, game, verbose=verbose, tracer=tracer, adjudicator=adjudicator).play()
+    finally:
+        if adjudicator is not None:
+            adjudicator.close()
+        
+        for side in sides:
+            if side.worker is not None:
+                side.worker.close()
+        
+        # Let players release resources (e.g. engines) they hold for the game
+        for side in sides:
+            if hasattr(side.player, 'close'):
+                try:
+                    side.player.close()
+                except:
+                    pass
+    
+    _end_game(board, sides, game, game_result, verbose, write, write_pgn, tracer)
+    
+    return game
+
+def _start_game(PlayerWhite, PlayerBlack, max_time_per_move_white, max_time_per_move_black,
+                time_control_white, time_control_black, seed, board,
+                draw_time_white, trash_talk_time_white, draw_time_black, trash_talk_time_black,
+                write_record, charged_phases, side_class=None):
+    """
+    Set up a game for play_game (arguments as there): returns the board, the two
+    sides in turn order (instances of side_class, default Side) and the GameRecord.
     """
+    side_class = side_class or Side
+    
     np.random.seed(seed)
-    board = copy.deepcopy(board)
+    if board is None:
+        board = chess.Board()
+    elif isinstance(board, str):
+        board = chess.Board(fen=board)
+    else:
+        board = copy.deepcopy(board)
     init_fen = board.fen()
     
-    # Sort the players based on which one is going first in this board configuration
     white = PlayerWhite(side='white',
                         board=copy.copy(board),
                         max_time_per_move=max_time_per_move_white,
                         time_control=time_control_white)
-    black = PlayerBlack(side='black',
-                        board=copy.copy(board),
-                        max_time_per_move=max_time_per_move_black,
-                        time_control=time_control_black)
-    
-    if board.turn:
-        players = [white, black]
-        player_names = ['white', 'black']
-        player_bools = [True, False]
-        time_control0 = time_control_white
-        max_time_per_move0 = max_time_per_move_white
-        time_control1 = time_control_black
-        max_time_per_move1 = max_time_per_move_black
-        draw_time0 = draw_time_white
-        draw_time1 = draw_time_black
-        trash_talk_time0 = trash_talk_time_white
-        trash_talk_time1 = trash_talk_time_black
-    else:
-        players = [black, white]
-        player_names = ['black', 'white']
-        player_bools = [False, True]
-        time_control0 = time_control_black
-        max_time_per_move0 = max_time_per_move_black
-        time_control1 = time_control_white
-        max_time_per_move1 = max_time_per_move_white
-        draw_time0 = draw_time_black
-        draw_time1 = draw_time_white
-        trash_talk_time0 = trash_talk_time_black
-        trash_talk_time1 = trash_talk_time_white
-    
-    if time_control0 is not None:
-        total_time0 = 60 * time_control0[0]
-        increment0 = time_control0[1]
-    if time_control1 is not None:
-        total_time1 = 60 * time_control1[0]
-        increment1 = time_control1[1]
-    
-    # Start game
-    player0_times = []
-    player1_times = []
-    
-    first_turn = True
-    
-    move_log = ''
-    
-    while True:
-        ########################################################################
-        # PLAYER 0
-        ########################################################################
-        
-        # Player 0 time control
-        if time_control0 is not None and max_time_per_move0 is not None:
-            timeout0 = np.min([total_time0, max_time_per_move0])
-        elif time_control0 is not None:
-            timeout0 = total_time0
-        elif max_time_per_move0 is not None:
-            timeout0 = max_time_per_move0
-        else:
-            timeout0 = None
-                
-        # Construct player 0 move
-        if first_turn:
-            def turn0():
-                move0 = players[0].make_move()
-                
-                return move0
-            
-            first_turn = False
-        else:
-            if timeout0 is not None:
-                def turn0():
-                    players[0].receive_move(move1, time_left=timeout0)
-                    move0 = players[0].make_move()
-                    
-                    return move0
-                    
-            else:
-                def turn0():
-                    players[0].receive_move(move1, time_left=None)
-                    move0 = players[0].make_move()
-                    
-                    return move0
+    try:
+        black = PlayerBlack(side='black',
+                            board=copy.copy(board),
+                            max_time_per_move=max_time_per_move_black,
+                            time_control=time_control_black)
+    except:
+        # White may already hold resources (e.g. a pooled engine; async players only
+        # acquire theirs in start())
+        if hasattr(white, 'close') and not inspect.iscoroutinefunction(white.close):
+            white.close()
+        raise
+    
+    sides = [side_class(white, 'white', Clock(max_time_per_move_white, time_control_white, charged=charged_phases),
+                        draw_time_white, trash_talk_time_white),
+             side_class(black, 'black', Clock(max_time_per_move_black, time_control_black, charged=charged_phases),
+                        draw_time_black, trash_talk_time_black)]
+    
+    # Sort the players based on which one is going first in this board configuration
+    if not board.turn:
+        sides.reverse()
+    
+    setup = {'white': white.name,
+             'black': black.name,
+             'init_fen': init_fen,
+             'seed': seed,
+             'max_time_per_move_white': max_time_per_move_white,
+             'max_time_per_move_black': max_time_per_move_black,
+             'time_control_white': time_control_white,
+             'time_control_black': time_control_black,
+             'draw_time_white': draw_time_white,
+             'draw_time_black': draw_time_black,
+             'trash_talk_time_white': trash_talk_time_white,
+             'trash_talk_time_black': trash_talk_time_black}
+    writer = chessrecords.RecordWriter(write_record) if write_record is not None else None
+    game = chessrecords.GameRecord(setup, writer=writer)
+    
+    return board, sides, game
+
+def _end_game(board, sides, game, game_result, verbose, write, write_pgn, tracer):
+    """
+    Record the result of a game and write it out (arguments as in play_game).
+    """
+    finish_start = time.perf_counter_ns()
+    game.finish(game_result, clocks={side.name: side.clock.phases() for side in sides})
+    
+    if verbose:
+        print(board)
+        print('\n')
+        print(game_result)
+        for side in sides:
+            if side.ponders > 0:
+                print(f'{side.name} ponder hits: {side.ponder_hits}/{side.ponders}')
         
-        # Attempt to perform player 0 move
-        try:
-            start = time.time()
-            move0 = func_timeout(timeout=timeout0, func=turn0)
-            time0 = time.time() - start
-            
-            if timeout0 is not None: # if python delay finishes up but external code runs over, correct time
-                time0 = np.min([time0, timeout0])
-            
-            # Log move
-            move_log += f'{player_names[0]} t={time0} | move:{move0}\n'
-        except FunctionTimedOut: # runs out of time
-            if board.has_insufficient_material(player_bools[1]):
-                game_result = f'Draw:timeout with insufficient material'
-            else:
-                game_result = f'Win {player_names[1]}:timeout'
-            break
-        except: # another error is thrown
-            game_result = f'Win {player_names[1]}:runtime error'
-            break
-        
-        # Update player 0 time control
-        if time_control0 is not None:
-            total_time0 -= time0
-            total_time0 += increment0
-        
-        # Attempt to offer draw
-        draw_request = False
-        try:
-            if func_timeout(timeout=draw_time0, func=players[0].request_draw):
-                move_log += f'{player_names[0]} | offers draw\n'
-                draw_request = True
-        except FunctionTimedOut:
-            move_log += f'{player_names[0]} | draw solicitation timed out\n'
-        except:
-            move_log += f'{player_names[0]} | draw solicitation threw error\n'
-        
-        if draw_request:
-            try:
-                if func_timeout(timeout=draw_time1, func=players[1].respond_draw):
-                    move_log += f'{player_names[1]} | accepts draw\n'
-                    game_result = 'Draw:agreement'
-                    break
-                else:
-                    move_log += f'{player_names[1]} | declines draw\n'
-            except FunctionTimedOut:
-                move_log += f'{player_names[1]} | draw response timed out\n'
-            except:
-                move_log += f'{player_names[1]} | draw response threw error\n'
-        
-        # Solicit trash talk
-        trash_talk = None
+        print(game.move_log())
+    
+    if write is not None:
+        f = open(write, 'w')
+        f.write(game.to_text(fname=write))
+        f.close()
+    
+    if write_pgn is not None:
+        chessrecords.write_pgn(game, write_pgn)
+    
+    if tracer is not None:
+        tracer.span('finish', None, None, finish_start, time.perf_counter_ns())
+
+class SyncPlayerAdapter:
+    """
+    Async face of a synchronous player for play_game_async: each of its methods becomes
+    a coroutine that runs the original method on a thread of its own. Calls run one
+    at a time in order, so a call abandoned after a timeout delays the next one
+    instead of running concurrently with it (as with PlayerWorker).
+    """
+    def __init__(self, player):
+        """
+        player: object
+          Synchronous player instance.
+        """
+        self.player = player
+        self.name = player.name
+        self.executor = ThreadPoolExecutor(max_workers=1)
+    
+    def __getattr__(self, name):
+        method = getattr(self.player, name)
+        if not callable(method):
+            return method
+        
+        async def call(*args, **kwargs):
+            return await asyncio.get_running_loop().run_in_executor(self.executor,
+                                                                    functools.partial(method, *args, **kwargs))
+        
+        return call
+    
+    async def close(self):
+        """
+        Close the player (if it has a close method) and let its thread exit.
+        """
         try:
-            trash_talk = func_timeout(timeout=trash_talk_time0, func=players[0].solicit_trash_talk)
-            if trash_talk is not None:
-                if isinstance(trash_talk, str):
-                    move_log += f'{player_names[0]} | says:{trash_talk}\n'
-                else:
-                    move_log += f'{player_names[0]} | trash talk solicitation gave invalid type\n'
-        except FunctionTimedOut:
-            move_log += f'{player_names[0]} | trash talk solicitation timed out\n'
-        except:
-            move_log += f'{player_names[0]} | trash talk solicitation threw error\n'
-        
-        if trash_talk is not None:
-            try:
-                func_timeout(timeout=trash_talk_time1, func=players[1].receive_trash_talk, args=(trash_talk,))
-            except FunctionTimedOut:
-                move_log += f'{player_names[1]} | trash talk reception timed out\n'
-            except:
-                move_log += f'{player_names[1]} | trash talk reception threw error\n'
-        
-        # Attempt to push move
-        legality = False
+            if hasattr(self.player, 'close'):
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.player.close)
+        finally:
+            self.executor.shutdown(wait=False)
+
+def is_async_player(player):
+    """
+    True if player implements the async player protocol (make_move is a coroutine
+    function).
+    """
+    return inspect.iscoroutinefunction(getattr(player, 'make_move', None))
+
+async def _take_turn_async(player, move, time_left):
+    """
+    _take_turn for async players.
+    """
+    start = time.perf_counter_ns()
+    ponder_hit = None
+    if move is not None:
+        if hasattr(player, 'stop_ponder'):
+            ponder_hit = await player.stop_ponder(move)
+        await player.receive_move(move, time_left=time_left)
+    received = time.perf_counter_ns()
+    
+    move = await player.make_move()
+    if hasattr(player, 'start_ponder'):
+        await player.start_ponder()
+    
+    return move, ponder_hit, start, received, time.perf_counter_ns()
+
+class AsyncSide(Side):
+    """
+    Side of a game played by play_game_async: calls are coroutines, timed out with
+    asyncio.wait_for (raising FunctionTimedOut like the synchronous executors).
+    """
+    __slots__ = ()
+    
+    async def call(self, func, args, timeout):
+        """
+        Await func(*args) for this side with a timeout.
+        """
         try:
-            legality = board.is_legal(chess.Move.from_uci(move0))
-        except: # invalid move
-            game_result = f'Win {player_names[1]}:invalid move'
-            break
-        
-        if not board.is_legal(chess.Move.from_uci(move0)): # illegal move
-            game_result = f'Win {player_names[1]}:illegal move'
-            break
-        
-        board.push(chess.Move.from_uci(move0))
-        
-        # Check if game ends naturally
-        if board.is_game_over():
-            if board.is_checkmate():
-                game_result = f'Win {player_names[0]}:checkmate'
-            if board.is_stalemate():
-                game_result = f'Draw:stalemate'
-            if board.is_insufficient_material():
-                game_result = f'Draw:insufficient material'
-            if board.can_claim_threefold_repetition():
-                game_result = f'Draw:threefold repetition'
-            if board.can_claim_fifty_moves():
-                game_result = f'Draw:fifty-move rule'
-            
-            break
+            return await asyncio.wait_for(func(*args), timeout)
+        except asyncio.TimeoutError:
+            raise FunctionTimedOut('', timeout, func, args)
+    
+    async def timed_call(self, phase, func, args, timeout):
+        """
+        Side.timed_call for coroutines; the time is measured around the await.
+        """
+        start = time.perf_counter_ns()
+        value = await self.call(func, args, self.clock.deadline(timeout))
         
-        if verbose:
-            print(f'white: {time0} s')
-            print(board)
-            print('\n')
+        return value, self.clock.record(phase, time.perf_counter_ns() - start)
+
+class AsyncTurnEngine(TurnEngine):
+    """
+    TurnEngine whose turns are coroutines, for play_game_async. Only the player calls
+    are awaited here; the pipeline, the bookkeeping of their answers, the events and
+    the result strings are those of TurnEngine.
+    """
+    async def play(self):
+        """
+        Play turns until the game is over and return the result string.
+        """
+        sides = self.sides
+        turn = 0
+        while True:
+            game_result = await self.play_turn(sides[turn], sides[1 - turn])
+            if game_result is not None:
+                return game_result
+            turn = 1 - turn
+    
+    async def play_turn(self, side, opponent):
+        """
+        One turn of side against opponent; returns the result string if the game ends
+        and None otherwise.
+        """
+        tracer = self.tracer
+        ply = len(self.game.plies) + 1
+        start = time.perf_counter_ns()
         
-        ########################################################################
-        # PLAYER 1
-        ########################################################################
-        
-        # Player 1 time control
-        if time_control1 is not None and max_time_per_move1 is not None:
-            timeout1 = np.min([total_time1, max_time_per_move1])
-        elif time_control1 is not None:
-            timeout1 = total_time1
-        elif max_time_per_move1 is not None:
-            timeout1 = max_time_per_move1
-        else:
-            timeout1 = None
-        
-        # Construct player 1 move
-        if timeout1 is not None:
-            def turn1():
-                players[1].receive_move(move0, time_left=timeout1)
-                move1 = players[1].make_move()
-                
-                return move1
-                
-        else:
-            def turn1():
-                players[1].receive_move(move0, time_left=None)
-                move1 = players[1].make_move()
-                
-                return move1
+        game_result = await self.move(side, opponent)
+        if tracer is not None:
+            end = time.perf_counter_ns()
+            tracer.span('move', side.name, ply, start, end)
+        if game_result is not None:
+            return game_result
         
-        # Attempt to perform player 1 move
-        try:
-            start = time.time()
-            move1 = func_timeout(timeout=timeout1, func=turn1)
-            time1 = time.time() - start
-            
-            if timeout1 is not None: # if python delay finishes up but external code runs over, correct time
-                time1 = np.min([time1, timeout1])
-            
-            # Log move
-            move_log += f'{player_names[1]} t={time1} | move:{move1}\n'
-        except FunctionTimedOut: # runs out of time
-            if board.has_insufficient_material(player_bools[0]):
-                game_result = f'Draw:timeout with insufficient material'
-            else:
-                game_result = f'Win {player_names[0]}:timeout'
-            break
-        except: # another error is thrown
-            game_result = f'Win {player_names[0]}:runtime error'
-            break
-        
-        # Update player 1 time control
-        if time_control1 is not None:
-            total_time1 -= time1
-            total_time1 += increment1
-        
-        # Attempt to offer draw
-        draw_request = False
+        game_result = await self.offer_draw(side, opponent)
+        if tracer is not None:
+            start = time.perf_counter_ns()
+            tracer.span('draw', side.name, ply, end, start)
+        if game_result is not None:
+            return game_result
+        
+        await self.trash_talk(side, opponent)
+        if tracer is not None:
+            end = time.perf_counter_ns()
+            tracer.span('talk', side.name, ply, start, end)
+        
+        game_result = self.push(side, opponent)
+        if tracer is not None:
+            start = time.perf_counter_ns()
+            tracer.span('referee', side.name, ply, end, start)
+        
+        if game_result is None and self.adjudicator is not None:
+            game_result = await self.adjudicate(side)
+            if tracer is not None:
+                tracer.span('adjudicate', side.name, ply, start, time.perf_counter_ns())
+        
+        return game_result
+    
+    async def adjudicate(self, side):
+        """
+        TurnEngine.adjudicate; with a referee engine it runs on a thread, so that the
+        search does not block the event loop (the game waits for it, so its board does
+        not change meanwhile).
+        """
+        if self.adjudicator.engine is None:
+            return super().adjudicate(side)
+        
+        return await asyncio.get_running_loop().run_in_executor(None, super().adjudicate, side)
+    
+    async def move(self, side, opponent):
+        """
+        TurnEngine.move with the player's turn awaited.
+        """
+        timeout = side.clock.timeout()
         try:
-            if func_timeout(timeout=draw_time1, func=players[1].request_draw):
-                move_log += f'{player_names[1]} | offers draw\n'
-                draw_request = True
-        except FunctionTimedOut:
-            move_log += f'{player_names[1]} | draw solicitation timed out\n'
-        except Exception as e:
-            print(e)
-            move_log += f'{player_names[1]} | draw solicitation threw error\n'
-        
-        if draw_request:
-            try:
-                if func_timeout(timeout=draw_time0, func=players[0].respond_draw):
-                    move_log += f'{player_names[0]} | accepts draw\n'
-                    game_result = 'Draw:agreement'
-                    break
-                else:
-                    move_log += f'{player_names[0]} | declines draw\n'
-            except FunctionTimedOut:
-                move_log += f'{player_names[0]} | draw response timed out\n'
-            except:
-                move_log += f'{player_names[0]} | draw response threw error\n'
-        
-        # Solicit trash talk
-        trash_talk = None
+            reply = await side.call(_take_turn_async, (side.player, self.last_move, timeout),
+                                    side.clock.deadline(timeout))
+        except BaseException as error:
+            return self.move_failed(opponent, error)
+        
+        return self.moved(side, reply, timeout)
+    
+    async def offer_draw(self, side, opponent):
+        """
+        TurnEngine.offer_draw with the player calls awaited.
+        """
         try:
-            trash_talk = func_timeout(timeout=trash_talk_time1, func=players[1].solicit_trash_talk)
-            if trash_talk is not None:
-                if isinstance(trash_talk, str):
-                    move_log += f'{player_names[1]} | says:{trash_talk}\n'
-                else:
-                    move_log += f'{player_names[1]} | trash talk solicitation gave invalid type\n'
-        except FunctionTimedOut:
-            move_log += f'{player_names[1]} | trash talk solicitation timed out\n'
-        except:
-            move_log += f'{player_names[1]} | trash talk solicitation threw error\n'
-        
-        if trash_talk is not None:
-            try:
-                func_timeout(timeout=trash_talk_time0, func=players[0].receive_trash_talk, args=(trash_talk,))
-            except FunctionTimedOut:
-                move_log += f'{player_names[0]} | trash talk reception timed out\n'
-            except:
-                move_log += f'{player_names[0]} | trash talk reception threw error\n'
-        
-        # Attempt to push move
-        legality = False
+            offer = (await side.timed_call('draw', side.player.request_draw, (), side.draw_time))[0]
+        except BaseException as error:
+            offer = self.call_failed(side, 'draw solicitation', error)
+        if not self.draw_offered(side, offer):
+            return None
+        
         try:
-            legality = board.is_legal(chess.Move.from_uci(move1))
-        except: # invalid move
-            game_result = f'Win {player_names[0]}:invalid move'
-            break
-        
-        if not board.is_legal(chess.Move.from_uci(move1)): # illegal move
-            game_result = f'Win {player_names[0]}:illegal move'
-            break
-        
-        board.push(chess.Move.from_uci(move1))
-        
-        # Check if game ends naturally
-        if board.is_game_over():
-            if board.is_checkmate():
-                game_result = f'Win {player_names[1]}:checkmate'
-            if board.is_stalemate():
-                game_result = f'Draw:stalemate'
-            if board.is_insufficient_material():
-                game_result = f'Draw:insufficient material'
-            if board.can_claim_threefold_repetition():
-                game_result = f'Draw:threefold repetition'
-            if board.can_claim_fifty_moves():
-                game_result = f'Draw:fifty-move rule'
-            
-            break
+            answer = (await opponent.timed_call('draw', opponent.player.respond_draw, (), opponent.draw_time))[0]
+        except BaseException as error:
+            return self.call_failed(opponent, 'draw response', error)
         
-        if verbose:
-            print(f'black: {time1} s')
-            print(board)
-            print('\n')
+        return self.draw_answered(opponent, answer)
     
-    if verbose:
-        print(board)
-        print('\n')
-        print(game_result)
+    async def trash_talk(self, side, opponent):
+        """
+        TurnEngine.trash_talk with the player calls awaited.
+        """
+        try:
+            talk = (await side.timed_call('talk', side.player.solicit_trash_talk, (), side.trash_talk_time))[0]
+        except BaseException as error:
+            talk = self.call_failed(side, 'trash talk solicitation', error)
+        if not self.talked(side, talk):
+            return
         
-        print(move_log)
+        try:
+            await opponent.timed_call('talk', opponent.player.receive_trash_talk, (talk,), opponent.trash_talk_time)
+        except BaseException as error:
+            self.call_failed(opponent, 'trash talk reception', error)
+
+async def play_game_async(PlayerWhite, PlayerBlack, max_time_per_move_white=None, max_time_per_move_black=None,
+                          time_control_white=None, time_control_black=None, seed=0, board=None,
+                          draw_time_white=5, trash_talk_time_white=1, draw_time_black=5, trash_talk_time_black=1,
+                          verbose=False, write=None, write_record=None, write_pgn=None, charged_phases=('think',),
+                          tracer=None, overhead=0.01, adjudication=None):
+    """
+    Coroutine version of play_game, for players that mostly wait on I/O (UCI engines,
+    remote bots): many games can run concurrently on one event loop, e.g. with
+    asyncio.gather or chesstournament.run_async_games.
     
-    if write is not None:
-        text = '--Setup--\n'
-        text += f'fname:{write}\n'
-        text += f'white:{white.name}\n'
-        text += f'black:{black.name}\n'
-        text += f'init_fen:{init_fen}\n'
-        text += f'game_result:{game_result}\n'
-        text += '--Time Control--\n'
-        
-        text += f'max_time_per_move_white:{max_time_per_move_white}\n'
-        text += f'max_time_per_move_black:{max_time_per_move_black}\n'
-        text += f'time_control_white:{time_control_white}\n'
-        text += f'time_control_black:{time_control_black}\n'
-        text += f'draw_time_white:{draw_time_white}\n'
-        text += f'draw_time_black:{draw_time_black}\n'
-        text += f'trash_talk_time_white:{trash_talk_time_white}\n'
-        text += f'trash_talk_time_black:{trash_talk_time_black}\n'
-        text += '--Game--\n'
-        
-        text += move_log
+    Players implement the same methods as for play_game, but as coroutines (async
+    make_move, receive_move, request_draw, respond_draw, solicit_trash_talk,
+    receive_trash_talk, and optionally stop_ponder, start_ponder and close; see
+    chessbots.AsyncStockfish). An optional coroutine start() is awaited before the
+    game, outside the clock, e.g. to launch an engine. Synchronous player classes are
+    wrapped in a SyncPlayerAdapter, which runs their calls on a thread per player.
+    
+    ----------
+    Parameters
+    ----------
+    PlayerWhite, PlayerBlack, ..., tracer, adjudication:
+      As in play_game (there is no executor: every call is awaited with a timeout).
+    
+    overhead: float (default: 0.01)
+      Time in sec added to every deadline for event-loop latency, which grows with
+      the number of concurrent games (play_game calibrates this instead).
+    
+    -------
+    Returns
+    -------
+    game: GameRecord
+      Record of the game; game.result is the result string.
+    """
+    board, sides, game = _start_game(PlayerWhite, PlayerBlack, max_time_per_move_white, max_time_per_move_black,
+                                     time_control_white, time_control_black, seed, board,
+                                     draw_time_white, trash_talk_time_white, draw_time_black, trash_talk_time_black,
+                                     write_record, charged_phases, side_class=AsyncSide)
+    # Play the game; players are closed even if the game is cancelled
+    adjudicator = None
+    try:
+        for side in sides:
+            if not is_async_player(side.player):
+                side.player = SyncPlayerAdapter(side.player)
+            elif hasattr(side.player, 'start'):
+                await side.player.start()
+            side.clock.overhead = overhead
         
-        f = open(write, 'w')
-        f.write(text)
-        f.close()
+        if adjudication is not None:
+            adjudicator = Adjudicator(**adjudication)
+            await adjudicator.start_async()
+        game_result = await AsyncTurnEngine(board, sides, game, verbose=verbose, tracer=tracer,
+                                            adjudicator=adjudicator).play()
+    finally:
+        if adjudicator is not None: # resetting the engine for its pool blocks
+            await asyncio.get_running_loop().run_in_executor(None, adjudicator.close)
+        for side in sides:
+            if hasattr(side.player, 'close'):
+                try:
+                    closed = side.player.close()
+                    if inspect.isawaitable(closed):
+                        await closed
+                except Exception:
+                    pass
+    
+    _end_game(board, sides, game, game_result, verbose, write, write_pgn, tracer)
+    
+    return game
@@ -0,0 +1,1012 @@
+import os
+import time
+import asyncio
+import chess
+import tempfile
+import numpy as np
+from multiprocessing.connection import Client
+
+import chessanalysis
+import chessbattle
+import chessbitbase
+import chessbots
+import chesscluster
+import chessclock
+import chessengines
+import chesslogs
+import chessrating
+import chessopenings
+import chesstournament
+import chesstrace
+import chessreferee
+import chessplayout
+import chessposition
+import chesssearch
+import chessstore
+
+class _CountingMrBean(chessbots.SampleMrBean):
+    """
+    Mr. Bean that counts the plies played by every instance, so that the benchmarks
+    can report per-ply costs.
+    """
+    n_plies = 0
+
+    def make_move(self):
+        _CountingMrBean.n_plies += 1
+
+        return super().make_move()
+
+class _RemoteMrBean(chessbots.SampleMrBean):
+    """
+    Mr. Bean that waits latency seconds per move, like a bot behind a network call.
+    """
+    latency = 0.02
+
+    def make_move(self):
+        time.sleep(self.latency)
+
+        return super().make_move()
+
+class _AsyncRemoteMrBean(chessbots.SampleMrBean):
+    """
+    _RemoteMrBean with the async player protocol.
+    """
+    latency = 0.02
+
+    async def make_move(self):
+        await asyncio.sleep(self.latency)
+
+        return chessbots.SampleMrBean.make_move(self)
+
+    async def receive_move(self, move, time_left=None):
+        chessbots.SampleMrBean.receive_move(self, move, time_left)
+
+    async def request_draw(self):
+        return False
+
+    async def respond_draw(self):
+        return False
+
+    async def receive_trash_talk(self, trash_talk):
+        return
+
+    async def solicit_trash_talk(self):
+        return None
+
+class _RunawayMrBean(chessbots.SampleMrBean):
+    """
+    Mr. Bean whose first move is a long computation in C (no bytecode boundary for
+    func_timeout to interrupt at), like a bot stuck in a native library.
+    """
+    def make_move(self):
+        if len(self.board.move_stack) < 2:
+            sum(range(10 ** 8))
+
+        return super().make_move()
+
+def bench_executor(n_games=20, seed=0, executors=('func_timeout', 'worker')):
+    """
+    Harness overhead per ply of play_game for each executor, measured on Mr. Bean vs.
+    Mr. Bean games (the bot itself costs next to nothing, so almost all of the time
+    is the harness). The same seeds are used for every executor, so the same games
+    are played.
+
+    ----------
+    Parameters
+    ----------
+    n_games: int (default: 20)
+      Number of games played per executor.
+
+    seed: int (default: 0)
+      Seed of the first game; game i uses seed + i.
+
+    executors: tuple of str (default: ('func_timeout', 'worker'))
+      Executors to compare, see play_game.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {executor: {'plies': int, 'sec': float, 'us_per_ply': float}}
+    """
+    stats = {}
+    for executor in executors:
+        _CountingMrBean.n_plies = 0
+        start = time.perf_counter()
+        for game in range(n_games):
+            chessbattle.play_game(_CountingMrBean, _CountingMrBean, seed=seed + game, executor=executor)
+        sec = time.perf_counter() - start
+
+        stats[executor] = {'plies': _CountingMrBean.n_plies,
+                           'sec': sec,
+                           'us_per_ply': 1e6 * sec / _CountingMrBean.n_plies}
+
+    return stats
+
+def bench_engine_pool(n_games=20, path=None):
+    """
+    Engine set-up cost per game with and without an EnginePool: a fresh engine process
+    per player and game, against engines checked out of a pool and reset with
+    ucinewgame.
+
+    ----------
+    Parameters
+    ----------
+    n_games: int (default: 20)
+      Number of (two-player) games to set up.
+
+    path: str (default: None)
+      Engine binary, by default chessengines.find_stockfish().
+
+    -------
+    Returns
+    -------
+    stats: dict
+      'spawn_sec_per_game' and 'pool_sec_per_game' (set-up and tear-down time of the
+      two engines of a game), 'saved_sec_per_game', and the pool's own stats.
+    """
+    if path is None:
+        path = chessengines.find_stockfish()
+
+    start = time.perf_counter()
+    for game in range(n_games):
+        engines = [chessengines.UCIEngine(path), chessengines.UCIEngine(path)]
+        for engine in engines:
+            engine.close()
+    spawn_sec = (time.perf_counter() - start) / n_games
+
+    pool = chessengines.EnginePool(path, size=2)
+    start = time.perf_counter()
+    for game in range(n_games):
+        engines = [pool.acquire(), pool.acquire()]
+        for engine in engines:
+            pool.release(engine)
+    pool_sec = (time.perf_counter() - start) / n_games
+    pool_stats = pool.stats()
+    pool.close()
+
+    return {'spawn_sec_per_game': spawn_sec,
+            'pool_sec_per_game': pool_sec,
+            'saved_sec_per_game': spawn_sec - pool_sec,
+            'pool': pool_stats}
+
+def bench_uci_position(n_plies=60, depth=12, path=None):
+    """
+    Nodes per second and time-to-move of an engine fed the game as 'position startpos
+    moves ...' (incremental, as SampleStockfish does) against a FEN of the current
+    board every move. Both modes search the same game, move by move, to a fixed depth
+    on their own engine, so the only difference is how the position is sent.
+
+    ----------
+    Parameters
+    ----------
+    n_plies: int (default: 60)
+      Length of the game searched.
+
+    depth: int (default: 12)
+      Search depth per move.
+
+    path: str (default: None)
+      Engine binary, by default chessengines.find_stockfish().
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {mode: {'ms_per_move': float, 'nps': float, 'nodes_per_move': float}} for
+      mode in ('fen', 'incremental').
+    """
+    if path is None:
+        path = chessengines.find_stockfish()
+
+    # Game to replay, played by the engine itself
+    engine = chessengines.UCIEngine(path)
+    moves = []
+    board = chess.Board()
+    while len(moves) < n_plies and not board.is_game_over():
+        move, _ = engine.go('startpos moves ' + ' '.join(moves), depth=depth)
+        moves.append(move)
+        board.push(chess.Move.from_uci(move))
+    engine.close()
+
+    stats = {}
+    for mode in ('fen', 'incremental'):
+        engine = chessengines.UCIEngine(path)
+        board = chess.Board()
+        position = 'startpos moves'
+        times, nodes, nps = [], [], []
+        for move in moves:
+            if mode == 'fen':
+                command = f'fen {board.fen()}'
+            else:
+                command = position
+
+            start = time.perf_counter()
+            _, info_lines = engine.go(command, depth=depth)
+            times.append(time.perf_counter() - start)
+
+            info = chessengines.parse_info([line for line in info_lines if ' nps ' in line][-1])
+            nodes.append(info['nodes'])
+            nps.append(info['nps'])
+
+            board.push(chess.Move.from_uci(move))
+            position += f' {move}'
+        engine.close()
+
+        stats[mode] = {'ms_per_move': 1e3 * float(np.mean(times)),
+                       'nps': float(np.mean(nps)),
+                       'nodes_per_move': float(np.mean(nodes))}
+
+    return stats
+
+class _DepthStockfish(chessbots.SampleStockfish):
+    """
+    Stockfish that records the depth reached on each of its moves and its ponder hits.
+    """
+    def make_move(self):
+        move = super().make_move()
+        self.depths.append(self.last_info.get('depth', 0))
+
+        return move
+
+    def stop_ponder(self, move):
+        ponder_hit = super().stop_ponder(move)
+        if ponder_hit is not None:
+            self.ponder_hits.append(ponder_hit)
+
+        return ponder_hit
+
+def bench_ponder(n_games=4, max_time_per_move=0.1, path=None):
+    """
+    Search depth reached per move by a pondering Stockfish and a non-pondering one,
+    playing each other with the same time per move (colors alternate between games).
+
+    ----------
+    Parameters
+    ----------
+    n_games: int (default: 4)
+      Number of games played.
+
+    max_time_per_move: float (default: 0.1)
+      Max. thinking time (in sec) of both players.
+
+    path: str (default: None)
+      Engine binary, by default chessengines.find_stockfish().
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {'ponder': mean depth, 'no_ponder': mean depth, 'ponder_hit_rate': float}
+    """
+    depths = {True: [], False: []}
+    ponder_hits = []
+
+    def make_player(ponder):
+        attributes = {'ponder': ponder, 'depths': depths[ponder], 'ponder_hits': ponder_hits}
+        if path is not None:
+            attributes['path'] = path
+
+        return type('Stockfish', (_DepthStockfish,), attributes)
+
+    Pondering, Plain = make_player(True), make_player(False)
+    for game in range(n_games):
+        if game % 2 == 0:
+            PlayerWhite, PlayerBlack = Pondering, Plain
+        else:
+            PlayerWhite, PlayerBlack = Plain, Pondering
+        chessbattle.play_game(PlayerWhite, PlayerBlack, seed=game, executor='worker',
+                              max_time_per_move_white=max_time_per_move, max_time_per_move_black=max_time_per_move)
+
+    return {'ponder': float(np.mean(depths[True])),
+            'no_ponder': float(np.mean(depths[False])),
+            'ponder_hit_rate': float(np.mean(ponder_hits)) if len(ponder_hits) > 0 else 0.}
+
+def bench_log_index(n_games=100000, n_templates=20, seed=0, n_workers=None):
+    """
+    Build time of a chesslogs index over n_games plain-text logs, parsed by n_workers
+    processes (default: all cores, see chesslogs.build_index), and the time of a query
+    ('all timeouts by player X', plus the move times of that player) on it. The logs
+    are copies of n_templates Mr. Bean games with random player names and results,
+    written to a temporary directory.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      'games', 'moves', 'workers', 'build_sec', 'load_sec', 'query_sec'.
+    """
+    rng = np.random.default_rng(seed)
+    names = [f'Bot{i}' for i in range(10)]
+    results = ['Win white:checkmate', 'Win black:timeout', 'Draw:stalemate', 'Win white:timeout']
+
+    templates = []
+    for game in range(n_templates):
+        record = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed + game)
+        templates.append(record)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for game in range(n_games):
+            record = templates[game % n_templates]
+            record.setup['white'], record.setup['black'] = rng.choice(names, 2, replace=False)
+            record.game_result = results[rng.integers(len(results))]
+            path = os.path.join(directory, f'game{game}.txt')
+            with open(path, 'w') as f:
+                f.write(record.to_text(fname=path))
+            paths.append(path)
+
+        start = time.perf_counter()
+        chesslogs.build_index(paths, os.path.join(directory, 'index'), n_workers=n_workers)
+        build_sec = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = chesslogs.load_index(os.path.join(directory, 'index'))
+        load_sec = time.perf_counter() - start
+
+        start = time.perf_counter()
+        timeouts = index.losses('Bot3', 'timeout')
+        times = index.move_time[index.moves(timeouts, player='Bot3')]
+        query_sec = time.perf_counter() - start
+
+        return {'games': len(index),
+                'moves': len(index.move_time),
+                'workers': n_workers or os.cpu_count() or 1,
+                'timeouts': int(timeouts.sum()),
+                'mean_move_time': float(np.mean(times)),
+                'build_sec': build_sec,
+                'load_sec': load_sec,
+                'query_sec': query_sec}
+
+def bench_clock(n_moves=200, think=0.01, executors=('func_timeout', 'worker')):
+    """
+    Timing error of a move that thinks for exactly think seconds, measured around the
+    harness call (as play_game used to) and inside the player's thread (chessclock),
+    together with the harness overhead chessclock.Clock.calibrate adds to deadlines.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      For each executor, the mean and max error in ms of both measurements and the
+      calibrated overhead in ms.
+    """
+    def spin():
+        end = time.perf_counter() + think
+        while time.perf_counter() < end:
+            pass
+
+    stats = {}
+    for executor in executors:
+        worker = chessbattle.PlayerWorker(None) if executor == 'worker' else None
+        call = chessbattle.Side(None, 'white', worker=worker).call
+        clock = chessclock.Clock(max_time_per_move=1.)
+        clock.calibrate(call)
+
+        outer, inner = [], []
+        for move in range(n_moves):
+            start = time.perf_counter_ns()
+            _, ns = call(chessclock.timed, (spin, ()), 1.)
+            outer.append((time.perf_counter_ns() - start) / 1e9 - think)
+            inner.append(ns / 1e9 - think)
+
+        if worker is not None:
+            worker.close()
+        stats[executor] = {'outer_mean_ms': 1e3 * float(np.mean(outer)),
+                           'outer_max_ms': 1e3 * float(np.max(outer)),
+                           'inner_mean_ms': 1e3 * float(np.mean(inner)),
+                           'inner_max_ms': 1e3 * float(np.max(inner)),
+                           'overhead_ms': 1e3 * clock.overhead}
+
+    return stats
+
+def bench_tracer(n_games=10, seed=0, executor='worker'):
+    """
+    Time per ply of Mr. Bean games without a tracer, with a chesstrace.Histogram and
+    with a chesstrace.ChromeTrace, plus the histogram of the traced games.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      'us_per_ply' ({'none': ..., 'histogram': ..., 'chrome': ...}) and 'histogram'
+      (the Histogram of the traced games).
+    """
+    histogram = chesstrace.Histogram()
+    stats = {'us_per_ply': {}, 'histogram': histogram}
+    for name in ('none', 'histogram', 'chrome'):
+        plies = 0
+        start = time.perf_counter()
+        for game in range(n_games):
+            tracer = {'none': None, 'histogram': histogram, 'chrome': chesstrace.ChromeTrace()}[name]
+            record = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed + game,
+                                           executor=executor, tracer=tracer)
+            plies += len(record.plies)
+        stats['us_per_ply'][name] = 1e6 * (time.perf_counter() - start) / plies
+
+    return stats
+
+def bench_async_games(n_games=50, n_sync_games=2, latency=0.02, seed=0):
+    """
+    Throughput of games between bots that wait latency seconds per move (standing in
+    for remote or engine-bound players): play_game, one game at a time as in each
+    run_tournament worker, against run_async_games with all n_games in flight on one
+    event loop.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      'games_per_hour' for 'sync' and 'async', and 'speedup'.
+    """
+    _RemoteMrBean.latency = _AsyncRemoteMrBean.latency = latency
+
+    start = time.perf_counter()
+    for game in range(n_sync_games):
+        chessbattle.play_game(_RemoteMrBean, _RemoteMrBean, seed=seed + game, executor='worker')
+    sync = 3600 * n_sync_games / (time.perf_counter() - start)
+
+    jobs = [chesstournament.make_job(_AsyncRemoteMrBean, _AsyncRemoteMrBean, seed=seed + game)
+            for game in range(n_games)]
+    start = time.perf_counter()
+    results = chesstournament.run_async_games(jobs, max_concurrent=n_games)
+    concurrent = 3600 * len(results) / (time.perf_counter() - start)
+
+    return {'games_per_hour': {'sync': sync, 'async': concurrent}, 'speedup': concurrent / sync}
+
+def bench_runaway(max_time_per_move=0.1, executors=('func_timeout', 'worker', 'process')):
+    """
+    Wall time until the harness rules on a move stuck in C code for seconds, with a
+    max_time_per_move limit, for each executor.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {executor: {'game_result': str, 'sec': float}}
+    """
+    stats = {}
+    for executor in executors:
+        start = time.perf_counter()
+        record = chessbattle.play_game(_RunawayMrBean, chessbots.SampleMrBean, executor=executor,
+                                       max_time_per_move_white=max_time_per_move)
+        stats[executor] = {'game_result': record.result, 'sec': time.perf_counter() - start}
+
+    return stats
+
+def _legacy_push(board, uci, mover, opponent):
+    """
+    The legality and game-over checks play_game made before chessreferee.
+    """
+    try:
+        board.is_legal(chess.Move.from_uci(uci))
+    except:
+        return f'Win {opponent}:invalid move'
+
+    if not board.is_legal(chess.Move.from_uci(uci)):
+        return f'Win {opponent}:illegal move'
+
+    board.push(chess.Move.from_uci(uci))
+
+    if board.is_game_over():
+        if board.is_checkmate():
+            game_result = f'Win {mover}:checkmate'
+        if board.is_stalemate():
+            game_result = f'Draw:stalemate'
+        if board.is_insufficient_material():
+            game_result = f'Draw:insufficient material'
+        if board.can_claim_threefold_repetition():
+            game_result = f'Draw:threefold repetition'
+        if board.can_claim_fifty_moves():
+            game_result = f'Draw:fifty-move rule'
+
+        return game_result
+
+    return None
+
+def bench_referee(n_games=20, min_plies=300, seed=0):
+    """
+    Cost per ply of play_game's legality and game-over checks, before (parse three
+    times, then is_game_over and the five result scans) and with chessreferee.Referee,
+    on random games of at least min_plies plies. Both must agree on every result.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      'games', 'plies', and 'us_per_ply' for 'legacy' and 'referee'.
+    """
+    rng = np.random.default_rng(seed)
+    games = []
+    while len(games) < n_games:
+        board = chess.Board()
+        moves = []
+        while not board.is_game_over():
+            legal = list(board.legal_moves)
+            move = legal[rng.integers(len(legal))]
+            board.push(move)
+            moves.append(move.uci())
+        if len(moves) >= min_plies:
+            games.append(moves)
+
+    sides = ('white', 'black')
+    results = {}
+    stats = {'games': n_games, 'plies': sum(len(moves) for moves in games)}
+    for name in ('legacy', 'referee'):
+        results[name] = []
+        start = time.perf_counter()
+        for moves in games:
+            board = chess.Board()
+            referee = chessreferee.Referee(board)
+            for ply, move in enumerate(moves):
+                mover, opponent = sides[ply % 2], sides[1 - ply % 2]
+                if name == 'legacy':
+                    game_result = _legacy_push(board, move, mover, opponent)
+                else:
+                    game_result = referee.push_uci(move, mover, opponent)
+                if game_result is not None:
+                    break
+            results[name].append((ply, game_result))
+        stats[name] = {'us_per_ply': 1e6 * (time.perf_counter() - start) / stats['plies']}
+
+    if results['legacy'] != results['referee']:
+        raise RuntimeError('referee disagrees with the legacy checks')
+
+    return stats
+
+def bench_playouts(n_games=4096, n_sync_games=10, seed=0, batch_size=4096):
+    """
+    Random plies per second of Mr. Bean vs. Mr. Bean games played one at a time with
+    play_game, and of chessplayout.random_playouts advancing batch_size games at
+    once.
+
+    ----------
+    Parameters
+    ----------
+    n_games: int (default: 4096)
+      Number of batched random playouts.
+
+    n_sync_games: int (default: 10)
+      Number of games played with play_game.
+
+    seed: int (default: 0)
+      Random seed.
+
+    batch_size: int (default: 4096)
+      Games advanced together by random_playouts.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {'play_game' / 'playouts': {'plies': int, 'sec': float, 'plies_per_sec': float},
+      'speedup': float, 'terminations': dict (of the playouts)}
+    """
+    _CountingMrBean.n_plies = 0
+    start = time.perf_counter()
+    for game in range(n_sync_games):
+        chessbattle.play_game(_CountingMrBean, _CountingMrBean, seed=seed + game)
+    sec = time.perf_counter() - start
+    stats = {'play_game': {'plies': _CountingMrBean.n_plies,
+                           'sec': sec,
+                           'plies_per_sec': _CountingMrBean.n_plies / sec}}
+
+    results = chessplayout.random_playouts(n_games, seed=seed, batch_size=batch_size)
+    stats['playouts'] = {'plies': results['plies'],
+                         'sec': results['sec'],
+                         'plies_per_sec': results['plies_per_sec']}
+    stats['speedup'] = stats['playouts']['plies_per_sec'] / stats['play_game']['plies_per_sec']
+    stats['terminations'] = results['terminations']
+
+    return stats
+
+def _board_perft(board, depth):
+    """
+    Perft with python-chess (push/pop, legal move count at the leaves).
+    """
+    if depth <= 1:
+        return board.legal_moves.count() if depth == 1 else 1
+
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += _board_perft(board, depth - 1)
+        board.pop()
+
+    return nodes
+
+def bench_perft(depth=3, path=None):
+    """
+    Perft speed of chessposition.Position against chess.Board on the positions of
+    Stockfish's tests/perft.sh, searched to depth (capped at the file's depth). Node
+    counts must agree with each other, and with the file at the file's depth.
+
+    ----------
+    Parameters
+    ----------
+    depth: int (default: 3)
+      Perft depth.
+
+    path: str (default: None)
+      perft.sh to read, the one in stockfish-11-win if None.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {fen: {'depth', 'nodes', 'board_nps', 'position_nps', 'speedup'}} and 'total'
+      ({'nodes', 'board_nps', 'position_nps', 'speedup'} over all positions).
+    """
+    stats = {}
+    total_nodes, board_sec, position_sec = 0, 0., 0.
+    for fen, max_depth, expected in chessposition.perft_positions(path):
+        position_depth = min(depth, max_depth)
+        board = chess.Board(fen)
+        start = time.perf_counter()
+        nodes = _board_perft(board, position_depth)
+        board_time = time.perf_counter() - start
+        
+        position = chessposition.Position(board)
+        start = time.perf_counter()
+        position_nodes = position.perft(position_depth)
+        position_time = time.perf_counter() - start
+        
+        if position_nodes != nodes or (position_depth == max_depth and nodes != expected):
+            raise RuntimeError(f'perft mismatch on {fen}: {position_nodes} vs. {nodes}')
+        
+        stats[fen] = {'depth': position_depth,
+                      'nodes': nodes,
+                      'board_nps': nodes / board_time,
+                      'position_nps': nodes / position_time,
+                      'speedup': board_time / position_time}
+        total_nodes += nodes
+        board_sec += board_time
+        position_sec += position_time
+
+    stats['total'] = {'nodes': total_nodes,
+                      'board_nps': total_nodes / board_sec,
+                      'position_nps': total_nodes / position_sec,
+                      'speedup': board_sec / position_sec}
+
+    return stats
+
+def bench_search(sec_per_position=1., path=None):
+    """
+    Depth and speed of chesssearch.Searcher (the search of chessbots.SampleAlphaBeta)
+    in sec_per_position sec on each position of Stockfish's tests/perft.sh.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {fen: {'move', 'depth', 'nodes', 'nps', 'hit_rate'}} and 'mean' ({'depth',
+      'nps', 'hit_rate'}).
+    """
+    stats = {}
+    for fen, depth, nodes in chessposition.perft_positions(path):
+        searcher = chesssearch.Searcher(chessposition.Position(fen))
+        move, info = searcher.search(soft_time=sec_per_position / 2, hard_time=sec_per_position)
+        stats[fen] = {'move': chessposition.move_uci(move),
+                      'depth': info['depth'],
+                      'nodes': info['nodes'],
+                      'nps': info['nps'],
+                      'hit_rate': searcher.table.stats()['hit_rate']}
+
+    stats['mean'] = {key: float(np.mean([stat[key] for stat in stats.values()])) for key in ('depth', 'nps', 'hit_rate')}
+
+    return stats
+
+def bench_adjudication(n_games=4, max_time_per_move=0.1, adjudication=None, seed=0):
+    """
+    Game length and time with and without adjudication, for alpha-beta self-play
+    (chessbots.SampleAlphaBeta, which reports its scores) from random openings.
+
+    ----------
+    Parameters
+    ----------
+    n_games: int (default: 4)
+      Number of games played in each mode.
+
+    max_time_per_move: float (default: 0.1)
+      Max. thinking time (in sec) of both players.
+
+    adjudication: dict (default: None)
+      play_game's adjudication; by default resignation at 400 cp for 6 plies and draws
+      within 20 cp for 12 plies after move 30, from the players' scores.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {'plain', 'adjudicated'}: {'mean_plies', 'sec_per_game', 'results'}
+    """
+    if adjudication is None:
+        adjudication = {'resign_cp': 400, 'resign_plies': 6, 'draw_cp': 20, 'draw_plies': 12, 'draw_after': 30}
+    openings = chessopenings.random_openings(n_games, plies=6, seed=seed)
+
+    stats = {}
+    for mode, rules in (('plain', None), ('adjudicated', adjudication)):
+        plies, results = [], []
+        start = time.perf_counter()
+        for game, fen in enumerate(openings):
+            record = chessbattle.play_game(chessbots.SampleAlphaBeta, chessbots.SampleAlphaBeta, board=fen,
+                                           seed=game, executor='worker', adjudication=rules,
+                                           max_time_per_move_white=max_time_per_move,
+                                           max_time_per_move_black=max_time_per_move)
+            plies.append(len(record.plies))
+            results.append(record.result)
+        stats[mode] = {'mean_plies': float(np.mean(plies)),
+                       'sec_per_game': (time.perf_counter() - start) / n_games,
+                       'results': results}
+
+    return stats
+
+def bench_bitbases(n_probes=100000, seed=0):
+    """
+    Generation time, size and probe speed of the chessbitbase tables.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {'generate_sec', 'bytes', 'us_per_probe'}
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        chessbitbase.generate_all(directory)
+        generate_sec = time.perf_counter() - start
+        n_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+        bitbases = chessbitbase.Bitbases(directory)
+        rng = np.random.default_rng(seed)
+        args = [(piece_type, int(turn), int(a), int(b), int(c))
+                for piece_type, turn, (a, b, c) in zip(rng.choice(list(chessbitbase.ENDGAMES.values()), n_probes),
+                                                      rng.integers(2, size=n_probes),
+                                                      rng.integers(64, size=(n_probes, 3)))]
+        start = time.perf_counter()
+        for arg in args:
+            bitbases.won(*arg)
+        probe_sec = time.perf_counter() - start
+        bitbases.close()
+
+    return {'generate_sec': generate_sec,
+            'bytes': n_bytes,
+            'us_per_probe': 1e6 * probe_sec / n_probes}
+
+def bench_analysis(n_positions=200, depth=10, n_engines=None, seed=0, path=None):
+    """
+    Positions per second analysed one at a time on a single engine, by
+    chessanalysis.Analyser on n_engines engines (default: one per core), and again
+    from its cache. The positions are the plies of Mr. Bean games.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {'serial', 'analyser', 'cached'}: positions per sec
+    """
+    path = path or chessengines.find_stockfish()
+    fens, game = [], 0
+    while len(fens) < n_positions:
+        record = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed + game, executor='worker')
+        board = chess.Board()
+        for move in record.moves():
+            board.push_uci(move)
+            fens.append(board.fen())
+        game += 1
+    fens = fens[:n_positions]
+
+    engine = chessengines.UCIEngine(path)
+    start = time.perf_counter()
+    for fen in fens:
+        engine.go(f'fen {fen}', depth=depth)
+    serial_sec = time.perf_counter() - start
+    engine.close()
+
+    analyser = chessanalysis.Analyser(path, n_engines=n_engines or os.cpu_count())
+    start = time.perf_counter()
+    for result in analyser.analyse(fens, depth=depth):
+        pass
+    analyser_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for result in analyser.analyse(fens, depth=depth):
+        pass
+    cached_sec = time.perf_counter() - start
+    analyser.close()
+
+    return {'serial': n_positions / serial_sec,
+            'analyser': n_positions / analyser_sec,
+            'cached': n_positions / cached_sec}
+
+def bench_cluster(n_games=16, n_workers=None, n_leases=2000):
+    """
+    Games per hour of Mr. Bean games played by chesstournament.run_tournament and by
+    chesscluster.run_distributed with as many local worker agents (default: one per
+    core), and the coordinator's cost per game: the round trips of a lease and its
+    result over localhost.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {'pool', 'cluster'}: games per hour, and 'us_per_lease'
+    """
+    n_workers = n_workers or os.cpu_count()
+    jobs = chesstournament.round_robin([chessbots.SampleMrBean, chessbots.SampleMrBean], games_per_pair=n_games)
+    stats = {}
+    for name, results in (('pool', chesstournament.run_tournament(jobs, n_workers=n_workers)),
+                          ('cluster', chesscluster.run_distributed(jobs, n_local_workers=n_workers))):
+        for result in results:
+            pass
+        stats[name] = result['games_per_hour']
+
+    jobs = [chesstournament.make_job(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed) for seed in range(n_leases)]
+    coordinator = chesscluster.Coordinator(jobs, authkey=b'bench')
+    conn = Client(coordinator.address, authkey=b'bench')
+    conn.send(('hello', 'bench', {}))
+    conn.recv()
+    start = time.perf_counter()
+    for _ in range(n_leases):
+        conn.send(('lease', 'bench'))
+        _, lease_id, index, job = conn.recv()
+        conn.send(('result', 'bench', lease_id, {'index': index}))
+        conn.recv()
+    stats['us_per_lease'] = 1e6 * (time.perf_counter() - start) / n_leases
+    conn.close()
+    coordinator.close()
+
+    return stats
+
+def bench_store(n_games=20000, n_plies=80, n_single=1000, seed=0):
+    """
+    Games per second saved by chessstore.ResultStore committing one game at a time
+    (batch_size=1, on the first n_single games) and in batches, and ms per score_table
+    and timeout_rates query over a store of n_games synthetic games of n_plies plies.
+
+    -------
+    Returns
+    -------
+    stats: dict
+      {'single', 'batched'}: games per sec, {'score_table_ms', 'timeout_rates_ms'}
+    """
+    rng = np.random.default_rng(seed)
+    names = [f'Player{i}' for i in range(8)]
+    endings = ['Win white:checkmate', 'Win black:checkmate', 'Win white:timeout', 'Win black:timeout',
+               'Draw:stalemate', 'Draw:threefold repetition']
+    plies = [{'ply': ply, 'side': 'white' if ply % 2 else 'black', 'move': 'e2e4', 't': 0.01, 'events': []}
+             for ply in range(1, n_plies + 1)]
+    results = [{'index': index, 'white': names[white], 'black': names[black], 'seed': index,
+                'game_result': endings[ending], 'duration': 1., 'init_fen': chess.STARTING_FEN, 'plies': plies}
+               for index, (white, black, ending) in enumerate(zip(rng.integers(8, size=n_games), rng.integers(8, size=n_games),
+                                                                  rng.integers(len(endings), size=n_games)))]
+
+    stats = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, batch_size, n in (('single', 1, n_single), ('batched', 64, n_games)):
+            store = chessstore.ResultStore(os.path.join(directory, f'{name}.db'), batch_size=batch_size)
+            start = time.perf_counter()
+            for result in results[:n]:
+                store.add(result)
+            store.flush()
+            stats[name] = n / (time.perf_counter() - start)
+
+        for query in ('score_table', 'timeout_rates'):
+            start = time.perf_counter()
+            getattr(store, query)()
+            stats[f'{query}_ms'] = 1e3 * (time.perf_counter() - start)
+        store.close()
+
+    return stats
+
+def bench_sprt(elo0=0, elo1=10, alpha=0.05, beta=0.05, draw_ratio=0.5, n_matches=200, seed=0):
+    """
+    Games per decision of the SPRT in chessrating against a fixed-length match with the
+    same error rates, on simulated matches whose true Elo difference is elo0 and elo1
+    (draws occur with probability draw_ratio).
+
+    -------
+    Returns
+    -------
+    stats: dict
+      'fixed_games', and for each true Elo ('elo0', 'elo1') the mean number of games
+      to a decision and the fraction of correct decisions.
+    """
+    rng = np.random.default_rng(seed)
+    n_fixed = chessrating.fixed_games(elo0, elo1, alpha, beta, draw_ratio=draw_ratio)
+    stats = {'fixed_games': n_fixed}
+    for name, elo, expected in (('elo0', elo0, 'H0'), ('elo1', elo1, 'H1')):
+        s = chessrating.score_from_elo(elo)
+        p = [s - draw_ratio / 2, draw_ratio, 1 - s - draw_ratio / 2]
+        games, correct = [], []
+        for match in range(n_matches):
+            match_stats = chessrating.MatchStats()
+            decision = None
+            while decision is None and match_stats.games < 20 * n_fixed:
+                match_stats.add([1, 0.5, 0][rng.choice(3, p=p)])
+                decision = chessrating.sprt_decision(match_stats, elo0, elo1, alpha, beta)
+            games.append(match_stats.games)
+            correct.append(decision == expected)
+        stats[name] = {'mean_games': float(np.mean(games)), 'correct': float(np.mean(correct))}
+
+    return stats
+
+if __name__ == '__main__':
+    for executor, stat in bench_executor().items():
+        print(f"{executor:>14}: {stat['plies']} plies in {stat['sec']:.2f} s, {stat['us_per_ply']:.0f} us/ply")
+    
+    stats = bench_engine_pool()
+    print(f"engine set-up: {1e3 * stats['spawn_sec_per_game']:.1f} ms/game fresh, "
+          f"{1e3 * stats['pool_sec_per_game']:.1f} ms/game pooled, "
+          f"{1e3 * stats['saved_sec_per_game']:.1f} ms/game saved")
+    
+    for mode, stat in bench_uci_position().items():
+        print(f"{mode:>14}: {stat['ms_per_move']:.1f} ms/move, {stat['nps']:.0f} nps, "
+              f"{stat['nodes_per_move']:.0f} nodes/move")
+    
+    stats = bench_ponder()
+    print(f"mean depth: {stats['ponder']:.1f} pondering, {stats['no_ponder']:.1f} not pondering, "
+          f"ponder hit rate {stats['ponder_hit_rate']:.0%}")
+    
+    stats = bench_log_index()
+    print(f"log index: {stats['games']} games / {stats['moves']} moves indexed in {stats['build_sec']:.1f} s "
+          f"on {stats['workers']} cores, "
+          f"loaded in {1e3 * stats['load_sec']:.1f} ms, timeout query in {1e3 * stats['query_sec']:.1f} ms")
+    
+    stats = bench_sprt()
+    print(f"sprt: {stats['elo0']['mean_games']:.0f} games (H0 true), {stats['elo1']['mean_games']:.0f} games "
+          f"(H1 true), vs {stats['fixed_games']} for a fixed-length match")
+    
+    stats = bench_referee()
+    print(f"referee: {stats['legacy']['us_per_ply']:.0f} us/ply legacy, "
+          f"{stats['referee']['us_per_ply']:.0f} us/ply incremental ({stats['plies']} plies)")
+    
+    for executor, stat in bench_clock().items():
+        print(f"{executor:>14}: timing error {stat['outer_mean_ms']:.3f} ms mean / {stat['outer_max_ms']:.3f} ms max "
+              f"around the call, {stat['inner_mean_ms']:.3f} / {stat['inner_max_ms']:.3f} ms in the player's thread, "
+              f"overhead allowance {stat['overhead_ms']:.3f} ms")
+    
+    stats = bench_tracer()
+    us_per_ply = stats['us_per_ply']
+    print(f"tracing: {us_per_ply['none']:.0f} us/ply off, {us_per_ply['histogram']:.0f} us/ply histogram, "
+          f"{us_per_ply['chrome']:.0f} us/ply chrome trace")
+    print(stats['histogram'].format())
+    
+    stats = bench_async_games()
+    print(f"async games: {stats['games_per_hour']['sync']:.0f} games/hour one at a time, "
+          f"{stats['games_per_hour']['async']:.0f} games/hour concurrently ({stats['speedup']:.1f}x)")
+    
+    for executor, stat in bench_runaway().items():
+        print(f"runaway move, {executor:>12}: {stat['game_result']} after {stat['sec']:.2f} s")
+    
+    stats = bench_playouts()
+    print(f"random plies: {stats['play_game']['plies_per_sec']:.0f}/s with play_game, "
+          f"{stats['playouts']['plies_per_sec']:.0f}/s batched ({stats['speedup']:.1f}x)")
+    
+    stats = bench_perft()
+    print(f"perft: {stats['total']['nodes']} nodes, {stats['total']['board_nps']:.0f} nps with chess.Board, "
+          f"{stats['total']['position_nps']:.0f} nps with Position ({stats['total']['speedup']:.1f}x)")
+    
+    stats = bench_search()
+    print(f"alpha-beta search: depth {stats['mean']['depth']:.1f}, {stats['mean']['nps']:.0f} nps, "
+          f"{stats['mean']['hit_rate']:.0%} table hits (mean over the perft positions, 1 s each)")
+    
+    stats = bench_adjudication()
+    print(f"adjudication: {stats['plain']['mean_plies']:.0f} plies and {stats['plain']['sec_per_game']:.1f} s per game "
+          f"without, {stats['adjudicated']['mean_plies']:.0f} plies and {stats['adjudicated']['sec_per_game']:.1f} s with")
+    
+    stats = bench_bitbases()
+    print(f"bitbases: generated in {stats['generate_sec']:.1f} s, {stats['bytes'] // 1024} KB, "
+          f"{stats['us_per_probe']:.2f} us/probe")
+    
+    stats = bench_analysis()
+    print(f"analysis: {stats['serial']:.0f} positions/s serial, {stats['analyser']:.0f} positions/s "
+          f"on the engine pool, {stats['cached']:.0f} positions/s cached")
+    
+    stats = bench_cluster()
+    print(f"cluster: {stats['pool']:.0f} games/hour process pool, {stats['cluster']:.0f} games/hour worker agents, "
+          f"{stats['us_per_lease']:.0f} us/lease")
+    
+    stats = bench_store()
+    print(f"results store: {stats['single']:.0f} games/s one commit each, {stats['batched']:.0f} games/s batched, "
+          f"{stats['score_table_ms']:.1f} ms/score table, {stats['timeout_rates_ms']:.1f} ms/timeout rates")
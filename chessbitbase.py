@@ -0,0 +1,282 @@
+import os
+import mmap
+import tempfile
+import numpy as np
+import chess
+
+from chesslogs import WHITE, BLACK, DRAW, UNKNOWN
+
+BITBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bitbases')
+
+# Endgames of a king and one piece against a lone king, in generation order (pawn
+# promotions look up the queen and rook tables)
+ENDGAMES = {'KQK': chess.QUEEN, 'KRK': chess.ROOK, 'KPK': chess.PAWN}
+
+# Positions per table: strong side to move (1 bit), strong king, weak king and piece
+# square (6 bits each); the strong side plays white, so tables need no color
+N_POSITIONS = 1 << 19
+
+_KING_STEPS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+_DIRECTIONS = {chess.BISHOP: ((-1, -1), (-1, 1), (1, -1), (1, 1)),
+               chess.ROOK: ((-1, 0), (0, -1), (0, 1), (1, 0)),
+               chess.QUEEN: _KING_STEPS}
+
+def index(strong_to_move, strong_king, weak_king, square):
+    """
+    Table index of a position, with the strong side as white.
+    """
+    return strong_to_move << 18 | strong_king << 12 | weak_king << 6 | square
+
+def _distance(a, b):
+    """
+    Chebyshev (king move) distance between squares, elementwise.
+    """
+    return np.maximum(np.abs((a & 7) - (b & 7)), np.abs((a >> 3) - (b >> 3)))
+
+def _step(square, df, dr):
+    """
+    Square (elementwise) one (df, dr) step from square, and whether it is on the board.
+    """
+    file, rank = (square & 7) + df, (square >> 3) + dr
+    on_board = (file >= 0) & (file < 8) & (rank >= 0) & (rank < 8)
+
+    return np.where(on_board, 8 * rank + file, 0), on_board
+
+def _between(piece_type):
+    """
+    64 x 64 uint64 of the squares strictly between two squares on a line of
+    piece_type, and 64 x 64 bool of whether such a line joins them.
+    """
+    between = np.zeros((64, 64), np.uint64)
+    aligned = np.zeros((64, 64), bool)
+    for a in range(64):
+        for df, dr in _DIRECTIONS[piece_type]:
+            file, rank, mask = a & 7, a >> 3, 0
+            while 0 <= file + df < 8 and 0 <= rank + dr < 8:
+                file, rank = file + df, rank + dr
+                b = 8 * rank + file
+                between[a, b] = mask
+                aligned[a, b] = True
+                mask |= 1 << b
+
+    return between, aligned
+
+def _attacks(piece_type, square, target, blocker, lines):
+    """
+    Whether a white piece_type on square attacks target with blocker in the way
+    (elementwise).
+    """
+    if piece_type == chess.PAWN:
+        return ((target >> 3) == (square >> 3) + 1) & (np.abs((target & 7) - (square & 7)) == 1)
+    if piece_type == chess.KNIGHT:
+        df, dr = np.abs((target & 7) - (square & 7)), np.abs((target >> 3) - (square >> 3))
+        return ((df == 1) & (dr == 2)) | ((df == 2) & (dr == 1))
+
+    between, aligned = lines
+    blocked = (between[square, target] >> blocker.astype(np.uint64)) & np.uint64(1)
+
+    return aligned[square, target] & (blocked == 0)
+
+def generate(piece_type, promotions=None):
+    """
+    Retrograde analysis of king and piece_type against king.
+
+    Starting from the checkmates, positions are marked won for the strong side
+    (white) until nothing changes: white to move wins if some move reaches a won
+    position, black to move loses if every move does (capturing the piece draws).
+    Pawn promotions look up the queen and rook tables in promotions.
+
+    ----------
+    Parameters
+    ----------
+    piece_type: int
+      chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK or chess.QUEEN.
+
+    promotions: dict (default: None)
+      {chess.QUEEN: table, chess.ROOK: table} of earlier generate() results, needed
+      for chess.PAWN.
+
+    -------
+    Returns
+    -------
+    table: array of bool
+      Won for white, by index(); illegal positions are False.
+    """
+    rest = np.arange(1 << 18)
+    wk, bk, sq = rest >> 12, (rest >> 6) & 63, rest & 63
+    lines = _between(piece_type) if piece_type in _DIRECTIONS else None
+
+    valid = (wk != bk) & (wk != sq) & (bk != sq) & (_distance(wk, bk) > 1)
+    if piece_type == chess.PAWN:
+        valid &= (sq >= 8) & (sq < 56)
+    in_check = _attacks(piece_type, sq, bk, wk, lines)
+    valid_white = valid & ~in_check # black may not be in check with white to move
+
+    # White's moves: (successor index into the black-to-move half, legal), or for
+    # promotions (won, legal)
+    white_moves, promotion_wins = [], np.zeros(1 << 18, bool)
+    for df, dr in _KING_STEPS:
+        to, on_board = _step(wk, df, dr)
+        white_moves.append((to << 12 | bk << 6 | sq, on_board & (to != sq) & (_distance(to, bk) > 1)))
+    if piece_type == chess.PAWN:
+        push = sq + 8
+        free = (push != wk) & (push != bk)
+        promote = free & (push >= 56)
+        for promotion in (chess.QUEEN, chess.ROOK):
+            won = promotions[promotion][np.where(promote, wk << 12 | bk << 6 | (push & 63), 0)]
+            promotion_wins |= promote & won
+        white_moves.append((wk << 12 | bk << 6 | (push & 63), free & (push < 56)))
+        double = sq + 16
+        white_moves.append((wk << 12 | bk << 6 | (double & 63),
+                            free & (sq < 16) & (double != wk) & (double != bk)))
+    else:
+        for to in range(64):
+            to = np.full_like(sq, to)
+            if piece_type == chess.KNIGHT:
+                legal = _attacks(piece_type, sq, to, wk, lines)
+            else:
+                legal = _attacks(piece_type, sq, to, wk, lines) & _attacks(piece_type, sq, to, bk, lines)
+            white_moves.append((wk << 12 | bk << 6 | to, legal & (to != wk) & (to != bk)))
+
+    # Black's king moves: (successor index into the white-to-move half, legal,
+    # capture of the piece)
+    black_moves = []
+    for df, dr in _KING_STEPS:
+        to, on_board = _step(bk, df, dr)
+        legal = on_board & (_distance(to, wk) > 1) & ~((to != sq) & _attacks(piece_type, sq, to, wk, lines))
+        black_moves.append((wk << 12 | to << 6 | sq, legal, to == sq))
+    has_moves = np.zeros(1 << 18, bool)
+    for _, legal, _ in black_moves:
+        has_moves |= legal
+
+    # The checkmates, then fixed-point iteration
+    won_black = valid & in_check & ~has_moves
+    won_white = np.zeros(1 << 18, bool)
+    while True:
+        new_white = promotion_wins.copy()
+        for successor, legal in white_moves:
+            new_white |= legal & won_black[successor]
+        new_white &= valid_white
+
+        new_black = valid & has_moves
+        for successor, legal, capture in black_moves:
+            new_black &= ~legal | (~capture & new_white[successor])
+        new_black |= won_black
+
+        if (new_white == won_white).all() and (new_black == won_black).all():
+            break
+        won_white, won_black = new_white, new_black
+
+    return np.concatenate([won_black, won_white])
+
+def generate_all(directory=None):
+    """
+    Generate every table of ENDGAMES into directory (default BITBASE_DIR) as
+    <name>.bb: N_POSITIONS bits, packed big-endian (np.packbits). Files are written
+    to a temporary name and renamed, so processes generating at once do not see
+    partial tables.
+    """
+    directory = directory or BITBASE_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    tables = {}
+    for name, piece_type in ENDGAMES.items():
+        tables[piece_type] = generate(piece_type, tables)
+        fd, path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(np.packbits(tables[piece_type]).tobytes())
+        os.chmod(path, 0o644)
+        os.replace(path, os.path.join(directory, f'{name}.bb'))
+
+class Bitbases:
+    """
+    Win/draw tables of ENDGAMES, memory-mapped read-only so that every process probing
+    them shares the same pages.
+
+    Results ignore the fifty-move rule. Positions with castling rights are not probed.
+    """
+    def __init__(self, directory=None, generate=True):
+        """
+        directory: str (default: None)
+          Directory of the <name>.bb files, by default BITBASE_DIR.
+
+        generate: bool (default: True)
+          Generate the tables first if any is missing (a few seconds).
+        """
+        self.directory = directory or BITBASE_DIR
+        paths = {name: os.path.join(self.directory, f'{name}.bb') for name in ENDGAMES}
+        if generate and not all(os.path.exists(path) for path in paths.values()):
+            generate_all(self.directory)
+
+        self.tables = {}
+        for name, path in paths.items():
+            with open(path, 'rb') as f:
+                self.tables[ENDGAMES[name]] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def won(self, piece_type, strong_to_move, strong_king, weak_king, square):
+        """
+        Whether the side with the piece wins, with squares as seen from that side
+        (white).
+        """
+        i = index(strong_to_move, strong_king, weak_king, square)
+
+        return bool(self.tables[piece_type][i >> 3] >> (7 - (i & 7)) & 1)
+
+    def probe(self, board):
+        """
+        Result of a Board: WHITE or BLACK (the winner) or DRAW, or UNKNOWN if no table
+        covers it.
+        """
+        if chess.popcount(board.occupied) != 3 or board.castling_rights:
+            return UNKNOWN
+
+        square = (board.occupied & ~board.kings).bit_length() - 1
+        piece = board.piece_at(square)
+        if piece.piece_type not in self.tables:
+            return UNKNOWN
+
+        return self._result(piece.piece_type, piece.color, board.turn, board.king(piece.color),
+                            board.king(not piece.color), square)
+
+    def probe_position(self, position):
+        """
+        probe for a chessposition.Position.
+        """
+        occupied = position.occupied_co[0] | position.occupied_co[1]
+        if occupied.bit_count() != 3 or position.castling:
+            return UNKNOWN
+
+        square = (occupied & ~position.pieces[chess.KING]).bit_length() - 1
+        piece_type, color = position.squares[square] & 7, position.squares[square] >> 3
+        if piece_type not in self.tables:
+            return UNKNOWN
+
+        return self._result(piece_type, color, position.turn, position.king(color), position.king(color ^ 1),
+                            square)
+
+    def _result(self, piece_type, color, turn, strong_king, weak_king, square):
+        flip = 0 if color else 56 # black's pieces as white's
+        if self.won(piece_type, int(turn == color), strong_king ^ flip, weak_king ^ flip, square ^ flip):
+            return WHITE if color else BLACK
+
+        return DRAW
+
+    def close(self):
+        """
+        Unmap the tables.
+        """
+        for table in self.tables.values():
+            table.close()
+
+_loaded = {}
+
+def load(directory=None):
+    """
+    This process's Bitbases of directory (default BITBASE_DIR), mapped once and
+    shared by every player and game of the process.
+    """
+    directory = directory or BITBASE_DIR
+    if directory not in _loaded:
+        _loaded[directory] = Bitbases(directory)
+
+    return _loaded[directory]
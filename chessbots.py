@@ -1,13 +1,90 @@
 import time
 import chess
+import threading
 import copy
 import numpy as np
 from func_timeout import func_timeout, FunctionTimedOut
 
+import chessengines
+import chessposition
+import chesssearch
+import chessbitbase
+
+def _time_left(max_time_per_move, time_control):
+    """
+    Time (sec) an engine player may think on its first move: the tighter of
+    max_time_per_move and the time control's base time, or None without limits.
+    """
+    if time_control is not None and max_time_per_move is not None:
+        return min(60 * time_control[0], max_time_per_move)
+    elif time_control is not None:
+        return 60 * time_control[0]
+    
+    return max_time_per_move
+
+def _position_command(board):
+    """
+    UCI position command (without the leading 'position') of board's game: its root
+    plus the moves played from it, to which the player appends every later move.
+    """
+    root = board.root()
+    if root.fen() == chess.STARTING_FEN:
+        position = 'startpos moves'
+    else:
+        position = f'fen {root.fen()} moves'
+    for past_move in board.move_stack:
+        position += f' {past_move.uci()}'
+    
+    return position
+
+def _movetime(time_left):
+    """
+    Engine search time (ms) for a move with time_left sec on the clock.
+    """
+    if time_left is None:
+        # If no time controls, make this 30 s
+        return 30 * 1000
+    
+    return 0.8 * time_left * 1000
+
+def _search_info(info_lines, last_info):
+    """
+    Stats (depth, nodes, nps, score) of the deepest completed iteration among a
+    search's info lines, or last_info if there is none.
+    """
+    for line in reversed(info_lines):
+        if ' pv ' in line:
+            return chessengines.parse_info(line)
+    
+    return last_info
+
 class SampleStockfish:
     """
-    Stockfish player class.
+    Stockfish player class. Engines are checked out of a process-wide EnginePool,
+    so they stay alive (and only get a ucinewgame) between games.
+    
+    The position is sent as the game's root plus its move list ('position startpos
+    moves ...'), extended by one move per ply, so the engine keeps the game history
+    (for repetition detection) and its hash between moves. Set incremental = False
+    to send a FEN of the current board every move instead.
+    
+    The engine binary is the class attribute path or, if None, the fastest one found by
+    chessengines.find_stockfish (native builds of the bundled sources first).
+    
+    With ponder = True the engine keeps searching the expected reply on the opponent's
+    time (UCI 'go ponder'); on a ponder hit it continues that search for its normal
+    move time ('ponderhit'), on a miss it is stopped and searches the actual move.
+    
+    A player waits at most acquire_timeout sec for a free engine of the pool, so that
+    an engine that was never returned fails one game (TimeoutError, which a tournament
+    records as an error) instead of blocking every later one.
     """
+    path = None
+    pool_size = 2
+    acquire_timeout = 60.
+    incremental = True
+    ponder = False
+    
     def __init__(self, side, board, max_time_per_move, time_control):
         """
         Initialize player class to implement Stockfish.
@@ -32,32 +109,41 @@ class SampleStockfish:
         self.max_time_per_move = max_time_per_move
         self.time_control = time_control
         
-        # Manage time control
-        if self.time_control is not None and self.max_time_per_move is not None:
-            self.time_left = np.min([60 * self.time_control[0], self.max_time_per_move])
-        elif self.time_control is not None:
-            self.time_left = 60 * self.time_control[0]
-        elif self.max_time_per_move is not None:
-            self.time_left = self.max_time_per_move
-        else:
-            self.time_left = None
+        self.time_left = _time_left(max_time_per_move, time_control)
+        self.position = _position_command(self.board)
         
-        # Start Stockfish
-        from stockfish import Stockfish
-        self.stockfish = Stockfish('./stockfish-11-win/Windows/stockfish_20011801_x64_modern.exe')
+        # Check out a Stockfish engine
+        path = self.path if self.path is not None else chessengines.find_stockfish()
+        self.pool = chessengines.get_pool(path, size=self.pool_size)
+        self.engine = self.pool.acquire(timeout=self.acquire_timeout)
+        self.last_info = {}
+        self.ponder_move = None
+        self.ponder_hit = False
+        
+        # Held while the engine is in use, so that close() never races a call that the
+        # harness abandoned after a timeout
+        self.engine_lock = threading.Lock()
     
     def make_move(self):
         """
         Method to make a move. Returns the move in UCI.
         """
-        self.stockfish.set_fen_position(self.board.fen())
-        if self.time_left is not None:
-            move = self.stockfish.get_best_move_time(0.8 * self.time_left * 1000)
+        if self.incremental:
+            position = self.position
         else:
-            # If no time controls, make this 30 s
-            move = self.stockfish.get_best_move_time(30 * 1000)
+            position = f'fen {self.board.fen()}'
+        
+        movetime = _movetime(self.time_left)
+        with self.engine_lock:
+            if self.ponder_hit:
+                move, info_lines = self.engine.ponderhit(movetime)
+                self.ponder_hit = False
+            else:
+                move, info_lines = self.engine.go(position, movetime=movetime)
+        self.last_info = _search_info(info_lines, self.last_info)
         
         self.board.push(chess.Move.from_uci(move))
+        self.position += f' {move}'
         
         return move
     
@@ -72,6 +158,7 @@ class SampleStockfish:
           Time remaining, if None, there is no global time control
         """
         self.board.push(chess.Move.from_uci(move))
+        self.position += f' {move}'
         self.time_left = time_left
         
         return
@@ -100,6 +187,168 @@ class SampleStockfish:
         talk, return none.
         """
         return None
+    
+    def start_ponder(self):
+        """
+        Method called after make_move: start thinking on the opponent's time.
+        """
+        with self.engine_lock:
+            if self.ponder and self.engine.last_ponder is not None:
+                self.ponder_move = self.engine.last_ponder
+                self.engine.ponder(f'{self.position} {self.ponder_move}')
+    
+    def stop_ponder(self, move):
+        """
+        Method called with the opponent's move, before receive_move. Returns True on a
+        ponder hit, False on a miss and None if the player was not pondering.
+        
+        move: str
+          Move that opponent made
+        """
+        if self.ponder_move is None:
+            return None
+        
+        with self.engine_lock:
+            self.ponder_hit = (move == self.ponder_move)
+            self.ponder_move = None
+            if not self.ponder_hit:
+                self.engine.stop()
+        
+        return self.ponder_hit
+    
+    def close(self):
+        """
+        Method called once the game is over. Returns the engine to the pool.
+        """
+        if self.engine is None:
+            return
+        
+        pool = self.pool
+        if self.engine_lock.acquire(timeout=1):
+            try:
+                # Stop any search still running (pondering, or a search interrupted by
+                # a timeout); an engine that does not answer is killed and discarded
+                if self.engine.busy:
+                    try:
+                        self.engine.stop(timeout=1)
+                    except (OSError, RuntimeError):
+                        pass
+                self.ponder_move = None
+                self.ponder_hit = False
+                pool.release(self.engine)
+                self.engine = None
+            finally:
+                self.engine_lock.release()
+        else:
+            # Still searching for a call the harness gave up on: kill the engine
+            engine, self.engine = self.engine, None
+            engine.close()
+            pool.release(engine)
+
+class AsyncStockfish:
+    """
+    Stockfish player for play_game_async: the same engine player as SampleStockfish,
+    but every method is a coroutine and the engine is driven over asyncio pipes
+    (chessengines.AsyncUCIEngine), so one event loop can referee many engine games at
+    once without a thread per player. Each player starts its own engine in start(),
+    before the game, and quits it in close().
+    """
+    path = None
+    options = None
+    
+    def __init__(self, side, board, max_time_per_move, time_control):
+        """
+        Initialize player class to implement Stockfish.
+
+        side: str
+          Either 'white' or 'black' for the side that the player is expected to play
+
+        board: Board (default: chess.Board())
+          Initial board configuration (the default is just the normal board).
+
+        max_time_per_move: float (default: None)
+          Max. thinking time (in sec) to be passed to the players.
+        
+        time_control: 2-tuple of floats (default: None)
+          The time control, formatted as (x, y) where the time control is x minutes
+          with a y second increment. This argument is distinct from max_time_per_move.
+        """
+        self.name = 'Stockfish'
+        
+        self.side = side
+        self.board = board
+        self.max_time_per_move = max_time_per_move
+        self.time_control = time_control
+        
+        self.time_left = _time_left(max_time_per_move, time_control)
+        self.position = _position_command(self.board)
+        
+        path = self.path if self.path is not None else chessengines.find_stockfish()
+        self.engine = chessengines.AsyncUCIEngine(path, options=self.options)
+        self.last_info = {}
+    
+    async def start(self):
+        """
+        Method called before the game, outside the clock. Starts the engine.
+        """
+        await self.engine.start()
+    
+    async def make_move(self):
+        """
+        Method to make a move. Returns the move in UCI.
+        """
+        move, info_lines = await self.engine.go(self.position, movetime=_movetime(self.time_left))
+        self.last_info = _search_info(info_lines, self.last_info)
+        
+        self.board.push(chess.Move.from_uci(move))
+        self.position += f' {move}'
+        
+        return move
+    
+    async def receive_move(self, move, time_left=None):
+        """
+        Method to update board with move from the other side.
+        
+        move: str
+          Move that opponent made
+        
+        time_left: float (default: None)
+          Time remaining, if None, there is no global time control
+        """
+        self.board.push(chess.Move.from_uci(move))
+        self.position += f' {move}'
+        self.time_left = time_left
+    
+    async def request_draw(self):
+        """
+        Method to request a draw. Return True if want to request a draw, False if not.
+        """
+        return False
+    
+    async def respond_draw(self):
+        """
+        Method to respond to a draw request. Return True if accept draw, False if not.
+        """
+        return False
+    
+    async def receive_trash_talk(self, trash_talk):
+        """
+        Method to receive trash talk.
+        """
+        return
+    
+    async def solicit_trash_talk(self):
+        """
+        Method to solicit trash talk. Return a string to solicit trash talk. If no trash
+        talk, return none.
+        """
+        return None
+    
+    async def close(self):
+        """
+        Method called once the game is over. Quits the engine.
+        """
+        await self.engine.close()
 
 class SampleMrBean:
     """
@@ -179,6 +428,144 @@ class SampleMrBean:
         """
         return None
 
+class SampleAlphaBeta:
+    """
+    Pure-Python searching player: iterative deepening alpha-beta on a
+    chessposition.Position (see chesssearch.Searcher), with a bounded transposition
+    table kept across moves and killer/history move ordering.
+    
+    The player keeps its own Position instead of a copy of the board, and makes the
+    moves on it. The time for a move comes from the time_left that receive_move gets:
+    with a per-move limit, up to half of it; on a game clock, time_left / moves_to_go
+    plus the increment. The search stops starting new iterations at half of that
+    budget and is abandoned at the full budget. Without any limit, it uses
+    default_time sec.
+    
+    Each move's search statistics (the UCI info keys 'depth', 'nodes', 'nps', 'time',
+    'cp'/'mate' and 'pv') are kept in last_info and appended to infos.
+    
+    Setting shared_table to a file path (in a subclass) opts into a
+    chesssearch.SharedTranspositionTable there, shared by all the games and pool
+    workers whose players use that path, instead of a table of the player's own.
+    Setting use_bitbases to True makes the search probe chessbitbase's endgame tables.
+    """
+    table_size = 2 ** 18
+    shared_table = None
+    use_bitbases = False
+    max_depth = chesssearch.MAX_PLY
+    moves_to_go = 30
+    default_time = 1.
+    
+    def __init__(self, side, board, max_time_per_move, time_control):
+        """
+        Initialize player class to implement an alpha-beta search bot.
+
+        side: str
+          Either 'white' or 'black' for the side that the player is expected to play
+
+        board: Board (default: chess.Board())
+          Initial board configuration (the default is just the normal board).
+
+        max_time_per_move: float (default: None)
+          Max. thinking time (in sec) to be passed to the players.
+        
+        time_control: 2-tuple of floats (default: None)
+          The time control, formatted as (x, y) where the time control is x minutes
+          with a y second increment. This argument is distinct from max_time_per_move.
+        """
+        self.name = 'Alpha-Beta'
+        
+        self.side = side
+        self.max_time_per_move = max_time_per_move
+        self.time_control = time_control
+        self.increment = time_control[1] if time_control is not None else 0
+        
+        # Manage time control
+        if self.time_control is not None and self.max_time_per_move is not None:
+            self.time_left = min(60 * self.time_control[0], self.max_time_per_move)
+        elif self.time_control is not None:
+            self.time_left = 60 * self.time_control[0]
+        else:
+            self.time_left = self.max_time_per_move
+        
+        # Replay the game so far, so that repetitions of earlier positions are seen
+        self.position = chessposition.Position(board.root())
+        for past_move in board.move_stack:
+            self.position.make(chessposition.move_from_uci(past_move.uci()))
+        
+        if self.shared_table is not None:
+            table = chesssearch.shared_table(self.shared_table, self.table_size)
+        else:
+            table = chesssearch.TranspositionTable(self.table_size)
+        bitbases = chessbitbase.load() if self.use_bitbases else None
+        self.searcher = chesssearch.Searcher(self.position, table, bitbases)
+        self.last_info = {}
+        self.infos = []
+    
+    def time_budget(self):
+        """
+        Time in sec to spend on the next move.
+        """
+        if self.time_left is None:
+            return self.default_time
+        elif self.max_time_per_move is not None and self.time_left >= self.max_time_per_move:
+            return 0.5 * self.time_left
+        
+        return min(self.time_left / self.moves_to_go + self.increment, 0.5 * self.time_left)
+    
+    def make_move(self):
+        """
+        Method to make a move. Returns the move in UCI.
+        """
+        budget = self.time_budget()
+        move, info = self.searcher.search(soft_time=budget / 2, hard_time=budget, max_depth=self.max_depth)
+        self.last_info = info
+        self.infos.append(info)
+        
+        self.position.make(move)
+        
+        return chessposition.move_uci(move)
+    
+    def receive_move(self, move, time_left=None):
+        """
+        Method to update board with move from the other side.
+        
+        move: str
+          Move that opponent made
+        
+        time_left: float (default: None)
+          Time remaining, if None, there is no global time control
+        """
+        self.position.make(chessposition.move_from_uci(move))
+        self.time_left = time_left
+        
+        return
+    
+    def request_draw(self):
+        """
+        Method to request a draw. Return True if want to request a draw, False if not.
+        """
+        return False
+    
+    def respond_draw(self):
+        """
+        Method to respond to a draw request. Return True if accept draw, False if not.
+        """
+        return False
+    
+    def receive_trash_talk(self, trash_talk):
+        """
+        Method to receive trash talk.
+        """
+        return
+    
+    def solicit_trash_talk(self):
+        """
+        Method to solicit trash talk. Return a string to solicit trash talk. If no trash
+        talk, return none.
+        """
+        return None
+
 class SampleHuman:
     """
     Human player class. Accepts user input for the moves.
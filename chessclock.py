@@ -0,0 +1,124 @@
+import time
+
+# Phases of a turn the clock keeps track of
+PHASES = ('receive', 'think', 'draw', 'talk')
+
+def timed(func, args=()):
+    """
+    Run func(*args) and return (result, duration in ns). Run inside the player's own
+    thread, so the duration excludes the harness' thread start-up and queueing.
+    """
+    start = time.perf_counter_ns()
+    result = func(*args)
+
+    return result, time.perf_counter_ns() - start
+
+def _noop():
+    return None
+
+class Clock:
+    """
+    Chess clock of one side. It holds the side's time budget per move and per game,
+    applies Fischer or Bronstein increments, and accumulates the time spent in each
+    phase of its turns (receiving the opponent's move, thinking, draw offers and trash
+    talk) as measured with perf_counter_ns.
+
+    Only the phases in charged count against the game clock; by default that is the
+    thinking time, so a player is not billed for e.g. updating its board. The harness
+    overhead measured by calibrate is added to every call's deadline, so scheduling
+    jitter does not turn into lost games at short time controls.
+    """
+    def __init__(self, max_time_per_move=None, time_control=None, charged=('think',)):
+        """
+        max_time_per_move: float (default: None)
+          Max. thinking time per move in sec.
+
+        time_control: tuple (default: None)
+          (x, y) for x minutes with a y second Fischer increment, or (x, y, mode)
+          with mode 'fischer' (y sec added after every move) or 'bronstein' (the time
+          used is given back, up to y sec).
+
+        charged: tuple of str (default: ('think',))
+          Phases taken off the game clock.
+        """
+        self.max_time_per_move = max_time_per_move
+        self.charged = charged
+        self.overhead = 0.
+        self.phase_ns = dict.fromkeys(PHASES, 0)
+
+        if time_control is not None:
+            self.total_time = 60 * time_control[0]
+            self.increment = time_control[1]
+            self.mode = time_control[2] if len(time_control) > 2 else 'fischer'
+            if self.mode not in ('fischer', 'bronstein'):
+                raise ValueError(f'unknown increment mode: {self.mode}')
+        else:
+            self.total_time = None
+            self.increment = 0
+            self.mode = None
+
+    def timeout(self):
+        """
+        Time the side may spend on its next move (None for no limit).
+        """
+        if self.total_time is not None and self.max_time_per_move is not None:
+            return min(self.total_time, self.max_time_per_move)
+        elif self.total_time is not None:
+            return self.total_time
+
+        return self.max_time_per_move
+
+    def deadline(self, timeout):
+        """
+        Harness deadline for a call allowed timeout sec of player time.
+        """
+        if timeout is None:
+            return None
+
+        return timeout + self.overhead
+
+    def calibrate(self, call, n=16, margin=0.002):
+        """
+        Measure the harness overhead as the slowest of n empty calls through call (a
+        function (func, args, timeout) such as Side.call), plus margin sec for
+        scheduling jitter. The result is stored in self.overhead and returned.
+        """
+        samples = []
+        for i in range(n):
+            start = time.perf_counter_ns()
+            call(_noop, (), 1.)
+            samples.append(time.perf_counter_ns() - start)
+        self.overhead = max(samples) / 1e9 + margin
+
+        return self.overhead
+
+    def record(self, phase, ns):
+        """
+        Add ns nanoseconds spent in phase and return them in sec. Charged phases other
+        than thinking are taken off the game clock right away.
+        """
+        self.phase_ns[phase] += ns
+        t = ns / 1e9
+        if phase != 'think' and phase in self.charged and self.total_time is not None:
+            self.total_time -= t
+
+        return t
+
+    def charge_move(self, t):
+        """
+        Take a move's thinking time t off the game clock and apply the increment.
+        """
+        if self.total_time is None or 'think' not in self.charged:
+            return
+
+        self.total_time -= t
+        if self.mode == 'bronstein':
+            self.total_time += min(t, self.increment)
+        else:
+            self.total_time += self.increment
+
+    def phases(self):
+        """
+        Time spent per phase so far, in sec.
+        """
+        return {phase: ns / 1e9 for phase, ns in self.phase_ns.items()}
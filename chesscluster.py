@@ -0,0 +1,377 @@
+import os
+import sys
+import time
+import queue
+import socket
+import threading
+import collections
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+
+import chesstournament
+
+# Environment variable holding the shared secret of a cluster
+AUTHKEY_ENV = 'CHESSCLUSTER_KEY'
+
+def _authkey(authkey):
+    """
+    authkey as bytes, by default from the environment variable AUTHKEY_ENV.
+    """
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_ENV)
+    if authkey is None:
+        raise ValueError(f'no cluster key: pass authkey or set {AUTHKEY_ENV}')
+
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+class Coordinator:
+    """
+    Holds the queue of game jobs and their results for worker agents (run_worker) that
+    connect over TCP, on this host or any other.
+
+    Connections are multiprocessing.connection sockets, authenticated by HMAC with the
+    shared authkey; messages are pickled, so jobs travel with their player classes by
+    reference and workers need the same code importable (player classes defined in a
+    __main__ script only work for workers on this host, started by fork).
+
+    A worker leases one job at a time and heartbeats while it plays. A lease is put
+    back at the front of the queue when its worker disconnects, or when no heartbeat
+    has come for lease_timeout sec (e.g. the host is gone); a job whose lease was lost
+    max_attempts times is given up with an 'Error:lease lost' result. Should a
+    presumed-dead worker report after all, the first result of a job wins.
+    """
+    def __init__(self, jobs, address=('localhost', 0), authkey=None, lease_timeout=30., max_attempts=3,
+                 indices=None):
+        """
+        jobs: list of dict
+          Games to play, as built by chesstournament.make_job, round_robin or gauntlet.
+
+        address: (str, int) (default: ('localhost', 0))
+          Address to listen on; ('0.0.0.0', port) for workers on other hosts. Port 0
+          picks a free port (see self.address).
+
+        authkey: str or bytes (default: None)
+          Shared secret of the cluster, by default the environment variable
+          AUTHKEY_ENV.
+
+        lease_timeout: float (default: 30.)
+          Sec without a heartbeat after which a lease is put back in the queue; workers
+          heartbeat every lease_timeout / 3 sec.
+
+        max_attempts: int (default: 3)
+          Leases lost per job before it is given up.
+
+        indices: list of int (default: None)
+          Indices of the jobs to play, by default all of them.
+        """
+        self.jobs = jobs
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+
+        self.queue = collections.deque(range(len(jobs)) if indices is None else indices)
+        self.n_jobs = len(self.queue)
+        self.leases = {}
+        self.attempts = collections.Counter()
+        self.finished = set()
+        self.results = queue.Queue()
+        self.workers = {}
+        self.n_leases = 0
+        self.n_requeued = 0
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+
+        self.listener = Listener(address, authkey=_authkey(authkey))
+        self.address = self.listener.address
+        threading.Thread(target=self._accept, daemon=True).start()
+        threading.Thread(target=self._reap, daemon=True).start()
+
+    def _accept(self):
+        """
+        Accept worker connections, serving each on a thread of its own.
+        """
+        while not self.closed.is_set():
+            try:
+                conn = self.listener.accept()
+            except multiprocessing.AuthenticationError:
+                continue
+            except OSError: # the listener was closed
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        """
+        Answer one worker's requests until it disconnects; its leases are then put back
+        in the queue.
+        """
+        worker = None
+        try:
+            while True:
+                message = conn.recv()
+                kind, worker = message[0], message[1]
+                if kind == 'hello':
+                    with self.lock:
+                        self.workers[worker] = {'info': message[2], 'games': 0, 'connected': True}
+                    conn.send(('ok', {'heartbeat': self.lease_timeout / 3}))
+                elif kind == 'lease':
+                    conn.send(self._lease(worker))
+                elif kind == 'heartbeat':
+                    expires = time.monotonic() + self.lease_timeout
+                    with self.lock:
+                        for lease_id in message[2]:
+                            if lease_id in self.leases:
+                                self.leases[lease_id]['expires'] = expires
+                    conn.send(('ok',))
+                elif kind == 'result':
+                    self._finish(worker, message[2], message[3])
+                    conn.send(('ok',))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            with self.lock:
+                if worker in self.workers:
+                    self.workers[worker]['connected'] = False
+                lost = [lease_id for lease_id, lease in self.leases.items() if lease['worker'] == worker]
+                for lease_id in lost:
+                    self._requeue(lease_id)
+
+    def _lease(self, worker):
+        """
+        Reply to a lease request: ('job', lease_id, index, job), ('wait', sec) while
+        the remaining jobs are leased out, or ('done',).
+        """
+        with self.lock:
+            if self.queue:
+                index = self.queue.popleft()
+                self.n_leases += 1
+                lease_id = self.n_leases
+                self.leases[lease_id] = {'index': index, 'worker': worker,
+                                         'expires': time.monotonic() + self.lease_timeout}
+                return ('job', lease_id, index, self.jobs[index])
+            if len(self.finished) < self.n_jobs:
+                return ('wait', min(1., self.lease_timeout / 3))
+
+        return ('done',)
+
+    def _finish(self, worker, lease_id, result):
+        """
+        Record the result of a lease (ignored if the job already has one).
+        """
+        with self.lock:
+            self.leases.pop(lease_id, None)
+            if result['index'] in self.finished:
+                return
+            self.finished.add(result['index'])
+            if worker in self.workers:
+                self.workers[worker]['games'] += 1
+        result['worker'] = worker
+        self.results.put(result)
+
+    def _requeue(self, lease_id):
+        """
+        Put a lost lease's job back at the front of the queue, or give it up (called
+        with the lock held).
+        """
+        lease = self.leases.pop(lease_id)
+        index = lease['index']
+        if index in self.finished:
+            return
+
+        self.attempts[index] += 1
+        self.n_requeued += 1
+        if self.attempts[index] < self.max_attempts:
+            self.queue.appendleft(index)
+        else:
+            job = self.jobs[index]
+            self.finished.add(index)
+            self.results.put({'index': index,
+                              'white': job['white'].__name__,
+                              'black': job['black'].__name__,
+                              'seed': job['seed'],
+                              'game_result': f'Error:lease lost {self.attempts[index]} times',
+                              'duration': 0.,
+                              'init_fen': None,
+                              'plies': [],
+                              'worker': lease['worker']})
+
+    def _reap(self):
+        """
+        Put back the leases whose heartbeats stopped.
+        """
+        while not self.closed.wait(self.lease_timeout / 4):
+            now = time.monotonic()
+            with self.lock:
+                for lease_id in [lease_id for lease_id, lease in self.leases.items() if lease['expires'] < now]:
+                    self._requeue(lease_id)
+
+    def results_iter(self):
+        """
+        Yield the results as they come in, until every job has one, with the keys of
+        chesstournament.run_tournament plus 'worker'.
+        """
+        start = time.time()
+        for completed in range(1, self.n_jobs + 1):
+            result = self.results.get()
+            result['completed'] = completed
+            result['games_per_hour'] = 3600 * completed / (time.time() - start)
+            yield result
+
+    def stats(self):
+        """
+        'jobs', 'finished', 'queued', 'leased', 'requeued' (lost leases) and 'workers'
+        ({worker: {'info', 'games', 'connected'}}).
+        """
+        with self.lock:
+            return {'jobs': self.n_jobs,
+                    'finished': len(self.finished),
+                    'queued': len(self.queue),
+                    'leased': len(self.leases),
+                    'requeued': self.n_requeued,
+                    'workers': {worker: dict(state) for worker, state in self.workers.items()}}
+
+    def close(self):
+        """
+        Stop accepting workers; connected ones are told there is nothing left at their
+        next lease request, or see the connection drop.
+        """
+        self.closed.set()
+        self.listener.close()
+
+def run_worker(address, authkey=None, name=None):
+    """
+    Worker agent: lease game jobs from the Coordinator at address and play them one
+    after another (with chesstournament.play_job), heartbeating from a thread, until
+    the coordinator has nothing left or goes away. The agent keeps no state; run one
+    per core, on any number of hosts.
+
+    ----------
+    Parameters
+    ----------
+    address: (str, int)
+      Address of the coordinator.
+
+    authkey: str or bytes (default: None)
+      Shared secret of the cluster, by default the environment variable AUTHKEY_ENV.
+
+    name: str (default: None)
+      Worker name reported to the coordinator, by default host:pid.
+
+    -------
+    Returns
+    -------
+    n_games: int
+      Number of games played and reported.
+    """
+    name = name or f'{socket.gethostname()}:{os.getpid()}'
+    conn = Client(tuple(address), authkey=_authkey(authkey))
+    lock = threading.Lock()
+
+    def request(*message):
+        with lock:
+            conn.send(message)
+            return conn.recv()
+
+    playing = []
+    stop = threading.Event()
+
+    def heartbeat(interval):
+        while not stop.wait(interval):
+            try:
+                request('heartbeat', name, list(playing))
+            except (EOFError, OSError):
+                return
+
+    n_games = 0
+    try:
+        _, settings = request('hello', name, {'host': socket.gethostname(), 'pid': os.getpid(),
+                                              'cores': os.cpu_count()})
+        threading.Thread(target=heartbeat, args=(settings['heartbeat'],), daemon=True).start()
+        while True:
+            reply = request('lease', name)
+            if reply[0] == 'done':
+                break
+            elif reply[0] == 'wait':
+                time.sleep(reply[1])
+                continue
+
+            _, lease_id, index, job = reply
+            playing.append(lease_id)
+            result = chesstournament.play_job(index, job)
+            request('result', name, lease_id, result)
+            playing.remove(lease_id)
+            n_games += 1
+    except (EOFError, OSError): # the coordinator is gone
+        pass
+    finally:
+        stop.set()
+        conn.close()
+
+    return n_games
+
+def run_distributed(jobs, address=('localhost', 0), authkey=None, n_local_workers=0, lease_timeout=30.,
+                    max_attempts=3, store=None, tournament='default'):
+    """
+    Play a list of jobs on a Coordinator, yielding the results as they come in (like
+    chesstournament.run_tournament), e.g.
+
+      for result in run_distributed(jobs, ('0.0.0.0', 7400), authkey='secret', n_local_workers=4):
+          print(result['worker'], result['game_result'])
+
+    while on other hosts `CHESSCLUSTER_KEY=secret python chesscluster.py host:7400 8` adds
+    8 more workers.
+
+    ----------
+    Parameters
+    ----------
+    jobs, address, authkey, lease_timeout, max_attempts:
+      As in Coordinator (without authkey or AUTHKEY_ENV, a random key is used, so
+      that only the local workers can join).
+
+    n_local_workers: int (default: 0)
+      Worker agents to start as processes on this host.
+
+    store, tournament:
+      As in chesstournament.run_tournament: results are saved to store, and only the
+      jobs it has no game (or only an errored one) of yet are played.
+    """
+    if authkey is None and os.environ.get(AUTHKEY_ENV) is None:
+        authkey = os.urandom(16)
+    indices = store.missing(jobs, tournament) if store is not None else None
+    coordinator = Coordinator(jobs, address, authkey, lease_timeout, max_attempts, indices)
+    host, port = coordinator.address
+    local_address = ('localhost' if host in ('0.0.0.0', '') else host, port)
+    processes = [multiprocessing.Process(target=run_worker, args=(local_address, authkey), daemon=True)
+                 for worker in range(n_local_workers)]
+    for process in processes:
+        process.start()
+
+    try:
+        for result in coordinator.results_iter():
+            if store is not None:
+                store.add(result, tournament, jobs[result['index']])
+            yield result
+    finally:
+        coordinator.close()
+        if store is not None:
+            store.flush()
+        for process in processes:
+            process.join(5)
+            if process.is_alive():
+                process.kill()
+
+def start_workers(address, n_workers=None, authkey=None):
+    """
+    Start n_workers (default: one per core) worker agents as processes and wait until
+    they are all done.
+    """
+    processes = [multiprocessing.Process(target=run_worker, args=(address, authkey))
+                 for worker in range(n_workers or os.cpu_count() or 1)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+if __name__ == '__main__':
+    # Worker agents for a remote coordinator: python chesscluster.py host:port [n_workers]
+    host, _, port = sys.argv[1].rpartition(':')
+    start_workers((host, int(port)), int(sys.argv[2]) if len(sys.argv) > 2 else None)
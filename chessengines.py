@@ -0,0 +1,690 @@
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import asyncio
+import shutil
+import platform
+import tempfile
+import threading
+import subprocess
+
+STOCKFISH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stockfish-11-win')
+NATIVE_DIR = os.path.join(STOCKFISH_DIR, 'native')
+MANIFEST = os.path.join(NATIVE_DIR, 'builds.json')
+
+# Bundled Windows binaries and the CPU flags they need, fastest first
+WINDOWS_BINARIES = [('stockfish_20011801_x64_bmi2.exe', {'bmi2', 'popcnt'}),
+                    ('stockfish_20011801_x64_modern.exe', {'popcnt'}),
+                    ('stockfish_20011801_x64.exe', set()),
+                    ('stockfish_20011801_32bit.exe', set())]
+
+class UCIEngine:
+    """
+    Minimal UCI client around one engine subprocess.
+    """
+    def __init__(self, path, options=None):
+        """
+        Start the engine and wait until it is ready.
+
+        path: str
+          Path to the engine binary.
+
+        options: dict (default: None)
+          UCI options to set once at start-up, e.g. {'Hash': 16, 'Threads': 1}.
+        """
+        start = time.perf_counter()
+
+        self.path = path
+        self.options = {} if options is None else dict(options)
+        self.busy = False
+        self.last_ponder = None
+        self.process = subprocess.Popen([path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        universal_newlines=True, bufsize=1)
+
+        self.send('uci')
+        self.read_until('uciok')
+        for name, value in self.options.items():
+            self.send(f'setoption name {name} value {value}')
+        self.isready()
+
+        self.startup_time = time.perf_counter() - start
+
+    def send(self, command):
+        """
+        Send one command line to the engine.
+        """
+        self.process.stdin.write(command + '\n')
+        self.process.stdin.flush()
+
+    def read_line(self):
+        """
+        Read one line of engine output, without the trailing newline.
+        """
+        line = self.process.stdout.readline()
+        if line == '':
+            raise RuntimeError(f'engine {self.path} exited unexpectedly')
+
+        return line.rstrip('\n')
+
+    def read_until(self, prefix):
+        """
+        Read engine output up to and including the first line starting with prefix,
+        and return all the lines read.
+        """
+        lines = []
+        while True:
+            line = self.read_line()
+            lines.append(line)
+            if line.startswith(prefix):
+                return lines
+
+    def isready(self):
+        """
+        Block until the engine has processed every command sent so far.
+        """
+        self.send('isready')
+        self.read_until('readyok')
+
+    def new_game(self):
+        """
+        Reset the engine for a new game (clears its hash and history).
+        """
+        self.send('ucinewgame')
+        self.isready()
+
+    def go(self, position, movetime=None, depth=None, nodes=None):
+        """
+        Search a position and return (bestmove, info lines).
+
+        position: str
+          Position command without the leading 'position', e.g. 'startpos moves e2e4'
+          or 'fen <fen>'.
+
+        movetime: float (default: None)
+          Search time in ms.
+
+        depth: int (default: None)
+          Search depth in plies.
+
+        nodes: int (default: None)
+          Number of nodes to search.
+        """
+        command = 'go'
+        if movetime is not None:
+            command += f' movetime {max(1, int(movetime))}'
+        if depth is not None:
+            command += f' depth {int(depth)}'
+        if nodes is not None:
+            command += f' nodes {int(nodes)}'
+
+        self.busy = True
+        self.send(f'position {position}')
+        self.send(command)
+
+        return self._read_bestmove()
+
+    def _read_bestmove(self):
+        """
+        Read the output of a search up to its bestmove line and return (bestmove,
+        info lines). The expected reply ('bestmove ... ponder <move>') is kept in
+        last_ponder.
+        """
+        lines = self.read_until('bestmove')
+        self.busy = False
+
+        tokens = lines[-1].split()
+        if len(tokens) >= 4 and tokens[2] == 'ponder':
+            self.last_ponder = tokens[3]
+        else:
+            self.last_ponder = None
+
+        return tokens[1], lines[:-1]
+
+    def ponder(self, position):
+        """
+        Start searching a position (usually the game plus the expected reply) in ponder
+        mode. The search runs until ponderhit() or stop() is called.
+        """
+        self.busy = True
+        self.send(f'position {position}')
+        self.send('go ponder infinite')
+
+    def ponderhit(self, movetime):
+        """
+        The expected reply was played: keep the ponder search running for movetime ms
+        more, then stop it and return (bestmove, info lines).
+        """
+        self.send('ponderhit')
+        time.sleep(max(0., movetime) / 1000)
+
+        return self.stop()
+
+    def stop(self, timeout=None):
+        """
+        Stop the current search and return (bestmove, info lines). If the engine has not
+        answered after timeout seconds (e.g. because another thread already consumed its
+        bestmove), it is killed and a RuntimeError is raised.
+        """
+        self.send('stop')
+        if timeout is None:
+            return self._read_bestmove()
+
+        timer = threading.Timer(timeout, self.process.kill)
+        timer.start()
+        try:
+            return self._read_bestmove()
+        finally:
+            timer.cancel()
+
+    def is_alive(self):
+        """
+        True if the engine process is still running.
+        """
+        return self.process.poll() is None
+
+    def close(self):
+        """
+        Quit the engine, killing it if it does not exit promptly.
+        """
+        if self.is_alive():
+            try:
+                self.send('quit')
+                self.process.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+
+class AsyncUCIEngine:
+    """
+    UCI client around one engine subprocess, driven over asyncio pipes, so a single
+    event loop can run many engines at once.
+    """
+    def __init__(self, path, options=None):
+        """
+        path: str
+          Path to the engine binary.
+
+        options: dict (default: None)
+          UCI options to set once at start-up, e.g. {'Hash': 16, 'Threads': 1}.
+
+        The engine is started by start().
+        """
+        self.path = path
+        self.options = {} if options is None else dict(options)
+        self.process = None
+        self.last_ponder = None
+
+    async def start(self):
+        """
+        Start the engine and wait until it is ready.
+        """
+        self.process = await asyncio.create_subprocess_exec(self.path, stdin=subprocess.PIPE,
+                                                            stdout=subprocess.PIPE)
+        self.send('uci')
+        await self.read_until('uciok')
+        for name, value in self.options.items():
+            self.send(f'setoption name {name} value {value}')
+        await self.isready()
+
+    def send(self, command):
+        """
+        Queue one command line for the engine.
+        """
+        self.process.stdin.write((command + '\n').encode())
+
+    async def read_line(self):
+        """
+        Read one line of engine output, without the trailing newline.
+        """
+        line = await self.process.stdout.readline()
+        if line == b'':
+            raise RuntimeError(f'engine {self.path} exited unexpectedly')
+
+        return line.decode().rstrip('\n')
+
+    async def read_until(self, prefix):
+        """
+        Read engine output up to and including the first line starting with prefix,
+        and return all the lines read.
+        """
+        lines = []
+        while True:
+            line = await self.read_line()
+            lines.append(line)
+            if line.startswith(prefix):
+                return lines
+
+    async def isready(self):
+        """
+        Wait until the engine has processed every command sent so far.
+        """
+        self.send('isready')
+        await self.read_until('readyok')
+
+    async def go(self, position, movetime=None, depth=None, nodes=None):
+        """
+        Search a position and return (bestmove, info lines), see UCIEngine.go.
+        """
+        command = 'go'
+        if movetime is not None:
+            command += f' movetime {max(1, int(movetime))}'
+        if depth is not None:
+            command += f' depth {int(depth)}'
+        if nodes is not None:
+            command += f' nodes {int(nodes)}'
+
+        self.send(f'position {position}')
+        self.send(command)
+        lines = await self.read_until('bestmove')
+
+        tokens = lines[-1].split()
+        if len(tokens) >= 4 and tokens[2] == 'ponder':
+            self.last_ponder = tokens[3]
+        else:
+            self.last_ponder = None
+
+        return tokens[1], lines[:-1]
+
+    async def close(self):
+        """
+        Quit the engine, killing it if it does not exit promptly.
+        """
+        if self.process is None or self.process.returncode is not None:
+            return
+
+        try:
+            self.send('quit')
+            await asyncio.wait_for(self.process.wait(), 1)
+        except (OSError, asyncio.TimeoutError):
+            self.process.kill()
+            await self.process.wait()
+
+def cpu_flags():
+    """
+    Set of CPU feature flags of the host (empty if they cannot be read).
+    """
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('flags') or line.startswith('Features'):
+                    return set(line.split(':', 1)[1].split())
+    except OSError:
+        pass
+
+    return set()
+
+def host_archs():
+    """
+    Stockfish Makefile ARCH values that run on this host, fastest first.
+    """
+    machine = platform.machine().lower()
+    flags = cpu_flags()
+
+    if machine in ('x86_64', 'amd64'):
+        archs = ['x86-64']
+        if 'popcnt' in flags:
+            archs.insert(0, 'x86-64-modern')
+        if 'bmi2' in flags and 'popcnt' in flags:
+            archs.insert(0, 'x86-64-bmi2')
+        return archs
+    elif machine in ('i386', 'i686', 'x86'):
+        return ['x86-32', 'x86-32-old']
+    elif machine.startswith('ppc64'):
+        return ['ppc-64']
+    elif machine.startswith('armv7'):
+        return ['armv7']
+    elif sys.maxsize > 2 ** 32:
+        return ['general-64']
+
+    return ['general-32']
+
+def build_stockfish(arch=None, dest=NATIVE_DIR, jobs=None, verbose=False):
+    """
+    Compile the bundled Stockfish 11 sources with their Makefile for one ARCH. The
+    build runs in a temporary copy of the sources, so the tree is left untouched.
+
+    ----------
+    Parameters
+    ----------
+    arch: str (default: None)
+      Makefile ARCH, e.g. 'x86-64-bmi2'. If None, the fastest of host_archs().
+
+    dest: str (default: NATIVE_DIR)
+      Directory the binary is written to, as stockfish_11_<arch>.
+
+    jobs: int (default: None)
+      Parallel make jobs (default: number of cores).
+
+    verbose: bool (default: False)
+      If True, show the compiler output.
+
+    -------
+    Returns
+    -------
+    path: str
+      Path to the compiled binary.
+    """
+    if arch is None:
+        arch = host_archs()[0]
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    os.makedirs(dest, exist_ok=True)
+    path = os.path.join(dest, f'stockfish_11_{arch}')
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        src = os.path.join(build_dir, 'src')
+        shutil.copytree(os.path.join(STOCKFISH_DIR, 'src'), src)
+
+        output = None if verbose else subprocess.DEVNULL
+        subprocess.run(['make', f'-j{jobs}', 'build', f'ARCH={arch}'], cwd=src,
+                       stdout=output, stderr=output, check=True)
+        shutil.copy2(os.path.join(src, 'stockfish'), path)
+
+    return path
+
+def bench_stockfish(path, depth=13, hash_mb=16, threads=1):
+    """
+    Run Stockfish's own 'bench' command and return its totals as
+    {'nodes': int, 'time_ms': int, 'nps': int}.
+    """
+    bench = subprocess.run([path, 'bench', str(hash_mb), str(threads), str(depth)],
+                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                           universal_newlines=True, check=True)
+
+    totals = {}
+    for key, label in (('time_ms', 'Total time'), ('nodes', 'Nodes searched'), ('nps', 'Nodes/second')):
+        match = re.search(label + r'.*:\s*(\d+)', bench.stdout)
+        totals[key] = int(match.group(1))
+
+    return totals
+
+def build_all(archs=None, dest=NATIVE_DIR, verbose=False):
+    """
+    Build every ARCH that runs on this host, bench each build, and record the results
+    in the manifest (dest/builds.json) that find_stockfish uses to pick the fastest.
+
+    -------
+    Returns
+    -------
+    manifest: dict
+      {arch: {'path': binary file name, 'nps': bench nodes per second}}
+    """
+    if archs is None:
+        archs = host_archs()
+
+    manifest = {}
+    for arch in archs:
+        path = build_stockfish(arch, dest=dest, verbose=verbose)
+        manifest[arch] = {'path': os.path.basename(path), 'nps': bench_stockfish(path)['nps']}
+
+        if verbose:
+            print(f"{arch}: {manifest[arch]['nps']} nps")
+
+    with open(os.path.join(dest, 'builds.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+def find_stockfish():
+    """
+    Path to the fastest Stockfish binary usable on this host. In order of preference:
+
+      1. the STOCKFISH_PATH environment variable,
+      2. the native build with the highest bench nps in the build manifest (see
+         build_all), or else the native build for the fastest ARCH of host_archs(),
+      3. a 'stockfish' executable on the PATH,
+      4. on Windows, the fastest bundled .exe supported by the CPU.
+
+    Raises FileNotFoundError if there is none.
+    """
+    if os.environ.get('STOCKFISH_PATH'):
+        return os.environ['STOCKFISH_PATH']
+
+    archs = host_archs()
+    try:
+        with open(MANIFEST) as f:
+            manifest = json.load(f)
+        ranked = sorted((build for arch, build in manifest.items() if arch in archs),
+                        key=lambda build: -build['nps'])
+        for build in ranked:
+            path = os.path.join(NATIVE_DIR, build['path'])
+            if os.access(path, os.X_OK):
+                return path
+    except (OSError, ValueError, KeyError):
+        pass
+
+    for arch in archs:
+        path = os.path.join(NATIVE_DIR, f'stockfish_11_{arch}')
+        if os.access(path, os.X_OK):
+            return path
+
+    path = shutil.which('stockfish')
+    if path is not None:
+        return path
+
+    if os.name == 'nt':
+        flags = cpu_flags()
+        for name, required in WINDOWS_BINARIES:
+            path = os.path.join(STOCKFISH_DIR, 'Windows', name)
+            if os.path.exists(path) and (len(flags) == 0 or required <= flags):
+                return path
+
+    raise FileNotFoundError('no Stockfish binary found; build one with chessengines.build_all() '
+                            'or set STOCKFISH_PATH')
+
+def parse_info(line):
+    """
+    Parse a UCI 'info' line into a dict. Integer fields (depth, seldepth, multipv,
+    nodes, nps, time, hashfull, ...) are converted to int, the score is stored as
+    'cp' or 'mate', and the principal variation as a list of moves under 'pv'.
+    """
+    tokens = line.split()
+    info = {}
+    i = 1
+    while i < len(tokens):
+        token = tokens[i]
+        if token == 'pv':
+            info['pv'] = tokens[i + 1:]
+            break
+        elif token == 'score':
+            info[tokens[i + 1]] = int(tokens[i + 2])
+            i += 3
+            if i < len(tokens) and tokens[i] in ('lowerbound', 'upperbound'):
+                info[tokens[i]] = True
+                i += 1
+        elif token == 'string':
+            info['string'] = ' '.join(tokens[i + 1:])
+            break
+        elif i + 1 < len(tokens):
+            try:
+                info[token] = int(tokens[i + 1])
+            except ValueError:
+                info[token] = tokens[i + 1]
+            i += 2
+        else:
+            i += 1
+
+    return info
+
+class EnginePool:
+    """
+    Pool of UCI engine processes that stay alive across games. Players check an engine
+    out at the start of a game and return it at the end, where it is reset with
+    ucinewgame instead of being restarted.
+    """
+    def __init__(self, path, size=2, options=None):
+        """
+        path: str
+          Path to the engine binary.
+
+        size: int (default: 2)
+          Max. number of engines alive at once (two per concurrent game is enough).
+
+        options: dict (default: None)
+          UCI options set on every engine at start-up.
+        """
+        self.path = path
+        self.size = size
+        self.options = options
+
+        self.idle = []
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(size)
+
+        self.n_spawned = 0
+        self.n_checkouts = 0
+        self.n_discarded = 0
+        self.startup_time = 0.
+        self.reset_time = 0.
+
+    def acquire(self, timeout=None):
+        """
+        Check out an engine, starting a new one if none is idle. Blocks (up to timeout
+        seconds) while all size engines are checked out.
+        """
+        if not self.slots.acquire(timeout=timeout):
+            raise TimeoutError(f'no engine available in pool for {self.path}')
+
+        return self._checkout()
+
+    async def acquire_async(self, timeout=None, poll_interval=0.01):
+        """
+        acquire for coroutines: waits for a free engine without blocking the event loop
+        (polling every poll_interval sec), and starts a new one on a thread.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not self.slots.acquire(blocking=False):
+            if deadline is not None and loop.time() >= deadline:
+                raise TimeoutError(f'no engine available in pool for {self.path}')
+            await asyncio.sleep(poll_interval)
+
+        checkout = loop.run_in_executor(None, self._checkout)
+        try:
+            return await asyncio.shield(checkout)
+        except asyncio.CancelledError:
+            # The engine is checked out anyway: put it back once it is up
+            checkout.add_done_callback(lambda done: done.exception() is None and self.release(done.result()))
+            raise
+
+    def _checkout(self):
+        """
+        Idle engine or a new one, for a caller holding a slot (given back if the engine
+        fails to start).
+        """
+        with self.lock:
+            self.n_checkouts += 1
+            engine = self.idle.pop() if len(self.idle) > 0 else None
+
+        if engine is None:
+            try:
+                engine = UCIEngine(self.path, options=self.options)
+            except:
+                self.slots.release()
+                raise
+
+            with self.lock:
+                self.n_spawned += 1
+                self.startup_time += engine.startup_time
+
+        return engine
+
+    def release(self, engine):
+        """
+        Return an engine to the pool. Engines that died, or that were abandoned in the
+        middle of a search (e.g. after a timeout), are closed instead of reused.
+        """
+        try:
+            if engine.busy or not engine.is_alive():
+                engine.close()
+                with self.lock:
+                    self.n_discarded += 1
+            else:
+                start = time.perf_counter()
+                engine.new_game()
+                with self.lock:
+                    self.reset_time += time.perf_counter() - start
+                    self.idle.append(engine)
+        except (OSError, RuntimeError):
+            engine.close()
+            with self.lock:
+                self.n_discarded += 1
+        finally:
+            self.slots.release()
+
+    def close(self):
+        """
+        Quit all idle engines.
+        """
+        with self.lock:
+            idle, self.idle = self.idle, []
+
+        for engine in idle:
+            engine.close()
+
+    def stats(self):
+        """
+        Pool statistics: engines spawned, checkouts, mean start-up and reset time (sec)
+        and the start-up time saved per checkout by reusing engines.
+        """
+        with self.lock:
+            n_reused = self.n_checkouts - self.n_spawned
+            mean_startup = self.startup_time / max(1, self.n_spawned)
+            mean_reset = self.reset_time / max(1, n_reused)
+
+            return {'spawned': self.n_spawned,
+                    'checkouts': self.n_checkouts,
+                    'discarded': self.n_discarded,
+                    'mean_startup_sec': mean_startup,
+                    'mean_reset_sec': mean_reset,
+                    'saved_sec_per_checkout': n_reused * (mean_startup - mean_reset) / max(1, self.n_checkouts)}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path, size=2, options=None):
+    """
+    Process-wide engine pool for a binary and set of options, created on first use.
+    Each tournament worker process therefore keeps its engines across all the games
+    it plays.
+    """
+    key = (path, tuple(sorted((options or {}).items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = EnginePool(path, size=size, options=options)
+
+        return _pools[key]
+
+def close_pools():
+    """
+    Quit the idle engines of every process-wide pool.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+
+    for pool in pools:
+        pool.close()
+
+atexit.register(close_pools)
+
+def _forget_pools():
+    """
+    In a forked child (e.g. a chesssandbox player process), start without pools: the
+    parent's engines and their pipes belong to the parent.
+    """
+    global _pools, _pools_lock
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools)
+
+if __name__ == '__main__':
+    # Build the bundled Stockfish for this host and bench every build
+    for arch, build in build_all(verbose=True).items():
+        print(f"{arch:>14}: {build['nps']} nps ({build['path']})")
+    print(f'using {find_stockfish()}')
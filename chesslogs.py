@@ -0,0 +1,338 @@
+import os
+import re
+import json
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Codes of the winner column
+WHITE, BLACK, DRAW, UNKNOWN = 0, 1, 2, -1
+
+_GAME_COLUMNS = ('white', 'black', 'winner', 'termination', 'n_plies', 'offset')
+_MOVE_COLUMNS = ('move_time', 'move_side', 'move_game', 'move')
+
+# Move lines of the plain-text logs, e.g. 'white t=0.088 | move:d2d4'
+_MOVE_LINE = re.compile(r'^(white|black) t=(\S+) \| move:(\S*)$', re.M)
+
+def split_result(game_result):
+    """
+    Split a result string into (winner, termination), e.g. 'Win white:timeout' gives
+    (WHITE, 'timeout') and 'Draw:stalemate' gives (DRAW, 'stalemate').
+    """
+    if game_result is None or game_result == 'None':
+        return UNKNOWN, None
+
+    outcome, _, termination = game_result.partition(':')
+    if outcome == 'Win white':
+        return WHITE, termination
+    elif outcome == 'Win black':
+        return BLACK, termination
+    elif outcome == 'Draw':
+        return DRAW, termination
+
+    return UNKNOWN, termination
+
+def parse_log(path):
+    """
+    Parse one game log into a dict with the setup fields (as strings, e.g. 'white',
+    'black', 'game_result') and the moves as lists 'sides' ('white'/'black'), 'times'
+    (sec) and 'moves' (UCI).
+
+    Both the plain-text logs written by play_game(write=...) (--Setup--, --Time
+    Control-- and --Game-- sections, or older logs with bare '--' separators) and JSON
+    Lines records written by play_game(write_record=...) are understood.
+    """
+    if path.endswith('.jsonl'):
+        return _parse_record(path)
+
+    with open(path) as f:
+        text = f.read()
+
+    moves = _MOVE_LINE.findall(text)
+    game = {'sides': [side for side, _, _ in moves],
+            'times': [float(t) for _, t, _ in moves],
+            'moves': [move for _, _, move in moves]}
+
+    # Setup fields ('key:value' lines) come before the first move
+    first_move = _MOVE_LINE.search(text)
+    header = text if first_move is None else text[:first_move.start()]
+    for line in header.splitlines():
+        if not line.startswith('--'):
+            key, sep, value = line.partition(':')
+            if sep:
+                game[key.lower()] = value
+
+    return game
+
+def _parse_record(path):
+    """
+    parse_log for a JSON Lines game record.
+    """
+    game = {'sides': [], 'times': [], 'moves': []}
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError: # torn last line of a crashed game
+                break
+
+            kind = entry.pop('type')
+            if kind == 'ply':
+                game['sides'].append(entry['side'])
+                game['times'].append(entry['t'])
+                game['moves'].append(entry['move'])
+            elif kind == 'setup':
+                game.update((key, str(value)) for key, value in entry.items())
+            elif kind == 'result':
+                game['game_result'] = entry['game_result']
+
+    return game
+
+def _parse_chunk(paths):
+    """
+    Parse a chunk of logs into flat column lists (run in worker processes).
+    """
+    chunk = {'white': [], 'black': [], 'game_result': [], 'n_plies': [],
+             'move_time': [], 'move_side': [], 'move': []}
+    for path in paths:
+        game = parse_log(path)
+        chunk['white'].append(game.get('white'))
+        chunk['black'].append(game.get('black'))
+        chunk['game_result'].append(game.get('game_result'))
+        chunk['n_plies'].append(len(game['moves']))
+        chunk['move_time'].extend(game['times'])
+        chunk['move_side'].extend(side == 'black' for side in game['sides'])
+        chunk['move'].extend(game['moves'])
+
+    return chunk
+
+def _codes(values, table, lookup):
+    """
+    Encode values as indices into table (a list of distinct values), extending it.
+    """
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(table)
+            table.append(value)
+        codes[i] = code
+
+    return codes
+
+def build_index(paths, index_dir, n_workers=None, chunk_size=500):
+    """
+    Parse game logs and store them as a columnar index in index_dir: one .npy file per
+    column (memory-mapped by load_index) plus index.json with the string tables.
+
+    Game columns: white and black (player codes), winner (WHITE, BLACK, DRAW or
+    UNKNOWN), termination (code), n_plies and offset (first row of the game in the move
+    columns). Move columns: move_time (sec), move_side (0 white, 1 black), move_game
+    (row of the game) and move (UCI, as bytes).
+
+    ----------
+    Parameters
+    ----------
+    paths: iterable of str
+      Game logs, see parse_log.
+
+    index_dir: str
+      Directory the index is written to (created if needed).
+
+    n_workers: int (default: None)
+      Number of parsing processes (default: all cores); 1 parses in-process.
+
+    chunk_size: int (default: 500)
+      Number of logs parsed per task.
+
+    -------
+    Returns
+    -------
+    index: GameIndex
+      The freshly built index.
+    """
+    paths = [os.path.abspath(path) for path in paths]
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+    if n_workers == 1 or len(chunks) <= 1:
+        parsed = map(_parse_chunk, chunks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=n_workers)
+        parsed = executor.map(_parse_chunk, chunks)
+
+    players, player_lookup = [], {}
+    terminations, termination_lookup = [], {}
+    columns = {name: [] for name in _GAME_COLUMNS + _MOVE_COLUMNS}
+    n_moves = 0
+    n_games = 0
+    for chunk in parsed:
+        n_plies = np.array(chunk['n_plies'], dtype=np.int32)
+        results = [split_result(game_result) for game_result in chunk['game_result']]
+
+        columns['white'].append(_codes(chunk['white'], players, player_lookup))
+        columns['black'].append(_codes(chunk['black'], players, player_lookup))
+        columns['winner'].append(np.array([winner for winner, _ in results], dtype=np.int8))
+        columns['termination'].append(_codes([termination for _, termination in results],
+                                             terminations, termination_lookup))
+        columns['n_plies'].append(n_plies)
+        columns['offset'].append(n_moves + np.concatenate([[0], np.cumsum(n_plies[:-1], dtype=np.int64)]))
+
+        columns['move_time'].append(np.array(chunk['move_time'], dtype=np.float64))
+        columns['move_side'].append(np.array(chunk['move_side'], dtype=np.int8))
+        columns['move_game'].append(np.repeat(np.arange(n_games, n_games + len(n_plies), dtype=np.int32), n_plies))
+        columns['move'].append(np.array(chunk['move'], dtype='S5'))
+
+        n_moves += int(n_plies.sum())
+        n_games += len(n_plies)
+
+    if executor is not None:
+        executor.shutdown()
+
+    os.makedirs(index_dir, exist_ok=True)
+    for name, parts in columns.items():
+        if len(parts) > 0:
+            column = np.concatenate(parts)
+        else:
+            column = np.array([], dtype='S5' if name == 'move' else np.int32)
+        np.save(os.path.join(index_dir, f'{name}.npy'), column)
+
+    with open(os.path.join(index_dir, 'index.json'), 'w') as f:
+        json.dump({'players': players, 'terminations': terminations, 'paths': paths}, f)
+
+    return load_index(index_dir)
+
+def load_index(index_dir):
+    """
+    Open an index written by build_index. Columns are memory-mapped, so only the
+    columns (and pages) a query touches are read from disk.
+    """
+    return GameIndex(index_dir)
+
+class GameIndex:
+    """
+    Columnar index over stored games, see build_index. Columns are available as
+    attributes (e.g. index.winner, index.move_time), and game selections are boolean
+    masks over the games.
+    """
+    def __init__(self, index_dir):
+        """
+        index_dir: str
+          Directory written by build_index.
+        """
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, 'index.json')) as f:
+            meta = json.load(f)
+
+        self.players = meta['players']
+        self.terminations = meta['terminations']
+        self.paths = meta['paths']
+
+        for name in _GAME_COLUMNS + _MOVE_COLUMNS:
+            setattr(self, name, np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _code(self, value, table):
+        """
+        Code of value in a string table, or -1 if it never occurs.
+        """
+        try:
+            return table.index(value)
+        except ValueError:
+            return -1
+
+    def games(self, player=None, side=None, winner=None, termination=None):
+        """
+        Boolean mask of the games matching every given filter.
+
+        player: str (default: None)
+          Name of a player taking part (on the given side, if side is given).
+
+        side: str (default: None)
+          'white' or 'black'.
+
+        winner: int or str (default: None)
+          WHITE, BLACK, DRAW, UNKNOWN, or the name of the winning player.
+
+        termination: str (default: None)
+          How the game ended, e.g. 'timeout', 'checkmate', 'threefold repetition'.
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        if player is not None:
+            code = self._code(player, self.players)
+            if side == 'white':
+                mask &= self.white == code
+            elif side == 'black':
+                mask &= self.black == code
+            else:
+                mask &= (self.white == code) | (self.black == code)
+        elif side is not None:
+            raise ValueError('side requires a player')
+
+        if isinstance(winner, str):
+            code = self._code(winner, self.players)
+            mask &= ((self.winner == WHITE) & (self.white == code)) | ((self.winner == BLACK) & (self.black == code))
+        elif winner is not None:
+            mask &= self.winner == winner
+
+        if termination is not None:
+            mask &= self.termination == self._code(termination, self.terminations)
+
+        return mask
+
+    def losses(self, player, termination=None):
+        """
+        Boolean mask of the games player lost (optionally only those ending with
+        termination), e.g. index.losses('Stockfish', 'timeout') for all its timeouts.
+        """
+        code = self._code(player, self.players)
+        mask = ((self.winner == BLACK) & (self.white == code)) | ((self.winner == WHITE) & (self.black == code))
+        if termination is not None:
+            mask &= self.termination == self._code(termination, self.terminations)
+
+        return mask
+
+    def moves(self, games=None, player=None):
+        """
+        Boolean mask of the moves played in the selected games (a game mask, default
+        all), optionally only those played by player.
+        """
+        if games is None:
+            mask = np.ones(len(self.move_game), dtype=bool)
+        else:
+            mask = np.asarray(games)[self.move_game]
+
+        if player is not None:
+            code = self._code(player, self.players)
+            is_white = np.asarray(self.white)[self.move_game] == code
+            is_black = np.asarray(self.black)[self.move_game] == code
+            mask &= np.where(self.move_side == 0, is_white, is_black)
+
+        return mask
+
+    def score_table(self, games=None):
+        """
+        Score of every player over the selected games (default all) as
+        {name: [wins, draws, losses, points]}.
+        """
+        if games is None:
+            games = np.ones(len(self), dtype=bool)
+
+        table = {}
+        n_players = len(self.players)
+        for column, own_win, own_loss in ((self.white, WHITE, BLACK), (self.black, BLACK, WHITE)):
+            codes = np.asarray(column)[games]
+            winners = np.asarray(self.winner)[games]
+            wins = np.bincount(codes[winners == own_win], minlength=n_players)
+            draws = np.bincount(codes[winners == DRAW], minlength=n_players)
+            losses = np.bincount(codes[winners == own_loss], minlength=n_players)
+            for code in np.unique(codes):
+                row = table.setdefault(self.players[code], [0, 0, 0, 0.])
+                row[0] += int(wins[code])
+                row[1] += int(draws[code])
+                row[2] += int(losses[code])
+                row[3] += float(wins[code] + 0.5 * draws[code])
+
+        return table
@@ -0,0 +1,98 @@
+import chess
+import chess.pgn
+import numpy as np
+
+def load_epd(path):
+    """
+    Read an EPD opening book and return its positions as a list of FENs (opcodes such
+    as id or bm are ignored; blank lines and lines starting with # are skipped).
+    """
+    fens = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if len(line) == 0 or line.startswith('#'):
+                continue
+
+            board, _ = chess.Board.from_epd(line)
+            fens.append(board.fen())
+
+    return fens
+
+def load_pgn(path, plies=None):
+    """
+    Read a PGN opening book and return, for every game, the position at the end of its
+    main line (or after at most plies plies) as a FEN.
+    """
+    fens = []
+    with open(path) as f:
+        while True:
+            game = chess.pgn.read_game(f)
+            if game is None:
+                break
+
+            board = game.board()
+            for ply, move in enumerate(game.mainline_moves()):
+                if plies is not None and ply >= plies:
+                    break
+                board.push(move)
+            fens.append(board.fen())
+
+    return fens
+
+def load_book(path, plies=None):
+    """
+    Read an opening book, as PGN if path ends with .pgn and as EPD otherwise.
+    """
+    if path.lower().endswith('.pgn'):
+        return load_pgn(path, plies=plies)
+
+    return load_epd(path)
+
+def random_openings(n, plies=8, seed=0, max_misses=1000):
+    """
+    n distinct positions reached by plies random legal moves from the start, for when
+    no book is at hand. Positions where the game is already over are skipped.
+
+    Raises ValueError if max_misses walks in a row reach no new position, e.g. when
+    fewer than n positions exist at that depth (one with plies=0, 20 with plies=1).
+    """
+    rng = np.random.default_rng(seed)
+    fens = []
+    seen = set()
+    misses = 0
+    while len(fens) < n:
+        if misses >= max_misses:
+            raise ValueError(f'found only {len(fens)} of {n} distinct positions after {plies} plies')
+
+        board = chess.Board()
+        for ply in range(plies):
+            moves = list(board.legal_moves)
+            if len(moves) == 0:
+                break
+            board.push(moves[rng.integers(len(moves))])
+
+        if not board.is_game_over() and board.fen() not in seen:
+            seen.add(board.fen())
+            fens.append(board.fen())
+            misses = 0
+        else:
+            misses += 1
+
+    return fens
+
+def sample_openings(openings, n, seed=0):
+    """
+    Draw n openings without replacement (once the book is exhausted, it is reshuffled
+    and drawn from again, so every position is used equally often).
+    """
+    if n > 0 and len(openings) == 0:
+        raise ValueError('cannot sample openings from an empty book')
+
+    rng = np.random.default_rng(seed)
+    sample = []
+    while len(sample) < n:
+        order = rng.permutation(len(openings))[:n - len(sample)]
+        sample.extend(openings[i] for i in order)
+
+    return sample
@@ -0,0 +1,517 @@
+import time
+import chess
+import chess.polyglot
+import numpy as np
+
+import chesslogs
+
+# Terminations of a random playout, indexed by the 'termination' codes (the order of
+# python-chess' Board.outcome(), then games cut off at max_plies)
+TERMINATIONS = ('checkmate', 'insufficient material', 'stalemate', 'seventyfive-move rule',
+                'fivefold repetition', 'max plies')
+CHECKMATE, INSUFFICIENT, STALEMATE, SEVENTYFIVE, FIVEFOLD, MAX_PLIES = range(6)
+
+# Boards are int8 arrays of 65 squares (a1=0 ... h8=63, python-chess order) holding the
+# piece type, positive for white and negative for black; square 64 stays empty and is
+# where the tables below point when a step leaves the board
+EMPTY = 64
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+
+# Ray directions as (file, rank) steps, rook directions first
+_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, 1), (1, -1), (-1, -1))
+_ROOK_DIRECTION = np.array([True] * 4 + [False] * 4)
+
+def _square(file, rank):
+    return 8 * rank + file if 0 <= file < 8 and 0 <= rank < 8 else EMPTY
+
+def _step_table(steps):
+    table = np.full((64, len(steps)), EMPTY, dtype=np.int64)
+    for square in range(64):
+        for i, (df, dr) in enumerate(steps):
+            table[square, i] = _square(square % 8 + df, square // 8 + dr)
+
+    return table
+
+_KNIGHT_TABLE = _step_table(((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)))
+_KING_TABLE = _step_table(_DIRECTIONS)
+# Squares a pawn of color c (0 white, 1 black) captures on, and squares a pawn of
+# color c attacks a square from
+_PAWN_CAPTURES = np.stack([_step_table(((-1, 1), (1, 1))), _step_table(((-1, -1), (1, -1)))])
+_PAWN_ATTACKERS = np.stack([_step_table(((-1, -1), (1, -1))), _step_table(((-1, 1), (1, 1)))])
+
+_RAYS = np.full((64, 8, 7), EMPTY, dtype=np.int64)
+for _from in range(64):
+    for _d, (_df, _dr) in enumerate(_DIRECTIONS):
+        for _k in range(7):
+            _to = _square(_from % 8 + _df * (_k + 1), _from // 8 + _dr * (_k + 1))
+            if _to == EMPTY:
+                break
+            _RAYS[_from, _d, _k] = _to
+
+# _ALIGNED[k, a, b]: a and b lie on the same ray from k, i.e. a piece pinned to a king
+# on k may move from a to b
+_ALIGNED = np.zeros((65, 65, 65), dtype=bool)
+for _from in range(64):
+    for _d in range(8):
+        _line = _RAYS[_from, _d][_RAYS[_from, _d] < EMPTY]
+        _ALIGNED[_from, _line[:, None], _line[None, :]] = True
+
+# Castling rights as bits K=1, Q=2, k=4, q=8, and the rights that survive a move from
+# or to each square
+_RIGHTS_KEEP = np.full(65, 15, dtype=np.uint8)
+_RIGHTS_KEEP[[chess.H1, chess.A1, chess.E1, chess.H8, chess.A8, chess.E8]] = (14, 13, 12, 11, 7, 3)
+# (bit, king from, king to, rook square, squares to be empty, squares not attacked)
+_CASTLINGS = ((1, chess.E1, chess.G1, chess.H1, (chess.F1, chess.G1), (chess.F1, chess.G1)),
+              (2, chess.E1, chess.C1, chess.A1, (chess.B1, chess.C1, chess.D1), (chess.D1, chess.C1)),
+              (4, chess.E8, chess.G8, chess.H8, (chess.F8, chess.G8), (chess.F8, chess.G8)),
+              (8, chess.E8, chess.C8, chess.A8, (chess.B8, chess.C8, chess.D8), (chess.D8, chess.C8)))
+
+_DARK = np.array([(square % 8 + square // 8) % 2 == 0 for square in range(64)])
+
+# Zobrist keys in the polyglot layout (the same hash as chessreferee.Referee), indexed
+# by piece + 6 and square
+_RANDOM = np.array(chess.polyglot.POLYGLOT_RANDOM_ARRAY, dtype=np.uint64)
+_PIECE_KEYS = np.zeros((13, 65), dtype=np.uint64)
+for _piece in range(1, 7):
+    _PIECE_KEYS[6 + _piece, :64] = _RANDOM[64 * (2 * (_piece - 1) + 1):64 * (2 * (_piece - 1) + 2)]
+    _PIECE_KEYS[6 - _piece, :64] = _RANDOM[64 * 2 * (_piece - 1):64 * (2 * (_piece - 1) + 1)]
+_CASTLING_KEYS = np.zeros(16, dtype=np.uint64)
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            _CASTLING_KEYS[_rights] ^= _RANDOM[768 + _bit]
+_EP_KEYS = _RANDOM[772:780]
+_TURN_KEY = _RANDOM[780]
+
+def _mix(x):
+    """
+    SplitMix64 finalizer of a uint64 array: a counter-based random stream, so each
+    game's moves depend on its seed only, whatever batch it is played in.
+    """
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+
+    return x ^ (x >> np.uint64(31))
+
+def move_uci(code):
+    """
+    UCI string of a move code from random_playouts(record_moves=True) (from square,
+    to square << 6, promotion piece type << 12).
+    """
+    promotion = code >> 12
+
+    return (chess.SQUARE_NAMES[code & 63] + chess.SQUARE_NAMES[code >> 6 & 63]
+            + (chess.piece_symbol(promotion) if promotion else ''))
+
+def _attacked(rel, squares, attacker):
+    """
+    Whether squares (one per board) are attacked by the opponent on boards rel, which
+    hold the side to move's pieces as positive numbers. attacker is the opponent's color
+    per board (0 white, 1 black), for the direction of its pawns.
+    """
+    rows = np.arange(len(squares))[:, None]
+    attacked = (rel[rows, _KNIGHT_TABLE[squares]] == -KNIGHT).any(axis=1)
+    attacked |= (rel[rows, _KING_TABLE[squares]] == -KING).any(axis=1)
+    attacked |= (rel[rows, _PAWN_ATTACKERS[attacker, squares]] == -PAWN).any(axis=1)
+
+    # First piece along each ray
+    values = rel.ravel()[(65 * rows)[:, :, None] + _RAYS[squares]]
+    first = np.take_along_axis(values, (values != 0).argmax(axis=2)[:, :, None], axis=2)[:, :, 0]
+    sliders = np.where(_ROOK_DIRECTION, (first == -ROOK) | (first == -QUEEN), (first == -BISHOP) | (first == -QUEEN))
+
+    return attacked | sliders.any(axis=1)
+
+def _pins_and_checks(rel, kings, attacker):
+    """
+    (n_boards, 65) mask of the side to move's pieces pinned to its king, and whether
+    the king is in check, from one pass along the rays from the king.
+    """
+    rows = np.arange(len(kings))
+    rays = _RAYS[kings]
+    values = rel.ravel()[(65 * rows)[:, None, None] + rays]
+    occupied = values != 0
+    count = np.cumsum(occupied, axis=2, dtype=np.int8)
+    first = occupied & (count == 1)
+    second = occupied & (count == 2)
+    first_value = (values * first).sum(axis=2)
+    second_value = (values * second).sum(axis=2)
+    rook_like = np.where(_ROOK_DIRECTION, -ROOK, -BISHOP)
+
+    pinned = np.zeros(rel.shape, dtype=bool)
+    pins = (first_value > 0) & ((second_value == rook_like) | (second_value == -QUEEN))
+    board, direction = np.nonzero(pins)
+    pinned[board, (rays[board, direction] * first[board, direction]).sum(axis=1)] = True
+
+    in_check = ((first_value == rook_like) | (first_value == -QUEEN)).any(axis=1)
+    in_check |= (rel[rows[:, None], _KNIGHT_TABLE[kings]] == -KNIGHT).any(axis=1)
+    in_check |= (rel[rows[:, None], _PAWN_ATTACKERS[attacker, kings]] == -PAWN).any(axis=1)
+
+    return pinned, in_check
+
+def _steps(rel, board, square, table):
+    """
+    Pseudo-legal moves (board, from, to) of the knights or kings on board, square.
+    """
+    targets = table[square]
+    i, j = np.nonzero((targets < EMPTY) & (rel[board[:, None], targets] <= 0))
+
+    return board[i], square[i], targets[i, j]
+
+def _slides(rel, board, square, piece):
+    """
+    Pseudo-legal moves (board, from, to) of the bishops, rooks and queens piece on
+    board, square.
+    """
+    rays = _RAYS[square]
+    values = rel.ravel()[(65 * board)[:, None, None] + rays]
+    occupied = values != 0
+    # Squares up to and including the first piece, unless it is our own
+    blocked = np.cumsum(occupied, axis=2, dtype=np.int8) - occupied
+    directions = np.where(_ROOK_DIRECTION, piece[:, None] != BISHOP, piece[:, None] != ROOK)
+    i, d, k = np.nonzero((rays < EMPTY) & (blocked == 0) & (values <= 0) & directions[:, :, None])
+
+    return board[i], square[i], rays[i, d, k]
+
+def _pawn_moves(rel, board, square, white, ep):
+    """
+    Pseudo-legal moves (board, from, to, promotion, en passant) of the pawns on board,
+    square.
+    """
+    forward = np.where(white[board], 8, -8)
+    single = square + forward
+    can_push = rel[board, single] == 0
+    start = np.where(white[board], square // 8 == 1, square // 8 == 6)
+    double = np.where(start, square + 2 * forward, EMPTY)
+    can_double = can_push & start & (rel[board, double] == 0)
+
+    captures = _PAWN_CAPTURES[(~white[board]).astype(np.int64), square]
+    en_passant = captures == ep[board][:, None]
+    i, j = np.nonzero((captures < EMPTY) & ((rel[board[:, None], captures] < 0) | en_passant))
+
+    boards = np.concatenate([board[can_push], board[can_double], board[i]])
+    froms = np.concatenate([square[can_push], square[can_double], square[i]])
+    tos = np.concatenate([single[can_push], double[can_double], captures[i, j]])
+    eps = np.concatenate([np.zeros(can_push.sum() + can_double.sum(), dtype=bool), en_passant[i, j]])
+
+    # One move per promotion piece on the last rank
+    last = (tos < 8) | (tos >= 56)
+    repeat = np.where(last, 4, 1)
+    promotions = np.zeros(repeat.sum(), dtype=np.int8)
+    promotions[np.repeat(last, repeat)] = np.tile(np.array([QUEEN, ROOK, BISHOP, KNIGHT], dtype=np.int8), last.sum())
+
+    return (np.repeat(boards, repeat), np.repeat(froms, repeat), np.repeat(tos, repeat), promotions,
+            np.repeat(eps, repeat))
+
+def _castlings(rel, white, rights, in_check):
+    """
+    Legal castling moves (board, from, to).
+    """
+    boards, froms, tos = [], [], []
+    for bit, king_from, king_to, rook, empty, safe in _CASTLINGS:
+        color = bit < 4
+        board = np.nonzero((white == color) & (rights & bit > 0) & ~in_check)[0]
+        ok = (rel[board, king_from] == KING) & (rel[board, rook] == ROOK)
+        for square in empty:
+            ok &= rel[board, square] == 0
+        board = board[ok]
+        for square in safe:
+            board = board[~_attacked(rel[board], np.full(len(board), square), np.full(len(board), int(color)))]
+        boards.append(board)
+        froms.append(np.full(len(board), king_from))
+        tos.append(np.full(len(board), king_to))
+
+    return np.concatenate(boards), np.concatenate(froms), np.concatenate(tos)
+
+def _legal_moves(rel, white, ep, rights):
+    """
+    All legal moves of boards rel (side to move positive): arrays (board, from, to,
+    promotion, en passant), plus each board's king square and whether it is in check.
+
+    Moves are generated pseudo-legally. Only king moves, en-passant captures and moves
+    out of check are played out on a copy of the board to test for check; any other
+    move is legal unless its piece is pinned and leaves the line of the pin.
+    """
+    own_board, own_square = np.nonzero(rel[:, :64] > 0)
+    own = rel[own_board, own_square]
+    is_king = own == KING
+    kings = own_square[is_king] # one per board, in board order
+    attacker = white.astype(np.int64)
+    pinned, in_check = _pins_and_checks(rel, kings, attacker)
+
+    is_knight, is_pawn = own == KNIGHT, own == PAWN
+    is_slider = ~(is_king | is_knight | is_pawn)
+    knight = _steps(rel, own_board[is_knight], own_square[is_knight], _KNIGHT_TABLE)
+    king = _steps(rel, own_board[is_king], kings, _KING_TABLE)
+    slide = _slides(rel, own_board[is_slider], own_square[is_slider], own[is_slider])
+    pawn = _pawn_moves(rel, own_board[is_pawn], own_square[is_pawn], white, ep)
+    board = np.concatenate([knight[0], king[0], slide[0], pawn[0]])
+    froms = np.concatenate([knight[1], king[1], slide[1], pawn[1]])
+    tos = np.concatenate([knight[2], king[2], slide[2], pawn[2]])
+    n_pieces = len(board) - len(pawn[0])
+    promotions = np.concatenate([np.zeros(n_pieces, dtype=np.int8), pawn[3]])
+    en_passant = np.concatenate([np.zeros(n_pieces, dtype=bool), pawn[4]])
+
+    legal = ~pinned[board, froms] | _ALIGNED[kings[board], froms, tos]
+    full = np.nonzero(in_check[board] | (froms == kings[board]) | en_passant)[0]
+    if len(full) > 0:
+        b, f, t = board[full], froms[full], tos[full]
+        after = rel[b]
+        rows = np.arange(len(full))
+        piece = after[rows, f]
+        after[rows, t] = piece
+        after[rows, f] = 0
+        ep_full = en_passant[full]
+        after[rows[ep_full], np.where(white[b], t - 8, t + 8)[ep_full]] = 0
+        legal[full] = ~_attacked(after, np.where(piece == KING, t, kings[b]), attacker[b])
+
+    castle = _castlings(rel, white, rights, in_check)
+    n_castles = len(castle[0])
+
+    return (np.concatenate([board[legal], castle[0]]), np.concatenate([froms[legal], castle[1]]),
+            np.concatenate([tos[legal], castle[2]]),
+            np.concatenate([promotions[legal], np.zeros(n_castles, dtype=np.int8)]),
+            np.concatenate([en_passant[legal], np.zeros(n_castles, dtype=bool)]), kings, in_check)
+
+def _insufficient(boards):
+    """
+    Insufficient material on both sides (python-chess' Board.is_insufficient_material).
+    """
+    squares = boards[:, :64]
+    kind = np.abs(squares)
+    bishops = kind == BISHOP
+    same_color_bishops = ~(bishops & _DARK).any(axis=1) | ~(bishops & ~_DARK).any(axis=1)
+    no_pawns_or_knights = ~((kind == PAWN) | (kind == KNIGHT)).any(axis=1)
+
+    insufficient = np.ones(len(boards), dtype=bool)
+    for sign in (1, -1):
+        own = squares * sign > 0
+        heavy = (own & ((kind == PAWN) | (kind == ROOK) | (kind == QUEEN))).any(axis=1)
+        knights = (own & (kind == KNIGHT)).any(axis=1)
+        lone_knight = (own.sum(axis=1) <= 2) & ~((squares * sign < 0) & (kind != KING) & (kind != QUEEN)).any(axis=1)
+        own_bishops = (own & bishops).any(axis=1)
+        insufficient &= ~heavy & np.where(knights, lone_knight,
+                                          np.where(own_bishops, same_color_bishops & no_pawns_or_knights, True))
+
+    return insufficient
+
+def _initial_state(board):
+    """
+    Array form (squares, white, castling rights, en-passant square, halfmove clock) of a
+    python-chess board.
+    """
+    if board.chess960:
+        raise ValueError('random_playouts does not play Chess960')
+
+    squares = np.zeros(65, dtype=np.int8)
+    for square, piece in board.piece_map().items():
+        squares[square] = piece.piece_type if piece.color else -piece.piece_type
+    clean = board.clean_castling_rights()
+    rights = sum(bit for bit, mask in ((1, chess.BB_H1), (2, chess.BB_A1), (4, chess.BB_H8), (8, chess.BB_A8))
+                 if clean & mask)
+    ep = board.ep_square if board.ep_square is not None else -1
+
+    return squares, board.turn, rights, ep, board.halfmove_clock
+
+def _play_batch(game_ids, seed, start, max_plies, results, record):
+    """
+    Play the games game_ids from state start to the end, writing into results.
+    """
+    n = len(game_ids)
+    squares, turn, rights0, ep0, halfmove0 = start
+    boards = np.tile(squares, (n, 1))
+    white = np.full(n, turn)
+    rights = np.full(n, rights0, dtype=np.uint8)
+    ep = np.full(n, ep0, dtype=np.int64)
+    halfmove = np.full(n, halfmove0, dtype=np.int64)
+    key = np.bitwise_xor.reduce(_PIECE_KEYS[boards.astype(np.int64) + 6, np.arange(65)], axis=1)
+    key ^= _CASTLING_KEYS[rights] ^ np.where(white, _TURN_KEY, np.uint64(0))
+    insufficient = _insufficient(boards)
+    # Position keys per ply, by slot (the game's row in the batch, so that finished
+    # games need not be copied out)
+    history = np.zeros((n, max_plies + 1), dtype=np.uint64)
+    slots = np.arange(n)
+    streams = _mix(np.uint64(seed) ^ _mix(game_ids.astype(np.uint64)))
+    ids = game_ids
+    plies = 0
+
+    for ply in range(max_plies + 1):
+        if len(ids) == 0:
+            break
+
+        sign = np.where(white, 1, -1).astype(np.int8)
+        rel = boards * sign[:, None]
+        board, froms, tos, promotions, en_passant, kings, in_check = _legal_moves(rel, white, ep, rights)
+        n_legal = np.bincount(board, minlength=len(ids))
+
+        # Position key: the en-passant square only counts if the capture is legal
+        has_ep = np.bincount(board[en_passant], minlength=len(ids)) > 0
+        position = key ^ np.where(has_ep, _EP_KEYS[ep % 8], np.uint64(0))
+        history[slots, ply] = position
+        repetitions = np.ones(len(ids), dtype=np.int64)
+        long = np.nonzero(halfmove >= 16)[0]
+        if len(long) > 0:
+            window = min(int(halfmove[long].max()), ply)
+            if window > 0:
+                lags = np.arange(window, 0, -1)
+                same = ((history[slots[long], ply - window:ply] == position[long, None])
+                        & (lags <= halfmove[long, None]))
+                repetitions[long] += same.sum(axis=1)
+
+        termination = np.full(len(ids), -1)
+        for code, over in ((FIVEFOLD, repetitions >= 5), (SEVENTYFIVE, halfmove >= 150),
+                           (STALEMATE, n_legal == 0), (INSUFFICIENT, insufficient),
+                           (CHECKMATE, (n_legal == 0) & in_check)):
+            termination[over] = code
+        if ply == max_plies:
+            termination[termination < 0] = MAX_PLIES
+        if record:
+            results['n_legal'][ids, ply] = n_legal
+
+        over = termination >= 0
+        if over.any():
+            done = ids[over]
+            results['termination'][done] = termination[over]
+            results['n_plies'][done] = ply
+            winner = np.where(white[over], chesslogs.BLACK, chesslogs.WHITE)
+            results['winner'][done] = np.where(termination[over] == CHECKMATE, winner,
+                                               np.where(termination[over] == MAX_PLIES, chesslogs.UNKNOWN,
+                                                        chesslogs.DRAW))
+
+        keep = np.nonzero(~over)[0]
+        if len(keep) == 0:
+            break
+
+        # Pick a random legal move per game still on: the k-th of its moves (in the
+        # order they are generated in), k drawn from the game's stream
+        uniform = (_mix(streams[keep] ^ np.uint64(ply)) >> np.uint64(11)).astype(np.float64) * 2. ** -53
+        first = np.cumsum(n_legal) - n_legal
+        chosen = np.argsort(board, kind='stable')[first[keep] + (uniform * n_legal[keep]).astype(np.int64)]
+
+        if len(keep) < len(ids):
+            ids, slots, boards, white, rights, ep, halfmove, key, insufficient, streams, sign = (
+                ids[keep], slots[keep], boards[keep], white[keep], rights[keep], ep[keep], halfmove[keep], key[keep],
+                insufficient[keep], streams[keep], sign[keep])
+
+        # Play the moves
+        f, t, promotion = froms[chosen], tos[chosen], promotions[chosen]
+        if record:
+            results['moves'][ids, ply] = f | t << 6 | promotion.astype(np.int64) << 12
+        rows = np.arange(len(ids))
+        piece = boards[rows, f]
+        captured = boards[rows, t]
+        placed = np.where(promotion > 0, promotion * sign, piece)
+        key ^= (_PIECE_KEYS[piece.astype(np.int64) + 6, f] ^ _PIECE_KEYS[placed.astype(np.int64) + 6, t]
+                ^ _PIECE_KEYS[captured.astype(np.int64) + 6, t])
+        boards[rows, t] = placed
+        boards[rows, f] = 0
+
+        ep_capture = en_passant[chosen]
+        if ep_capture.any():
+            r = rows[ep_capture]
+            square = t[ep_capture] - 8 * sign[ep_capture]
+            key[r] ^= _PIECE_KEYS[6 - sign[ep_capture].astype(np.int64), square]
+            boards[r, square] = 0
+
+        castle = (np.abs(piece) == KING) & (np.abs(t - f) == 2)
+        if castle.any():
+            r = rows[castle]
+            rook_from = np.where(t[castle] > f[castle], f[castle] + 3, f[castle] - 4)
+            rook_to = (f[castle] + t[castle]) // 2
+            rook = boards[r, rook_from]
+            key[r] ^= _PIECE_KEYS[rook + 6, rook_from] ^ _PIECE_KEYS[rook + 6, rook_to]
+            boards[r, rook_to] = rook
+            boards[r, rook_from] = 0
+
+        new_rights = rights & _RIGHTS_KEEP[f] & _RIGHTS_KEEP[t]
+        key ^= _CASTLING_KEYS[rights] ^ _CASTLING_KEYS[new_rights] ^ _TURN_KEY
+        rights = new_rights
+        pawn = np.abs(piece) == PAWN
+        ep = np.where(pawn & (np.abs(t - f) == 16), (f + t) // 2, -1)
+        halfmove = np.where(pawn | (captured != 0), 0, halfmove + 1)
+        white = ~white
+        plies += len(ids)
+
+        changed = (captured != 0) | ep_capture | (promotion > 0)
+        if changed.any():
+            insufficient[changed] = _insufficient(boards[changed])
+
+    return plies
+
+def random_playouts(n_games, seed=0, board=None, max_plies=1000, batch_size=4096, record_moves=False):
+    """
+    Play n_games games of uniformly random legal moves, batch_size games at a time as
+    numpy arrays, and return their results. This is a vectorized stand-in for play_game
+    with two SampleMrBean players, for Monte Carlo baselines.
+
+    Games end as python-chess' Board.is_game_over() would have them end (checkmate,
+    insufficient material, stalemate, the seventyfive-move rule, fivefold repetition),
+    or unfinished after max_plies plies. Each game draws its moves from a random stream
+    of its own, seeded from seed and its index, so results do not depend on
+    batch_size.
+
+    ----------
+    Parameters
+    ----------
+    n_games: int
+      Number of games.
+
+    seed: int (default: 0)
+      Random seed.
+
+    board: Board or str (default: None)
+      Starting position (Board or FEN) of every game, the standard one if None.
+
+    max_plies: int (default: 1000)
+      Plies after which a game is stopped unfinished.
+
+    batch_size: int (default: 4096)
+      Number of games advanced together.
+
+    record_moves: bool (default: False)
+      If True, also return every game's moves and number of legal moves per ply.
+
+    -------
+    Returns
+    -------
+    results: dict
+      Per game: 'winner' (chesslogs.WHITE, BLACK, DRAW or UNKNOWN), 'termination'
+      (index into TERMINATIONS) and 'n_plies'; in total: 'white_wins', 'black_wins',
+      'draws', 'unfinished', 'terminations' (count per name), 'mean_plies', 'plies',
+      'sec' and 'plies_per_sec'. With record_moves, also 'moves' (n_games x max_plies
+      move codes, -1 after the end, see move_uci) and 'n_legal' (n_games x
+      (max_plies + 1), -1 after the end).
+    """
+    if board is None:
+        board = chess.Board()
+    elif isinstance(board, str):
+        board = chess.Board(board)
+    start = _initial_state(board)
+
+    results = {'winner': np.full(n_games, chesslogs.UNKNOWN, dtype=np.int8),
+               'termination': np.full(n_games, MAX_PLIES, dtype=np.int8),
+               'n_plies': np.zeros(n_games, dtype=np.int64)}
+    if record_moves:
+        results['moves'] = np.full((n_games, max_plies), -1, dtype=np.int32)
+        results['n_legal'] = np.full((n_games, max_plies + 1), -1, dtype=np.int16)
+
+    start_time = time.perf_counter()
+    plies = 0
+    for first in range(0, n_games, batch_size):
+        game_ids = np.arange(first, min(first + batch_size, n_games))
+        plies += _play_batch(game_ids, seed, start, max_plies, results, record_moves)
+    sec = time.perf_counter() - start_time
+
+    winner = results['winner']
+    results.update({'white_wins': int((winner == chesslogs.WHITE).sum()),
+                    'black_wins': int((winner == chesslogs.BLACK).sum()),
+                    'draws': int((winner == chesslogs.DRAW).sum()),
+                    'unfinished': int((winner == chesslogs.UNKNOWN).sum()),
+                    'terminations': dict(zip(TERMINATIONS, np.bincount(results['termination'],
+                                                                       minlength=len(TERMINATIONS)).tolist())),
+                    'mean_plies': float(results['n_plies'].mean()) if n_games > 0 else 0.,
+                    'plies': plies,
+                    'sec': sec,
+                    'plies_per_sec': plies / max(sec, 1e-9)})
+
+    return results
@@ -0,0 +1,498 @@
+import os
+import re
+import chess
+import chess.polyglot
+
+# Pieces on the mailbox are piece type | color << 3 (color 1 for white, 0 for black, as
+# chess.WHITE/chess.BLACK), 0 for an empty square
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+
+# Moves are ints: from square | to square << 6 | promotion piece type << 12
+def make_move(from_square, to_square, promotion=0):
+    """
+    Move int from squares and promotion piece type.
+    """
+    return from_square | to_square << 6 | promotion << 12
+
+def move_from_uci(uci):
+    """
+    Move int of a UCI string (e.g. 'e2e4', 'e7e8q').
+    """
+    move = chess.Move.from_uci(uci)
+
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+def move_uci(move):
+    """
+    UCI string of a move int.
+    """
+    promotion = move >> 12
+
+    return (chess.SQUARE_NAMES[move & 63] + chess.SQUARE_NAMES[move >> 6 & 63]
+            + (chess.piece_symbol(promotion) if promotion else ''))
+
+_BB = chess.BB_SQUARES
+_KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+_KING_ATTACKS = chess.BB_KING_ATTACKS
+_PAWN_ATTACKS = chess.BB_PAWN_ATTACKS # [color][square]
+_RANK_ATTACKS, _RANK_MASKS = chess.BB_RANK_ATTACKS, chess.BB_RANK_MASKS
+_FILE_ATTACKS, _FILE_MASKS = chess.BB_FILE_ATTACKS, chess.BB_FILE_MASKS
+_DIAG_ATTACKS, _DIAG_MASKS = chess.BB_DIAG_ATTACKS, chess.BB_DIAG_MASKS
+_RAYS = chess.BB_RAYS # [a][b]: the whole line through a and b
+_BETWEEN = [[chess.between(a, b) for b in range(64)] for a in range(64)]
+
+# Zobrist keys in the polyglot layout, indexed by mailbox piece and square
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_PIECE_KEYS = [[0] * 64 for piece in range(16)]
+for _color in (chess.WHITE, chess.BLACK):
+    for _piece_type in range(PAWN, KING + 1):
+        for _square in range(64):
+            _PIECE_KEYS[_piece_type | _color << 3][_square] = _RANDOM[64 * (2 * (_piece_type - 1) + _color) + _square]
+# Castling rights are a mask of rook squares, as in python-chess
+_CASTLING_KEYS = ((chess.BB_H1, _RANDOM[768]), (chess.BB_A1, _RANDOM[769]),
+                  (chess.BB_H8, _RANDOM[770]), (chess.BB_A8, _RANDOM[771]))
+_EP_KEYS = _RANDOM[772:780]
+_TURN_KEY = _RANDOM[780]
+
+# Castling rights lost by a move from or to each square
+_RIGHTS_LOST = [0] * 64
+for _square, _mask in ((chess.A1, chess.BB_A1), (chess.H1, chess.BB_H1), (chess.E1, chess.BB_A1 | chess.BB_H1),
+                       (chess.A8, chess.BB_A8), (chess.H8, chess.BB_H8), (chess.E8, chess.BB_A8 | chess.BB_H8)):
+    _RIGHTS_LOST[_square] = _mask
+
+# Perft test positions of Stockfish, e.g.
+# expect perft.exp "fen 8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - -" 6 11030083 > /dev/null
+_PERFT_LINE = re.compile(r'^expect perft\.exp (?:startpos|"fen ([^"]+)") (\d+) (\d+)', re.M)
+
+def perft_positions(path=None):
+    """
+    (fen, depth, nodes) of the positions in Stockfish's tests/perft.sh (the one in
+    stockfish-11-win if path is None).
+    """
+    if path is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stockfish-11-win', 'tests', 'perft.sh')
+    with open(path) as f:
+        text = f.read()
+
+    return [(fen or chess.STARTING_FEN, int(depth), int(nodes)) for fen, depth, nodes in _PERFT_LINE.findall(text)]
+
+def _castling_key(castling):
+    key = 0
+    for mask, random in _CASTLING_KEYS:
+        if castling & mask:
+            key ^= random
+
+    return key
+
+class Position:
+    """
+    Compact chess position for Python bots that search: bitboards per piece type and
+    color plus a 64-square mailbox, with make/unmake on a single object (no board
+    copies and no Move objects), an incrementally updated polyglot Zobrist key
+    (chess.polyglot.zobrist_hash) and pseudo-legal move generation from python-chess'
+    precomputed attack tables.
+
+    Moves are ints (see make_move, move_from_uci and move_uci). generate_moves gives the
+    pseudo-legal moves (castling only when it is legal), legal_moves the legal ones. The
+    position converts to and from chess.Board without replaying moves. Standard chess
+    only (no Chess960).
+    """
+    __slots__ = ('squares', 'pieces', 'occupied_co', 'turn', 'castling', 'ep_square', 'halfmove_clock',
+                 'fullmove_number', 'key', 'stack')
+
+    def __init__(self, board=None):
+        """
+        board: Board or str (default: None)
+          Position to start from (Board or FEN), the standard starting position if
+          None.
+        """
+        if board is None:
+            board = chess.Board()
+        elif isinstance(board, str):
+            board = chess.Board(board)
+        if board.chess960:
+            raise ValueError('Position does not play Chess960')
+
+        self.pieces = [0, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+        self.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.squares = [0] * 64
+        for color in (chess.WHITE, chess.BLACK):
+            for piece_type in range(PAWN, KING + 1):
+                for square in chess.scan_forward(self.pieces[piece_type] & self.occupied_co[color]):
+                    self.squares[square] = piece_type | color << 3
+        self.turn = int(board.turn)
+        self.castling = board.clean_castling_rights()
+        self.ep_square = board.ep_square
+        self.halfmove_clock = board.halfmove_clock
+        self.fullmove_number = board.fullmove_number
+        self.stack = []
+        self.key = self.zobrist()
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Position of a chess.Board (its move stack is not carried over).
+        """
+        return cls(board)
+
+    def to_board(self):
+        """
+        chess.Board of the position, with an empty move stack.
+        """
+        board = chess.Board(None)
+        pieces = self.pieces
+        board.pawns, board.knights, board.bishops = pieces[PAWN], pieces[KNIGHT], pieces[BISHOP]
+        board.rooks, board.queens, board.kings = pieces[ROOK], pieces[QUEEN], pieces[KING]
+        board.occupied_co[chess.WHITE] = self.occupied_co[1]
+        board.occupied_co[chess.BLACK] = self.occupied_co[0]
+        board.occupied = self.occupied_co[0] | self.occupied_co[1]
+        board.turn = bool(self.turn)
+        board.castling_rights = self.castling
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+
+        return board
+
+    def fen(self):
+        return self.to_board().fen()
+
+    def zobrist(self):
+        """
+        Zobrist key of the position from scratch (self.key is kept up to date
+        incrementally).
+        """
+        key = 0
+        for square, piece in enumerate(self.squares):
+            if piece:
+                key ^= _PIECE_KEYS[piece][square]
+
+        return key ^ _castling_key(self.castling) ^ self._ep_key() ^ (_TURN_KEY if self.turn else 0)
+
+    def _ep_key(self):
+        # Polyglot: the en-passant file counts if a pawn can capture, legal or not
+        ep_square = self.ep_square
+        if ep_square is not None and (_PAWN_ATTACKS[self.turn ^ 1][ep_square] & self.pieces[PAWN]
+                                      & self.occupied_co[self.turn]):
+            return _EP_KEYS[ep_square & 7]
+
+        return 0
+
+    def king(self, color):
+        """
+        Square of color's king.
+        """
+        return (self.pieces[KING] & self.occupied_co[color]).bit_length() - 1
+
+    def is_attacked(self, square, by):
+        """
+        Whether square is attacked by color by (1 white, 0 black).
+        """
+        pieces = self.pieces
+        attackers = self.occupied_co[by]
+        if (_KNIGHT_ATTACKS[square] & pieces[KNIGHT] | _KING_ATTACKS[square] & pieces[KING]
+                | _PAWN_ATTACKS[by ^ 1][square] & pieces[PAWN]) & attackers:
+            return True
+
+        occupied = self.occupied_co[0] | self.occupied_co[1]
+        queens = pieces[QUEEN]
+        if (_RANK_ATTACKS[square][_RANK_MASKS[square] & occupied]
+                | _FILE_ATTACKS[square][_FILE_MASKS[square] & occupied]) & (pieces[ROOK] | queens) & attackers:
+            return True
+
+        return bool(_DIAG_ATTACKS[square][_DIAG_MASKS[square] & occupied] & (pieces[BISHOP] | queens) & attackers)
+
+    def is_check(self):
+        """
+        Whether the side to move is in check.
+        """
+        return self.is_attacked(self.king(self.turn), self.turn ^ 1)
+
+    def generate_moves(self):
+        """
+        Pseudo-legal moves of the side to move (castling only when legal), as a list of
+        move ints.
+        """
+        moves = []
+        append = moves.append
+        turn = self.turn
+        pieces = self.pieces
+        us = self.occupied_co[turn]
+        them = self.occupied_co[turn ^ 1]
+        occupied = us | them
+        not_us = ~us
+
+        for from_square in chess.scan_reversed(pieces[KNIGHT] & us):
+            for to_square in chess.scan_reversed(_KNIGHT_ATTACKS[from_square] & not_us):
+                append(from_square | to_square << 6)
+        for from_square in chess.scan_reversed((pieces[BISHOP] | pieces[QUEEN]) & us):
+            for to_square in chess.scan_reversed(_DIAG_ATTACKS[from_square][_DIAG_MASKS[from_square] & occupied]
+                                                 & not_us):
+                append(from_square | to_square << 6)
+        for from_square in chess.scan_reversed((pieces[ROOK] | pieces[QUEEN]) & us):
+            for to_square in chess.scan_reversed((_RANK_ATTACKS[from_square][_RANK_MASKS[from_square] & occupied]
+                                                  | _FILE_ATTACKS[from_square][_FILE_MASKS[from_square] & occupied])
+                                                 & not_us):
+                append(from_square | to_square << 6)
+        king = (pieces[KING] & us).bit_length() - 1
+        for to_square in chess.scan_reversed(_KING_ATTACKS[king] & not_us):
+            append(king | to_square << 6)
+
+        # Pawns, as whole-bitboard shifts
+        pawns = pieces[PAWN] & us
+        empty = ~occupied & chess.BB_ALL
+        if turn:
+            single = pawns << 8 & empty
+            double = (single & chess.BB_RANK_3) << 8 & empty
+            forward, last_rank = 8, chess.BB_RANK_8
+        else:
+            single = pawns >> 8 & empty
+            double = (single & chess.BB_RANK_6) >> 8 & empty
+            forward, last_rank = -8, chess.BB_RANK_1
+        targets = them
+        if self.ep_square is not None:
+            targets |= _BB[self.ep_square]
+        for from_square in chess.scan_reversed(pawns):
+            for to_square in chess.scan_reversed(_PAWN_ATTACKS[turn][from_square] & targets):
+                if _BB[to_square] & last_rank:
+                    for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        append(from_square | to_square << 6 | promotion << 12)
+                else:
+                    append(from_square | to_square << 6)
+        for to_square in chess.scan_reversed(single):
+            from_square = to_square - forward
+            if _BB[to_square] & last_rank:
+                for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                    append(from_square | to_square << 6 | promotion << 12)
+            else:
+                append(from_square | to_square << 6)
+        for to_square in chess.scan_reversed(double):
+            append(to_square - 2 * forward | to_square << 6)
+
+        # Castling: rights, empty squares in between, no check on the king's way
+        castling = self.castling & us
+        if castling:
+            back_rank = 0 if turn else 56
+            opponent = turn ^ 1
+            if (castling & _BB[back_rank + 7] and not occupied & (_BB[back_rank + 5] | _BB[back_rank + 6])
+                    and not self.is_attacked(king, opponent) and not self.is_attacked(back_rank + 5, opponent)
+                    and not self.is_attacked(back_rank + 6, opponent)):
+                append(king | back_rank + 6 << 6)
+            if (castling & _BB[back_rank] and not occupied & (_BB[back_rank + 1] | _BB[back_rank + 2] | _BB[back_rank + 3])
+                    and not self.is_attacked(king, opponent) and not self.is_attacked(back_rank + 3, opponent)
+                    and not self.is_attacked(back_rank + 2, opponent)):
+                append(king | back_rank + 2 << 6)
+
+        return moves
+
+    def make(self, move):
+        """
+        Play a pseudo-legal move int, saving what unmake needs to take it back.
+        """
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        promotion = move >> 12
+        squares = self.squares
+        pieces = self.pieces
+        occupied_co = self.occupied_co
+        color = self.turn
+        piece = squares[from_square]
+        piece_type = piece & 7
+        captured = squares[to_square]
+        ep_square = self.ep_square
+        castling = self.castling
+        self.stack.append((move, captured, castling, ep_square, self.halfmove_clock, self.key))
+
+        key = self.key ^ self._ep_key() ^ _TURN_KEY
+        from_bb = _BB[from_square]
+        to_bb = _BB[to_square]
+
+        pieces[piece_type] ^= from_bb
+        occupied_co[color] ^= from_bb
+        squares[from_square] = 0
+        key ^= _PIECE_KEYS[piece][from_square]
+
+        if captured:
+            pieces[captured & 7] ^= to_bb
+            occupied_co[color ^ 1] ^= to_bb
+            key ^= _PIECE_KEYS[captured][to_square]
+        elif piece_type == PAWN and to_square == ep_square:
+            captured_square = to_square - 8 if color else to_square + 8
+            captured_bb = _BB[captured_square]
+            pieces[PAWN] ^= captured_bb
+            occupied_co[color ^ 1] ^= captured_bb
+            key ^= _PIECE_KEYS[squares[captured_square]][captured_square]
+            squares[captured_square] = 0
+
+        placed = promotion | color << 3 if promotion else piece
+        pieces[placed & 7] |= to_bb
+        occupied_co[color] |= to_bb
+        squares[to_square] = placed
+        key ^= _PIECE_KEYS[placed][to_square]
+
+        if piece_type == KING and (to_square - from_square == 2 or from_square - to_square == 2):
+            if to_square > from_square:
+                rook_from, rook_to = to_square + 1, to_square - 1
+            else:
+                rook_from, rook_to = to_square - 2, to_square + 1
+            rook = squares[rook_from]
+            rook_bb = _BB[rook_from] | _BB[rook_to]
+            pieces[ROOK] ^= rook_bb
+            occupied_co[color] ^= rook_bb
+            squares[rook_from] = 0
+            squares[rook_to] = rook
+            key ^= _PIECE_KEYS[rook][rook_from] ^ _PIECE_KEYS[rook][rook_to]
+
+        if castling:
+            self.castling = castling & ~(_RIGHTS_LOST[from_square] | _RIGHTS_LOST[to_square])
+            if self.castling != castling:
+                key ^= _castling_key(castling) ^ _castling_key(self.castling)
+
+        if piece_type == PAWN:
+            self.halfmove_clock = 0
+            self.ep_square = (from_square + to_square) >> 1 if to_square - from_square in (16, -16) else None
+        else:
+            self.halfmove_clock = 0 if captured else self.halfmove_clock + 1
+            self.ep_square = None
+        if not color:
+            self.fullmove_number += 1
+        self.turn = color ^ 1
+
+        self.key = key ^ self._ep_key()
+
+    def unmake(self):
+        """
+        Take back the last move played with make.
+        """
+        move, captured, castling, ep_square, halfmove_clock, key = self.stack.pop()
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        squares = self.squares
+        pieces = self.pieces
+        occupied_co = self.occupied_co
+        color = self.turn ^ 1
+        placed = squares[to_square]
+        piece = PAWN | color << 3 if move >> 12 else placed
+        piece_type = piece & 7
+        from_bb = _BB[from_square]
+        to_bb = _BB[to_square]
+
+        pieces[placed & 7] ^= to_bb
+        occupied_co[color] ^= to_bb
+        squares[to_square] = captured
+        pieces[piece_type] |= from_bb
+        occupied_co[color] |= from_bb
+        squares[from_square] = piece
+
+        if captured:
+            pieces[captured & 7] |= to_bb
+            occupied_co[color ^ 1] |= to_bb
+        elif piece_type == PAWN and to_square == ep_square:
+            captured_square = to_square - 8 if color else to_square + 8
+            captured_bb = _BB[captured_square]
+            pieces[PAWN] |= captured_bb
+            occupied_co[color ^ 1] |= captured_bb
+            squares[captured_square] = PAWN | (color ^ 1) << 3
+        elif piece_type == KING and (to_square - from_square == 2 or from_square - to_square == 2):
+            if to_square > from_square:
+                rook_from, rook_to = to_square + 1, to_square - 1
+            else:
+                rook_from, rook_to = to_square - 2, to_square + 1
+            rook_bb = _BB[rook_from] | _BB[rook_to]
+            pieces[ROOK] ^= rook_bb
+            occupied_co[color] ^= rook_bb
+            squares[rook_from] = squares[rook_to]
+            squares[rook_to] = 0
+
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        if not color:
+            self.fullmove_number -= 1
+        self.turn = color
+        self.key = key
+
+    def _attackers(self, square, by, occupied):
+        """
+        Squares of color by's pieces attacking square, on occupancy occupied.
+        """
+        pieces = self.pieces
+        queens = pieces[QUEEN]
+
+        return ((_KNIGHT_ATTACKS[square] & pieces[KNIGHT] | _KING_ATTACKS[square] & pieces[KING]
+                 | _PAWN_ATTACKS[by ^ 1][square] & pieces[PAWN]
+                 | (_RANK_ATTACKS[square][_RANK_MASKS[square] & occupied]
+                    | _FILE_ATTACKS[square][_FILE_MASKS[square] & occupied]) & (pieces[ROOK] | queens)
+                 | _DIAG_ATTACKS[square][_DIAG_MASKS[square] & occupied] & (pieces[BISHOP] | queens))
+                & self.occupied_co[by])
+
+    def legal_moves(self):
+        """
+        Legal moves of the side to move, as a list of move ints.
+
+        Pseudo-legal moves are filtered with the checkers and the pieces pinned to the
+        king, so that only en-passant captures need to be played to be checked.
+        """
+        color = self.turn
+        opponent = color ^ 1
+        pieces = self.pieces
+        us = self.occupied_co[color]
+        them = self.occupied_co[opponent]
+        occupied = us | them
+        king = (pieces[KING] & us).bit_length() - 1
+        king_bb = _BB[king]
+        checkers = self._attackers(king, opponent, occupied)
+
+        # Pieces pinned to the king: our only piece between the king and a slider
+        pinned = 0
+        snipers = ((_RANK_ATTACKS[king][0] | _FILE_ATTACKS[king][0]) & (pieces[ROOK] | pieces[QUEEN])
+                   | _DIAG_ATTACKS[king][0] & (pieces[BISHOP] | pieces[QUEEN])) & them
+        for sniper in chess.scan_reversed(snipers):
+            between = _BETWEEN[king][sniper] & occupied
+            if between and not between & (between - 1) and between & us:
+                pinned |= between
+
+        # With a single checker, other pieces must capture it or block
+        if checkers:
+            if checkers & (checkers - 1):
+                evasions = 0
+            else:
+                evasions = checkers | _BETWEEN[king][checkers.bit_length() - 1]
+
+        legal = []
+        append = legal.append
+        ep_square = self.ep_square
+        occupied_without_king = occupied & ~king_bb
+        for move in self.generate_moves():
+            from_square = move & 63
+            to_square = move >> 6 & 63
+            if from_square == king:
+                if to_square - from_square in (2, -2) or not self._attackers(to_square, opponent,
+                                                                             occupied_without_king):
+                    append(move)
+            elif to_square == ep_square and self.squares[from_square] & 7 == PAWN:
+                self.make(move)
+                if not self.is_attacked(king, opponent):
+                    append(move)
+                self.unmake()
+            elif ((not checkers or _BB[to_square] & evasions)
+                  and (not pinned & _BB[from_square] or _RAYS[king][from_square] & _BB[to_square])):
+                append(move)
+
+        return legal
+
+    def perft(self, depth):
+        """
+        Number of legal move sequences of length depth from the position.
+        """
+        moves = self.legal_moves()
+        if depth <= 1:
+            return len(moves) if depth == 1 else 1
+
+        nodes = 0
+        for move in moves:
+            self.make(move)
+            nodes += self.perft(depth - 1)
+            self.unmake()
+
+        return nodes
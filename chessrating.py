@@ -0,0 +1,219 @@
+import math
+from statistics import NormalDist
+
+import chesstournament
+
+def score_from_elo(elo):
+    """
+    Expected score of a player elo points stronger than its opponent (logistic model).
+    """
+    return 1 / (1 + 10 ** (-elo / 400))
+
+def elo_from_score(score):
+    """
+    Elo difference corresponding to an expected score (inverse of score_from_elo).
+    """
+    score = min(max(score, 1e-6), 1 - 1e-6)
+
+    return -400 * math.log10(1 / score - 1)
+
+def game_score(game_result, side):
+    """
+    Score (1, 0.5 or 0) of the player who had side ('white' or 'black') in a game with
+    result string game_result, or None if the game has no result (harness error).
+    """
+    if game_result.startswith('Draw'):
+        return 0.5
+    elif game_result.startswith(f'Win {side}'):
+        return 1.
+    elif game_result.startswith('Win'):
+        return 0.
+
+    return None
+
+class MatchStats:
+    """
+    Running win/draw/loss count of player A against player B, with Elo estimate and
+    sequential probability ratio test (SPRT).
+    """
+    def __init__(self):
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def add(self, score):
+        """
+        Add one game with A's score (1, 0.5 or 0).
+        """
+        if score == 1:
+            self.wins += 1
+        elif score == 0.5:
+            self.draws += 1
+        elif score == 0:
+            self.losses += 1
+
+    def score(self, prior=0.):
+        """
+        Mean score of A and the variance of a single game's score, with prior pseudo
+        games added to each of wins, draws and losses.
+        """
+        n = max(1e-9, self.games + 3 * prior)
+        w, d, l = (self.wins + prior) / n, (self.draws + prior) / n, (self.losses + prior) / n
+        s = w + d / 2
+        var = w * (1 - s) ** 2 + d * (0.5 - s) ** 2 + l * s ** 2
+
+        return s, var
+
+    def elo(self, z=1.96):
+        """
+        Elo of A relative to B and the half-width of its confidence interval (z=1.96
+        for 95%).
+        """
+        s, var = self.score()
+        s_error = z * math.sqrt(var / max(1, self.games))
+        elo = elo_from_score(s)
+        error = (elo_from_score(min(s + s_error, 1)) - elo_from_score(max(s - s_error, 0))) / 2
+
+        return elo, error
+
+    def llr(self, elo0, elo1):
+        """
+        Log-likelihood ratio of H1 (A is elo1 stronger) against H0 (A is elo0 stronger),
+        in the generalized SPRT's normal approximation of the trinomial model.
+        """
+        if self.games == 0:
+            return 0.
+
+        # The mean score is the games'; only the variance takes half a pseudo game of
+        # each outcome, which keeps it finite after e.g. a run of wins only
+        s = self.score()[0]
+        var = self.score(prior=0.5)[1]
+
+        s0, s1 = score_from_elo(elo0), score_from_elo(elo1)
+
+        return self.games * (s1 - s0) * (2 * s - s0 - s1) / (2 * var)
+
+def sprt_bounds(alpha=0.05, beta=0.05):
+    """
+    LLR bounds (lower, upper) of an SPRT with false positive rate alpha and false
+    negative rate beta.
+    """
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+def sprt_decision(stats, elo0=0, elo1=10, alpha=0.05, beta=0.05):
+    """
+    'H1' if stats accept that A is elo1 stronger, 'H0' if they accept elo0, None if the
+    test needs more games.
+    """
+    lower, upper = sprt_bounds(alpha, beta)
+    llr = stats.llr(elo0, elo1)
+    if llr >= upper:
+        return 'H1'
+    elif llr <= lower:
+        return 'H0'
+
+    return None
+
+def fixed_games(elo0=0, elo1=10, alpha=0.05, beta=0.05, draw_ratio=0.):
+    """
+    Number of games a fixed-length match needs to tell elo0 from elo1 with the same
+    error rates as the SPRT (one-sided z-test on the mean score).
+    """
+    s0, s1 = score_from_elo(elo0), score_from_elo(elo1)
+    s = (s0 + s1) / 2
+    # Per-game variance with the given fraction of draws and the rest wins/losses
+    w = s - draw_ratio / 2
+    var = w * (1 - s) ** 2 + draw_ratio * (0.5 - s) ** 2 + (1 - w - draw_ratio) * s ** 2
+    z = NormalDist().inv_cdf(1 - alpha) + NormalDist().inv_cdf(1 - beta)
+
+    return math.ceil(var * (z / (s1 - s0)) ** 2)
+
+def run_match(PlayerA, PlayerB, elo0=0, elo1=10, alpha=0.05, beta=0.05, max_games=10000,
+              n_workers=1, seed=0, openings=None, verbose=False, **kwargs):
+    """
+    Play PlayerA against PlayerB, alternating colors, until an SPRT of elo0 against
+    elo1 (Elo of A relative to B) decides or max_games are played.
+
+    ----------
+    Parameters
+    ----------
+    PlayerA: Class
+      Player class being tested.
+
+    PlayerB: Class
+      Reference player class.
+
+    elo0, elo1: float (default: 0, 10)
+      Elo of A relative to B under H0 and H1.
+
+    alpha, beta: float (default: 0.05, 0.05)
+      False positive and false negative rates of the test.
+
+    max_games: int (default: 10000)
+      Games after which the match stops undecided.
+
+    n_workers: int (default: 1)
+      Number of worker processes; with 1 the games are played in this process.
+
+    seed: int (default: 0)
+      Base random seed; game i is played with seed + i.
+
+    openings: list of str or Board (default: None)
+      If given, every pair of games starts from the next opening, once with each
+      color (see chesstournament.paired_jobs); the list is cycled if it is too short.
+
+    verbose: bool (default: False)
+      If True, print the running Elo and LLR after every game.
+
+    **kwargs:
+      Any other keyword arguments of play_game, shared by every game.
+
+    -------
+    Returns
+    -------
+    match: dict
+      'decision' ('H0', 'H1' or None), 'games', 'wins', 'draws', 'losses' (of A),
+      'elo', 'elo_error' (95%), 'llr' and 'bounds'.
+    """
+    stats = MatchStats()
+    if openings is not None:
+        openings = [openings[i % len(openings)] for i in range((max_games + 1) // 2)]
+    # A has white in the even games
+    jobs = chesstournament.match_jobs(PlayerA, PlayerB, max_games, seed, openings, **kwargs)[:max_games]
+
+    if n_workers == 1:
+        results = (chesstournament.play_job(index, job) for index, job in enumerate(jobs))
+    else:
+        results = chesstournament.run_tournament(jobs, n_workers=n_workers)
+
+    decision = None
+    for result in results:
+        side = 'white' if result['index'] % 2 == 0 else 'black'
+        stats.add(game_score(result['game_result'], side))
+
+        decision = sprt_decision(stats, elo0, elo1, alpha, beta)
+        if verbose:
+            elo, error = stats.elo()
+            print(f'{stats.games} games: +{stats.wins} ={stats.draws} -{stats.losses}, '
+                  f'elo {elo:.1f} +/- {error:.1f}, llr {stats.llr(elo0, elo1):.2f}')
+        if decision is not None:
+            break
+
+    if hasattr(results, 'close'):
+        results.close()
+
+    elo, error = stats.elo()
+
+    return {'decision': decision,
+            'games': stats.games,
+            'wins': stats.wins,
+            'draws': stats.draws,
+            'losses': stats.losses,
+            'elo': elo,
+            'elo_error': error,
+            'llr': stats.llr(elo0, elo1),
+            'bounds': sprt_bounds(alpha, beta)}
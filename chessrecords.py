@@ -0,0 +1,245 @@
+import json
+import time
+import chess
+import chess.pgn
+
+class RecordWriter:
+    """
+    Appends JSON Lines records to a file in batches: lines are buffered and written
+    (and flushed) every batch_size records or flush_interval seconds, whichever comes
+    first, so a crash loses at most one batch while a ply costs only a list append.
+    """
+    def __init__(self, path, batch_size=32, flush_interval=1.):
+        """
+        path: str
+          File to append to (created if needed).
+
+        batch_size: int (default: 32)
+          Max. number of records buffered before they are written.
+
+        flush_interval: float (default: 1.)
+          Max. time in seconds a record stays buffered.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.f = open(path, 'a')
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def append(self, record):
+        """
+        Buffer one record (a JSON-serializable dict).
+        """
+        self.buffer.append(json.dumps(record, separators=(',', ':')))
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush > self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write out the buffered records.
+        """
+        if len(self.buffer) > 0:
+            self.f.write('\n'.join(self.buffer) + '\n')
+            self.buffer = []
+        self.f.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        """
+        Write out the buffered records and close the file.
+        """
+        try:
+            self.flush()
+        finally:
+            self.f.close()
+
+class GameRecord:
+    """
+    Structured record of a game: setup, one entry per ply and the result. Plies are
+    streamed to an optional RecordWriter as soon as they are complete, i.e. once the
+    next move is added or the game finishes (events such as draw offers or trash talk
+    that follow a move belong to its ply).
+
+    Each ply is a dict {'ply': int, 'side': 'white' or 'black', 'move': str in UCI,
+    't': thinking time in sec, 'events': list of [side, text]}.
+    """
+    def __init__(self, setup, writer=None):
+        """
+        setup: dict
+          Game metadata. play_game stores 'white', 'black' (player names), 'init_fen'
+          and the time-control arguments.
+
+        writer: RecordWriter (default: None)
+          If given, the setup, each completed ply and the result are appended to it.
+        """
+        self.setup = setup
+        self.plies = []
+        self.game_result = None
+        self.clocks = None
+        self.writer = writer
+
+        if self.writer is not None:
+            self.writer.append(dict(type='setup', **setup))
+
+    @property
+    def result(self):
+        """
+        Result string of the game, e.g. 'Win white:checkmate' (None while it runs).
+        """
+        return self.game_result
+
+    def add_move(self, side, move, t):
+        """
+        Start a new ply with side playing move after t seconds of thought. The move is
+        logged as a string even if the player returned something else (the referee then
+        rejects it as invalid), so that recording never changes the game.
+        """
+        if self.writer is not None and len(self.plies) > 0:
+            self.writer.append(dict(type='ply', **self.plies[-1]))
+
+        if move is not None and not isinstance(move, str):
+            move = str(move)
+        self.plies.append({'ply': len(self.plies) + 1, 'side': side, 'move': move, 't': t, 'events': []})
+
+    def add_event(self, side, text):
+        """
+        Attach an event (e.g. 'offers draw', 'says:...') by side to the current ply.
+        """
+        self.plies[-1]['events'].append([side, text])
+
+    def finish(self, game_result, clocks=None):
+        """
+        Record the result (and optionally the time each side spent per phase, as
+        {side: {phase: sec}}) and write out everything still buffered.
+        """
+        self.game_result = game_result
+        self.clocks = clocks
+
+        if self.writer is not None:
+            try:
+                if len(self.plies) > 0:
+                    self.writer.append(dict(type='ply', **self.plies[-1]))
+                self.writer.append({'type': 'result', 'game_result': game_result, 'clocks': clocks})
+            finally:
+                self.writer.close()
+                self.writer = None
+
+    def moves(self):
+        """
+        List of the moves played, in UCI.
+        """
+        return [ply['move'] for ply in self.plies if ply['move'] is not None]
+
+    def to_text(self, fname=None):
+        """
+        Game in the plain-text log format (--Setup--, --Time Control--, --Game--).
+        """
+        text = '--Setup--\n'
+        text += f'fname:{fname}\n'
+        text += f"white:{self.setup.get('white')}\n"
+        text += f"black:{self.setup.get('black')}\n"
+        text += f"init_fen:{self.setup.get('init_fen')}\n"
+        text += f'game_result:{self.game_result}\n'
+        text += '--Time Control--\n'
+
+        for key in ('max_time_per_move_white', 'max_time_per_move_black',
+                    'time_control_white', 'time_control_black',
+                    'draw_time_white', 'draw_time_black',
+                    'trash_talk_time_white', 'trash_talk_time_black'):
+            value = self.setup.get(key)
+            if isinstance(value, list): # JSON turns tuples into lists
+                value = tuple(value)
+            text += f'{key}:{value}\n'
+        text += '--Game--\n'
+
+        text += self.move_log()
+
+        return text
+
+    def move_log(self):
+        """
+        The --Game-- section of the plain-text log format.
+        """
+        lines = []
+        for ply in self.plies:
+            if ply['move'] is not None:
+                lines.append(f"{ply['side']} t={ply['t']} | move:{ply['move']}\n")
+            for side, text in ply['events']:
+                lines.append(f'{side} | {text}\n')
+
+        return ''.join(lines)
+
+    def to_pgn(self):
+        """
+        Game in PGN, with each move's thinking time as an [%emt] comment.
+        """
+        board = chess.Board(self.setup.get('init_fen', chess.STARTING_FEN))
+        game = chess.pgn.Game()
+        game.headers['Event'] = 'chessbattle'
+        game.headers['White'] = str(self.setup.get('white'))
+        game.headers['Black'] = str(self.setup.get('black'))
+        if board.fen() != chess.STARTING_FEN:
+            game.setup(board)
+
+        if self.game_result is None:
+            game.headers['Result'] = '*'
+        elif self.game_result.startswith('Draw'):
+            game.headers['Result'] = '1/2-1/2'
+        elif self.game_result.startswith('Win white'):
+            game.headers['Result'] = '1-0'
+        else:
+            game.headers['Result'] = '0-1'
+        if self.game_result is not None:
+            game.headers['Termination'] = self.game_result.split(':', 1)[-1]
+
+        node = game
+        for ply in self.plies:
+            if ply['move'] is None:
+                continue
+            try:
+                move = chess.Move.from_uci(ply['move'])
+            except ValueError:
+                break
+            if not board.is_legal(move): # the invalid or illegal move that ended the game
+                break
+            board.push(move)
+            node = node.add_variation(move)
+            if ply['t'] is not None:
+                hours, rest = divmod(ply['t'], 3600)
+                minutes, seconds = divmod(rest, 60)
+                node.comment = f'[%emt {int(hours)}:{int(minutes):02d}:{seconds:06.3f}]'
+
+        return str(game)
+
+def load_record(path):
+    """
+    Read a game written by play_game(write_record=...) back into a GameRecord. A game
+    cut short by a crash loads with every ply flushed so far and result None.
+    """
+    record = None
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError: # torn last line
+                break
+
+            kind = entry.pop('type')
+            if kind == 'setup':
+                record = GameRecord(entry)
+            elif kind == 'ply':
+                record.plies.append(entry)
+            elif kind == 'result':
+                record.game_result = entry['game_result']
+                record.clocks = entry.get('clocks')
+
+    return record
+
+def write_pgn(record, path):
+    """
+    Append a GameRecord to a PGN file.
+    """
+    with open(path, 'a') as f:
+        f.write(record.to_pgn() + '\n\n')
@@ -0,0 +1,368 @@
+import chess
+import chess.polyglot
+
+import chessbitbase
+import chessengines
+from chesslogs import WHITE, BLACK, DRAW
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_CASTLING_KEYS = ((chess.BB_H1, _RANDOM[768]), (chess.BB_A1, _RANDOM[769]),
+                  (chess.BB_H8, _RANDOM[770]), (chess.BB_A8, _RANDOM[771]))
+
+def _piece_key(piece_type, color, square):
+    """
+    Zobrist key of a piece on a square (polyglot layout).
+    """
+    return _RANDOM[64 * ((piece_type - 1) * 2 + int(color)) + square]
+
+class Referee:
+    """
+    Incremental game-over detection for play_game.
+
+    Each move is parsed and checked for legality once. The referee then keeps a
+    Zobrist hash of the position, updated per move, and counts the positions seen
+    since the last irreversible move in a table. Fivefold repetition is therefore a
+    dict lookup rather than a replay of the move stack. The halfmove clock comes from
+    the board, and insufficient material is only re-checked after captures and
+    promotions. Once the game is over, the result string is built exactly as
+    play_game always has, so results do not change.
+
+    Repetitions follow python-chess: the hash covers the pieces, side to move,
+    castling rights and the en-passant square only when an en-passant capture is
+    legal.
+    """
+    def __init__(self, board):
+        """
+        board: Board
+          Board of the game; the referee pushes the moves onto it.
+        """
+        self.board = board
+        self.key = self.zobrist(board)
+        self.counts = {self.key: 1}
+        self.insufficient = board.is_insufficient_material()
+        self.rights_key = self._castling_key(board)
+        self.ep_key = self._ep_key(board)
+
+        # Positions the board's move stack went through since its last irreversible move
+        history = board.copy()
+        while history.move_stack:
+            move = history.pop()
+            if history.is_irreversible(move):
+                break
+            key = self.zobrist(history)
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    @staticmethod
+    def zobrist(board):
+        """
+        Zobrist hash of a position from scratch.
+        """
+        key = 0
+        for square, piece in board.piece_map().items():
+            key ^= _piece_key(piece.piece_type, piece.color, square)
+
+        return key ^ Referee._castling_key(board) ^ Referee._ep_key(board) ^ (_RANDOM[780] if board.turn else 0)
+
+    @staticmethod
+    def _castling_key(board):
+        rights = board.clean_castling_rights()
+        key = 0
+        for mask, random in _CASTLING_KEYS:
+            if rights & mask:
+                key ^= random
+
+        return key
+
+    @staticmethod
+    def _ep_key(board):
+        if board.ep_square is not None and board.has_legal_en_passant():
+            return _RANDOM[772 + chess.square_file(board.ep_square)]
+
+        return 0
+
+    def push_uci(self, uci, mover, opponent):
+        """
+        Validate and play the move uci by side mover against side opponent ('white' or
+        'black'). Returns None if the game goes on, and otherwise the game_result string
+        (e.g. 'Win black:illegal move', 'Win white:checkmate', 'Draw:stalemate').
+        """
+        board = self.board
+        try:
+            move = chess.Move.from_uci(uci)
+        except: # invalid move
+            return f'Win {opponent}:invalid move'
+
+        if not board.is_legal(move): # illegal move
+            return f'Win {opponent}:illegal move'
+
+        # Update the hash with everything but castling rights and en passant, which are
+        # easier to read off the board after the move
+        key = self.key ^ self.rights_key ^ self.ep_key ^ _RANDOM[780]
+        color = board.turn
+        piece_type = board.piece_type_at(move.from_square)
+        key ^= _piece_key(piece_type, color, move.from_square)
+        to_square = move.to_square
+
+        irreversible = piece_type == chess.PAWN
+        material_changed = move.promotion is not None
+        if board.is_castling(move):
+            if board.chess960:
+                return self._push_slow(move, mover, opponent)
+            # The king lands on the g or c file, also when the move is given as king
+            # takes rook (e1h1 for e1g1)
+            rank = chess.square_rank(move.from_square)
+            if board.is_kingside_castling(move):
+                to_square, rook_from, rook_to = chess.square(6, rank), chess.square(7, rank), chess.square(5, rank)
+            else:
+                to_square, rook_from, rook_to = chess.square(2, rank), chess.square(0, rank), chess.square(3, rank)
+            key ^= _piece_key(chess.ROOK, color, rook_from) ^ _piece_key(chess.ROOK, color, rook_to)
+        elif board.is_en_passant(move):
+            captured_square = move.to_square - 8 if color else move.to_square + 8
+            key ^= _piece_key(chess.PAWN, not color, captured_square)
+            material_changed = True
+        else:
+            captured = board.piece_type_at(move.to_square)
+            if captured is not None:
+                key ^= _piece_key(captured, not color, move.to_square)
+                irreversible = True
+                material_changed = True
+        key ^= _piece_key(move.promotion or piece_type, color, to_square)
+
+        rights = board.clean_castling_rights()
+        board.push(move)
+        if board.clean_castling_rights() != rights:
+            self.rights_key = self._castling_key(board)
+            irreversible = True
+        self.ep_key = self._ep_key(board) if board.ep_square is not None else 0
+        key ^= self.rights_key ^ self.ep_key
+
+        self.key = key
+        if irreversible: # earlier positions can never come back
+            self.counts = {}
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if material_changed:
+            self.insufficient = board.is_insufficient_material()
+
+        return self._game_over(mover)
+
+    def _push_slow(self, move, mover, opponent):
+        """
+        push_uci for moves the incremental hash does not handle (Chess960 castling).
+        """
+        board = self.board
+        board.push(move)
+        self.key = self.zobrist(board)
+        self.counts = {self.key: 1}
+        self.insufficient = board.is_insufficient_material()
+        self.rights_key = self._castling_key(board)
+        self.ep_key = self._ep_key(board)
+
+        return self._game_over(mover)
+
+    def _game_over(self, mover):
+        """
+        Game-over check after a move by side mover (same conditions as
+        board.is_game_over()).
+        """
+        board = self.board
+        if not (self.insufficient or self.counts[self.key] >= 5 or board.halfmove_clock >= 150
+                or not any(board.generate_legal_moves())):
+            return None
+
+        # The game is over: name the result as play_game always has (a later condition
+        # overrides an earlier one)
+        game_result = None
+        if board.is_checkmate():
+            game_result = f'Win {mover}:checkmate'
+        if board.is_stalemate():
+            game_result = 'Draw:stalemate'
+        if board.is_insufficient_material():
+            game_result = 'Draw:insufficient material'
+        if board.can_claim_threefold_repetition():
+            game_result = 'Draw:threefold repetition'
+        if board.can_claim_fifty_moves():
+            game_result = 'Draw:fifty-move rule'
+
+        return game_result
+
+# Centipawn value of a mate score
+MATE_CP = 100000
+
+class Adjudicator:
+    """
+    Ends decided games early, from a score after every move (centipawns, for white).
+
+    Resignation: when the score stays at or beyond +resign_cp (or -resign_cp) for
+    resign_plies consecutive scored plies, the side ahead wins with 'Win
+    white:adjudication' ('Win black:adjudication'). Draw: when |score| stays within
+    draw_cp for draw_plies consecutive scored plies, once move draw_after has been
+    played, the game is drawn with 'Draw:adjudication'.
+
+    The scores come from a referee engine (a UCI engine from chessengines searching
+    each position to the given depth, nodes or movetime), or else from the players:
+    the 'cp' or 'mate' of the last_info that players such as chessbots.SampleStockfish
+    and chessbots.SampleAlphaBeta keep for their last move. Plies without a score
+    (e.g. moves of a player that reports none) are skipped rather than counted. Should
+    the referee engine fail (e.g. its process dies), it goes back to its pool, which
+    discards it, and the rest of the game is played without score adjudication. The
+    engine is checked out by start() (or start_async(), which does not block the event
+    loop) and awaited at most acquire_timeout sec, like chessbots.SampleStockfish.
+
+    With bitbases, a game that reaches an endgame of chessbitbase.ENDGAMES ends at
+    once with its exact result: 'Win white:bitbase', 'Win black:bitbase' or
+    'Draw:bitbase'.
+    """
+    acquire_timeout = 60.
+
+    def __init__(self, resign_cp=None, resign_plies=8, draw_cp=None, draw_plies=12, draw_after=40,
+                 engine=None, depth=10, nodes=None, movetime=None, bitbases=None):
+        """
+        resign_cp: int (default: None)
+          Score (cp) beyond which the side behind is resigned; None for no resignations.
+
+        resign_plies: int (default: 8)
+          Consecutive scored plies the score must stay beyond resign_cp.
+
+        draw_cp: int (default: None)
+          Score (cp) within which the game is drawn; None for no draws.
+
+        draw_plies: int (default: 12)
+          Consecutive scored plies the score must stay within draw_cp.
+
+        draw_after: int (default: 40)
+          Move number after which draws are adjudicated.
+
+        engine: str (default: None)
+          Path to the referee engine ('stockfish' for chessengines.find_stockfish()),
+          checked out of its chessengines pool for the game by start(). None to use the
+          scores the players report.
+
+        depth, nodes, movetime: int (default: 10, None, None)
+          Search limits of the referee engine (movetime in ms).
+
+        bitbases: bool or str (default: None)
+          True (or a directory of tables) to adjudicate endgames with
+          chessbitbase.load().
+        """
+        self.resign_cp = resign_cp
+        self.resign_plies = resign_plies
+        self.draw_cp = draw_cp
+        self.draw_plies = draw_plies
+        self.draw_after = draw_after
+        self.depth = depth
+        self.nodes = nodes
+        self.movetime = movetime
+        self.scoring = resign_cp is not None or draw_cp is not None
+        if bitbases:
+            self.bitbases = chessbitbase.load(bitbases if isinstance(bitbases, str) else None)
+        else:
+            self.bitbases = None
+
+        self.pool = None
+        self.engine = None
+        if engine is not None:
+            path = chessengines.find_stockfish() if engine == 'stockfish' else engine
+            self.pool = chessengines.get_pool(path)
+
+        self.scores = []
+        self.white_plies = 0
+        self.black_plies = 0
+        self.drawn_plies = 0
+
+    def start(self):
+        """
+        Check the referee engine (if any) out of its pool.
+        """
+        if self.pool is not None and self.engine is None:
+            self.engine = self.pool.acquire(timeout=self.acquire_timeout)
+
+    async def start_async(self):
+        """
+        start() without blocking the event loop while the pool has no free engine.
+        """
+        if self.pool is not None and self.engine is None:
+            self.engine = await self.pool.acquire_async(timeout=self.acquire_timeout)
+
+    @staticmethod
+    def info_score(info, color):
+        """
+        Score (cp, for white) of a UCI info dict of the side of color (True for white)
+        with 'cp' or 'mate' keys, or None.
+        """
+        if not info:
+            return None
+        if 'mate' in info:
+            cp = MATE_CP if info['mate'] > 0 else -MATE_CP
+        elif 'cp' in info:
+            cp = info['cp']
+        else:
+            return None
+
+        return cp if color else -cp
+
+    def evaluate(self, board):
+        """
+        Score (cp, for white) of board by the referee engine, or None if it has none
+        or fails, which also turns score adjudication off.
+        """
+        try:
+            _, lines = self.engine.go(f'fen {board.fen()}', movetime=self.movetime, depth=self.depth,
+                                      nodes=self.nodes)
+        except (RuntimeError, OSError): # the engine died
+            self.close()
+            self.scoring = False
+            return None
+        for line in reversed(lines):
+            if line.startswith('info') and ' score ' in line:
+                return self.info_score(chessengines.parse_info(line), board.turn)
+
+        return None
+
+    def known(self, board):
+        """
+        Result string of board from the bitbases, or None if they do not cover it.
+        """
+        if self.bitbases is None or chess.popcount(board.occupied) != 3:
+            return None
+
+        result = self.bitbases.probe(board)
+        if result == WHITE:
+            return 'Win white:bitbase'
+        elif result == BLACK:
+            return 'Win black:bitbase'
+        elif result == DRAW:
+            return 'Draw:bitbase'
+
+        return None
+
+    def update(self, board, cp):
+        """
+        Take the score cp (for white, or None) of board after a move; returns the
+        adjudicated result string, or None if the game goes on.
+        """
+        if cp is None:
+            return None
+
+        self.scores.append((len(board.move_stack), cp))
+        if self.resign_cp is not None:
+            self.white_plies = self.white_plies + 1 if cp >= self.resign_cp else 0
+            self.black_plies = self.black_plies + 1 if cp <= -self.resign_cp else 0
+            if self.white_plies >= self.resign_plies:
+                return 'Win white:adjudication'
+            if self.black_plies >= self.resign_plies:
+                return 'Win black:adjudication'
+
+        if self.draw_cp is not None and board.fullmove_number > self.draw_after:
+            self.drawn_plies = self.drawn_plies + 1 if abs(cp) <= self.draw_cp else 0
+            if self.drawn_plies >= self.draw_plies:
+                return 'Draw:adjudication'
+
+        return None
+
+    def close(self):
+        """
+        Return the referee engine to its pool.
+        """
+        if self.engine is not None:
+            self.pool.release(self.engine)
+            self.engine = None
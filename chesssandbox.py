@@ -0,0 +1,241 @@
+import time
+import multiprocessing
+from func_timeout import FunctionTimedOut
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+class _Self:
+    """
+    Placeholder for the player instance in calls sent to a player process.
+    """
+    pass
+
+_SELF = _Self()
+
+class RemoteMethod:
+    """
+    Method of the player living in a PlayerProcess, by name (so that it can be sent
+    over the pipe).
+    """
+    def __init__(self, name):
+        self.name = name
+
+def _resolve(obj, player):
+    """
+    Replace placeholders in a call received by a player process with the player and
+    its methods.
+    """
+    if obj is _SELF or isinstance(obj, _Self):
+        return player
+    elif isinstance(obj, RemoteMethod):
+        return getattr(player, obj.name)
+    elif isinstance(obj, tuple):
+        return tuple(_resolve(item, player) for item in obj)
+
+    return obj
+
+def _set_limits(cpu_time, memory_mb):
+    """
+    Apply the resource limits of a player process (POSIX only).
+    """
+    if resource is None:
+        return
+
+    if cpu_time is not None:
+        # SIGXCPU at the soft limit, SIGKILL one second later
+        cpu_time = int(cpu_time) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_time, cpu_time + 1))
+    if memory_mb is not None:
+        memory = int(memory_mb * 2 ** 20)
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+def _error(e):
+    """
+    An exception that can be sent back over the pipe.
+    """
+    try:
+        multiprocessing.reduction.ForkingPickler.dumps(e)
+        return e
+    except Exception:
+        return RuntimeError(f'{type(e).__name__}: {e}')
+
+def _serve(conn, player_class, kwargs, cpu_time, memory_mb):
+    """
+    Main loop of a player process: build the player, then run calls until told to
+    close or until the pipe is closed.
+    """
+    _set_limits(cpu_time, memory_mb)
+
+    try:
+        player = player_class(**kwargs)
+    except BaseException as e:
+        conn.send(('error', _error(e)))
+        return
+    conn.send(('ready', player.name))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+
+        if message is None: # close
+            if hasattr(player, 'close'):
+                try:
+                    player.close()
+                except Exception:
+                    pass
+            conn.send(None)
+            return
+
+        call_id, func, args = message
+        try:
+            reply = (call_id, True, _resolve(func, player)(*_resolve(args, player)))
+        except Exception as e:
+            reply = (call_id, False, _error(e))
+
+        try:
+            conn.send(reply)
+        except Exception as e: # unpicklable result
+            conn.send((call_id, False, _error(e)))
+
+class PlayerProcess:
+    """
+    Player hosted in a subprocess of its own, for play_game(executor='process').
+
+    The instance stands in for the player in the harness: player.name is the remote
+    player's name, any other public attribute is a RemoteMethod, and call(func, args,
+    timeout) runs func(*args) in the subprocess, with the PlayerProcess itself and
+    RemoteMethods in func and args replaced by the real player and its methods. Calls
+    and results travel pickled over a multiprocessing pipe.
+
+    A call that misses its deadline raises FunctionTimedOut, as with a PlayerWorker: the
+    process keeps running it, its late answer is discarded, and the next call queues
+    behind it. A timed-out draw offer or trash talk thus gets its default answer (no
+    draw, no talk) and the game goes on, while a timed-out move loses the game anyway.
+    A process still busy with a timed-out call when it is closed is killed (SIGKILL)
+    at once, which stops a runaway make_move even in C code or a tight loop, instead
+    of leaving it to burn CPU next to later games. CPU and memory rlimits (POSIX)
+    bound the player process; a process that dies (e.g. on SIGXCPU) makes every later
+    call raise RuntimeError, a runtime error in play_game.
+    """
+    def __init__(self, player_class, side, board, max_time_per_move, time_control, cpu_time=None,
+                 memory_mb=None, start_timeout=60):
+        """
+        player_class: Class
+          Player class, instantiated in the subprocess with side, board,
+          max_time_per_move and time_control.
+
+        cpu_time: float (default: None)
+          CPU time limit of the process in sec (RLIMIT_CPU).
+
+        memory_mb: float (default: None)
+          Address-space limit of the process in MB (RLIMIT_AS). The process is forked
+          where possible, so this includes what it inherits from the harness.
+
+        start_timeout: float (default: 60)
+          Time in sec allowed for starting the process and building the player.
+        """
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+
+        self.conn, child_conn = context.Pipe()
+        kwargs = {'side': side, 'board': board, 'max_time_per_move': max_time_per_move,
+                  'time_control': time_control}
+        self.process = context.Process(target=_serve, args=(child_conn, player_class, kwargs, cpu_time, memory_mb),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        self.n_calls = 0
+        self.n_answers = 0
+        self.killed = False
+        self.closed = False
+
+        try:
+            if not self.conn.poll(start_timeout):
+                raise RuntimeError(f'{player_class.__name__} did not start within {start_timeout} s')
+            status, value = self.conn.recv()
+        except (EOFError, OSError):
+            status, value = 'error', RuntimeError(f'{player_class.__name__} process died while starting')
+        except RuntimeError as e:
+            status, value = 'error', e
+        if status == 'error':
+            self.kill()
+            raise value
+
+        self.name = value
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return RemoteMethod(name)
+
+    def call(self, func, args=(), timeout=None):
+        """
+        Run func(*args) in the player process and return its result, raising
+        FunctionTimedOut if it does not answer within timeout seconds.
+        """
+        if self.killed:
+            raise FunctionTimedOut('', timeout, func, args)
+        if not self.process.is_alive():
+            raise RuntimeError(f'player process exited with code {self.process.exitcode}')
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.n_calls += 1
+        call_id = self.n_calls
+        args = tuple(_SELF if arg is self else arg for arg in args)
+        try:
+            self.conn.send((call_id, func, args))
+            while True:
+                remaining = None if deadline is None else max(0., deadline - time.monotonic())
+                if not self.conn.poll(remaining):
+                    raise FunctionTimedOut('', timeout, func, args)
+                result_id, success, value = self.conn.recv()
+                self.n_answers = result_id
+                if result_id == call_id: # else a late answer to a call that already timed out
+                    break
+        except (EOFError, OSError):
+            self.process.join(1)
+            raise RuntimeError(f'player process exited with code {self.process.exitcode}')
+
+        if success:
+            return value
+        raise value
+
+    def kill(self):
+        """
+        Kill the player process at once.
+        """
+        self.killed = True
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+
+    def close(self):
+        """
+        Let the player close (if it has a close method) and the process exit; a process
+        still running a timed-out call, or that does not exit within a second, is
+        killed. Safe to call more than once.
+        """
+        if self.closed:
+            return
+        self.closed = True
+
+        if self.n_answers < self.n_calls:
+            self.kill()
+        if not self.killed and self.process.is_alive():
+            try:
+                self.conn.send(None)
+                if self.conn.poll(1):
+                    self.conn.recv()
+            except (EOFError, OSError):
+                pass
+            self.process.join(1)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
@@ -0,0 +1,685 @@
+import gc
+import os
+import mmap
+import time
+import tempfile
+import numpy as np
+
+import chessposition
+from chessposition import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from chesslogs import WHITE, DRAW, UNKNOWN
+
+# Scores are in centipawns from the side to move's point of view; mate in n plies is
+# MATE - n
+MATE = 100000
+MAX_PLY = 100
+INFINITY = MATE + 1
+
+# Base score of a won endgame by the bitbases, below any mate score
+KNOWN_WIN = 10000
+
+# Bounds of transposition table scores
+EXACT, LOWER, UPPER = 0, 1, 2
+
+PIECE_VALUES = (0, 100, 320, 330, 500, 900, 0)
+
+# Piece-square bonuses for white, rank 8 first (the simplified evaluation function of
+# the Chess Programming Wiki)
+_PIECE_SQUARE = {
+    PAWN: ((0, 0, 0, 0, 0, 0, 0, 0),
+           (50, 50, 50, 50, 50, 50, 50, 50),
+           (10, 10, 20, 30, 30, 20, 10, 10),
+           (5, 5, 10, 25, 25, 10, 5, 5),
+           (0, 0, 0, 20, 20, 0, 0, 0),
+           (5, -5, -10, 0, 0, -10, -5, 5),
+           (5, 10, 10, -20, -20, 10, 10, 5),
+           (0, 0, 0, 0, 0, 0, 0, 0)),
+    KNIGHT: ((-50, -40, -30, -30, -30, -30, -40, -50),
+             (-40, -20, 0, 0, 0, 0, -20, -40),
+             (-30, 0, 10, 15, 15, 10, 0, -30),
+             (-30, 5, 15, 20, 20, 15, 5, -30),
+             (-30, 0, 15, 20, 20, 15, 0, -30),
+             (-30, 5, 10, 15, 15, 10, 5, -30),
+             (-40, -20, 0, 5, 5, 0, -20, -40),
+             (-50, -40, -30, -30, -30, -30, -40, -50)),
+    BISHOP: ((-20, -10, -10, -10, -10, -10, -10, -20),
+             (-10, 0, 0, 0, 0, 0, 0, -10),
+             (-10, 0, 5, 10, 10, 5, 0, -10),
+             (-10, 5, 5, 10, 10, 5, 5, -10),
+             (-10, 0, 10, 10, 10, 10, 0, -10),
+             (-10, 10, 10, 10, 10, 10, 10, -10),
+             (-10, 5, 0, 0, 0, 0, 5, -10),
+             (-20, -10, -10, -10, -10, -10, -10, -20)),
+    ROOK: ((0, 0, 0, 0, 0, 0, 0, 0),
+           (5, 10, 10, 10, 10, 10, 10, 5),
+           (-5, 0, 0, 0, 0, 0, 0, -5),
+           (-5, 0, 0, 0, 0, 0, 0, -5),
+           (-5, 0, 0, 0, 0, 0, 0, -5),
+           (-5, 0, 0, 0, 0, 0, 0, -5),
+           (-5, 0, 0, 0, 0, 0, 0, -5),
+           (0, 0, 0, 5, 5, 0, 0, 0)),
+    QUEEN: ((-20, -10, -10, -5, -5, -10, -10, -20),
+            (-10, 0, 0, 0, 0, 0, 0, -10),
+            (-10, 0, 5, 5, 5, 5, 0, -10),
+            (-5, 0, 5, 5, 5, 5, 0, -5),
+            (0, 0, 5, 5, 5, 5, 0, -5),
+            (-10, 5, 5, 5, 5, 5, 0, -10),
+            (-10, 0, 5, 0, 0, 0, 0, -10),
+            (-20, -10, -10, -5, -5, -10, -10, -20)),
+    KING: ((-30, -40, -40, -50, -50, -40, -40, -30),
+           (-30, -40, -40, -50, -50, -40, -40, -30),
+           (-30, -40, -40, -50, -50, -40, -40, -30),
+           (-30, -40, -40, -50, -50, -40, -40, -30),
+           (-20, -30, -30, -40, -40, -30, -30, -20),
+           (-10, -20, -20, -20, -20, -20, -20, -10),
+           (20, 20, 0, 0, 0, 0, 20, 20),
+           (20, 30, 10, 0, 0, 10, 30, 20))}
+
+# Material plus piece-square bonus of a mailbox piece on a square, positive for white
+# and negative for black
+_PST = [[0] * 64 for piece in range(16)]
+for _piece_type, _rows in _PIECE_SQUARE.items():
+    for _square in range(64):
+        _PST[_piece_type | 8][_square] = PIECE_VALUES[_piece_type] + _rows[7 - _square // 8][_square % 8]
+        _PST[_piece_type][_square] = -(PIECE_VALUES[_piece_type] + _rows[_square // 8][_square % 8])
+
+# Distance of a square from the center (0-3), to drive a lone king to the edge
+_EDGE = [max(abs(2 * (square % 8) - 7), abs(2 * (square // 8) - 7)) // 2 for square in range(64)]
+
+def evaluate(position):
+    """
+    Static evaluation of a Position (material and piece-square tables) for white.
+    """
+    return sum(_PST[piece][square] for square, piece in enumerate(position.squares) if piece)
+
+class TranspositionTable:
+    """
+    Bounded transposition table: a fixed number of slots, indexed by the low bits of
+    the Zobrist key, each holding one (key, depth, score, bound, move, generation)
+    entry.
+
+    Replacement is depth-preferred with aging: a new entry replaces the slot's entry
+    if that is for the same position, from an earlier search (generation), or
+    searched no deeper.
+    """
+    def __init__(self, n_entries=2 ** 18):
+        """
+        n_entries: int (default: 2 ** 18)
+          Number of slots, rounded down to a power of 2.
+        """
+        self.size = 1 << (max(1, n_entries).bit_length() - 1)
+        self.mask = self.size - 1
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        """
+        Age the entries of earlier searches, so that they are replaced first.
+        """
+        self.generation += 1
+
+    def probe(self, key):
+        """
+        Entry (key, depth, score, bound, move, generation) of position key, or None.
+        """
+        self.probes += 1
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        """
+        Store a search result, subject to the replacement policy.
+        """
+        slot = key & self.mask
+        entry = self.slots[slot]
+        if entry is None or entry[0] == key or entry[5] != self.generation or entry[1] <= depth:
+            self.slots[slot] = (key, depth, score, bound, move, self.generation)
+            self.stores += 1
+
+    def stats(self):
+        """
+        'size', 'filled' (fraction of slots in use), 'probes', 'hits' and 'hit_rate'.
+        """
+        filled = sum(entry is not None for entry in self.slots)
+
+        return {'size': self.size,
+                'filled': filled / self.size,
+                'probes': self.probes,
+                'hits': self.hits,
+                'hit_rate': self.hits / max(1, self.probes)}
+
+class SharedTranspositionTable:
+    """
+    Transposition table in a memory-mapped file, so that the processes of a pool (and
+    successive games in each of them) share their search results. It has the
+    interface of TranspositionTable.
+
+    The file is a 64-byte header (magic, number of buckets, generation, probes, hits)
+    followed by buckets of BUCKET_SIZE entries, indexed by the low bits of the Zobrist
+    key. An entry is two 64-bit words, key ^ data and data, where data packs the move,
+    score, depth, bound and generation: there are no locks, and an entry torn by
+    concurrent writes fails the key check and reads as a miss.
+
+    Replacement is depth-preferred with aging: a position's own entry is overwritten,
+    otherwise an empty entry or the one with the lowest depth - 8 * age (in searches,
+    from the generation in the header, which every new_search advances).
+
+    The shared probe and hit counts in the header are approximate (concurrent
+    increments may be lost); probes and hits are this process's own.
+    """
+    BUCKET_SIZE = 4
+    MAGIC = 0x43484553534854  # 'CHESSHT'
+    HEADER_WORDS = 8
+
+    def __init__(self, path=None, n_entries=2 ** 20):
+        """
+        path: str (default: None)
+          File of the table: it is created (or resized and cleared, if its size does
+          not match n_entries) by the first process, and mapped as is by the others.
+          The default is a new temporary file, removed by unlink().
+
+        n_entries: int (default: 2 ** 20)
+          Number of entries, rounded down to a power of 2 (of at least one bucket).
+        """
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='chesstt-', suffix='.bin')
+            os.close(fd)
+
+        self.path = path
+        self.n_buckets = 1 << max(0, max(1, n_entries // self.BUCKET_SIZE).bit_length() - 1)
+        self.size = self.n_buckets * self.BUCKET_SIZE
+        self.mask = self.n_buckets - 1
+        self.nbytes = 8 * (self.HEADER_WORDS + 2 * self.size)
+
+        with open(path, 'a+b') as file:
+            if os.path.getsize(path) != self.nbytes:
+                file.truncate(0)
+                file.truncate(self.nbytes)
+            self.mmap = mmap.mmap(file.fileno(), self.nbytes)
+
+        self.words = memoryview(self.mmap).cast('Q')
+        if self.words[0] != self.MAGIC or self.words[1] != self.n_buckets:
+            self.words[1] = self.n_buckets
+            self.words[0] = self.MAGIC
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def __reduce__(self):
+        # Pickled (e.g. into a pool job) as its file, which the worker maps again
+        return self.__class__, (self.path, self.size)
+
+    def new_search(self):
+        """
+        Age the entries of earlier searches (of any process), so that they are replaced
+        first.
+        """
+        self.words[2] = (self.words[2] + 1) & 63
+
+    def probe(self, key):
+        """
+        Entry (key, depth, score, bound, move, generation) of position key, or None.
+        """
+        words = self.words
+        self.probes += 1
+        words[3] = (words[3] + 1) & 0xFFFFFFFFFFFFFFFF
+        index = self.HEADER_WORDS + 2 * self.BUCKET_SIZE * (key & self.mask)
+        for index in range(index, index + 2 * self.BUCKET_SIZE, 2):
+            data = words[index + 1]
+            if data and words[index] ^ data == key:
+                self.hits += 1
+                words[4] = (words[4] + 1) & 0xFFFFFFFFFFFFFFFF
+                return (key, (data >> 48) & 0xFF, ((data >> 16) & 0xFFFFFFFF) - (1 << 31),
+                        ((data >> 56) & 3) - 1, data & 0xFFFF, data >> 58)
+
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        """
+        Store a search result in its bucket, subject to the replacement policy.
+        """
+        words = self.words
+        generation = words[2]
+        first = self.HEADER_WORDS + 2 * self.BUCKET_SIZE * (key & self.mask)
+        victim, victim_value = first, None
+        for index in range(first, first + 2 * self.BUCKET_SIZE, 2):
+            data = words[index + 1]
+            if not data or words[index] ^ data == key:
+                victim = index
+                break
+            value = ((data >> 48) & 0xFF) - 8 * ((generation - (data >> 58)) & 63)
+            if victim_value is None or value < victim_value:
+                victim, victim_value = index, value
+
+        data = (move | (score + (1 << 31)) << 16 | min(depth, 0xFF) << 48 | (bound + 1) << 56
+                | generation << 58)
+        words[victim + 1] = data
+        words[victim] = key ^ data
+        self.stores += 1
+
+    def stats(self):
+        """
+        'size', 'bucket_size', 'bytes' (memory footprint), 'filled' (fraction of entries
+        in use), 'probes', 'hits' and 'hit_rate' (this process), and 'shared_probes',
+        'shared_hits' and 'shared_hit_rate' (all processes, approximate).
+        """
+        entries = np.frombuffer(self.mmap, np.uint64, 2 * self.size, 8 * self.HEADER_WORDS)
+        filled = int(np.count_nonzero(entries[1::2]))
+
+        return {'size': self.size,
+                'bucket_size': self.BUCKET_SIZE,
+                'bytes': self.nbytes,
+                'filled': filled / self.size,
+                'probes': self.probes,
+                'hits': self.hits,
+                'hit_rate': self.hits / max(1, self.probes),
+                'shared_probes': self.words[3],
+                'shared_hits': self.words[4],
+                'shared_hit_rate': self.words[4] / max(1, self.words[3])}
+
+    def clear(self):
+        """
+        Empty the table (for all processes) and reset its counters.
+        """
+        self.mmap[8 * 2:] = bytes(self.nbytes - 8 * 2)
+        self.probes = self.hits = self.stores = 0
+
+    def close(self):
+        """
+        Unmap the table (its file stays, for other processes).
+        """
+        for key in [key for key, table in _shared_tables.items() if table is self]:
+            del _shared_tables[key]
+        self.words.release()
+        self.mmap.close()
+
+    def unlink(self):
+        """
+        Unmap the table and remove its file.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+_shared_tables = {}
+
+def shared_table(path, n_entries=2 ** 20):
+    """
+    This process's SharedTranspositionTable of file path, mapped once and reused by
+    every player (and game) of the process.
+    """
+    key = (path, n_entries)
+    if key not in _shared_tables:
+        _shared_tables[key] = SharedTranspositionTable(path, n_entries)
+
+    return _shared_tables[key]
+
+class _Timeout(Exception):
+    pass
+
+class Searcher:
+    """
+    Iterative deepening alpha-beta (principal variation search) on a
+    chessposition.Position, with a transposition table, check extensions, a capture
+    quiescence search, and move ordering by table move, MVV-LVA, killer moves and the
+    history heuristic. The evaluation is material plus piece-square tables, updated
+    incrementally with every move.
+
+    With bitbases, drawn endgames they cover are not searched, and won ones are
+    evaluated as KNOWN_WIN plus terms that make progress toward mate.
+    """
+    def __init__(self, position, table=None, bitbases=None):
+        """
+        position: Position
+          Position to search; moves are made and unmade on it, and it is left as it
+          was.
+
+        table: TranspositionTable (default: None)
+          Table to use (e.g. kept across moves); a new one if None.
+
+        bitbases: Bitbases (default: None)
+          Endgame tables (see chessbitbase.load) to probe in the search.
+        """
+        self.position = position
+        self.table = table if table is not None else TranspositionTable()
+        self.bitbases = bitbases
+        self.killers = [[0, 0] for ply in range(MAX_PLY + 1)]
+        self.history = [[0] * 64 for piece in range(16)]
+        self.nodes = 0
+        self.deadline = None
+        self.score = 0
+        self.scores = []
+        self.root_move = 0
+
+    def search(self, soft_time=None, hard_time=None, max_depth=MAX_PLY):
+        """
+        Search until depth max_depth, or until soft_time sec have passed (no new
+        iteration is started) or hard_time sec (the iteration is abandoned).
+
+        -------
+        Returns
+        -------
+        move: int
+          Best move (0 if there is no legal move).
+
+        info: dict
+          Of the deepest completed iteration, with the keys of a UCI info line:
+          'depth', 'nodes', 'nps', 'time' (ms), 'cp' or 'mate', and 'pv' (UCI).
+        """
+        # A full garbage collection in the middle of a short move can overrun its time;
+        # the search makes no reference cycles, so the collector waits until it is done
+        collect = gc.isenabled()
+        gc.disable()
+        try:
+            return self._deepen(soft_time, hard_time, max_depth)
+        finally:
+            if collect:
+                gc.enable()
+
+    def _deepen(self, soft_time, hard_time, max_depth):
+        """
+        Iterative deepening of search.
+        """
+        position = self.position
+        start = time.perf_counter()
+        self.deadline = start + hard_time if hard_time is not None else None
+        self.nodes = 0
+        self.score = evaluate(position)
+        self.scores = []
+        self.table.new_search()
+        self.killers = [[0, 0] for ply in range(MAX_PLY + 1)]
+        for row in self.history:
+            row[:] = [value >> 3 for value in row]
+
+        root_depth, root_score = len(position.stack), self.score
+        moves = position.legal_moves()
+        best_move, info = (moves[0] if moves else 0), {}
+        for depth in range(1, max_depth + 1):
+            self.root_move = 0
+            try:
+                score = self._negamax(depth, -INFINITY, INFINITY, 0)
+            except _Timeout:
+                while len(position.stack) > root_depth:
+                    position.unmake()
+                self.score, self.scores = root_score, []
+                break
+
+            best_move = self.root_move or best_move
+            elapsed = time.perf_counter() - start
+            info = {'depth': depth,
+                    'nodes': self.nodes,
+                    'nps': int(self.nodes / max(elapsed, 1e-6)),
+                    'time': int(1000 * elapsed)}
+            if abs(score) >= MATE - MAX_PLY:
+                info['mate'] = (MATE - score + 1) // 2 if score > 0 else -(MATE + score) // 2
+            else:
+                info['cp'] = score
+            info['pv'] = self.principal_variation(depth)
+
+            if not moves or abs(score) >= MATE - MAX_PLY or (soft_time is not None and elapsed >= soft_time):
+                break
+
+        if self.nodes > info.get('nodes', 0): # count the abandoned iteration too
+            elapsed = time.perf_counter() - start
+            info.update({'nodes': self.nodes, 'nps': int(self.nodes / max(elapsed, 1e-6)), 'time': int(1000 * elapsed)})
+
+        return best_move, info
+
+    def principal_variation(self, max_length):
+        """
+        Moves (UCI) of the principal variation, read from the transposition table.
+        """
+        position = self.position
+        pv = []
+        while len(pv) < max_length:
+            entry = self.table.probe(position.key)
+            if entry is None or entry[4] not in position.legal_moves():
+                break
+            pv.append(chessposition.move_uci(entry[4]))
+            position.make(entry[4])
+        for move in pv:
+            position.unmake()
+
+        return pv
+
+    def _make(self, move):
+        """
+        Make move, updating the evaluation.
+        """
+        position = self.position
+        squares = position.squares
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        promotion = move >> 12
+        piece = squares[from_square]
+        captured = squares[to_square]
+        placed = promotion | (piece & 8) if promotion else piece
+
+        delta = _PST[placed][to_square] - _PST[piece][from_square] - _PST[captured][to_square]
+        piece_type = piece & 7
+        if piece_type == PAWN and to_square == position.ep_square:
+            captured_square = to_square - 8 if piece & 8 else to_square + 8
+            delta -= _PST[squares[captured_square]][captured_square]
+        elif piece_type == KING and (to_square - from_square == 2 or from_square - to_square == 2):
+            rook_from, rook_to = (to_square + 1, to_square - 1) if to_square > from_square else (to_square - 2, to_square + 1)
+            delta += _PST[squares[rook_from]][rook_to] - _PST[squares[rook_from]][rook_from]
+
+        self.scores.append(self.score)
+        self.score += delta
+        position.make(move)
+
+    def _unmake(self):
+        self.position.unmake()
+        self.score = self.scores.pop()
+
+    def _is_draw(self):
+        """
+        Fifty-move rule or a repetition of a position since the last irreversible move.
+        """
+        position = self.position
+        if position.halfmove_clock >= 100:
+            return True
+
+        stack = position.stack
+        key = position.key
+        for i in range(len(stack) - 2, max(len(stack) - position.halfmove_clock, 0) - 1, -2):
+            if stack[i][5] == key:
+                return True
+
+        return False
+
+    def _known(self):
+        """
+        Bitbase score of the position for the side to move, or None if it is not
+        covered: 0 for a draw, and for a win KNOWN_WIN plus the piece's value, bonuses
+        for the lone king near the edge and the kings close together, and for an
+        advanced pawn.
+        """
+        position = self.position
+        occupied = position.occupied_co[0] | position.occupied_co[1]
+        if occupied.bit_count() != 3:
+            return None
+
+        result = self.bitbases.probe_position(position)
+        if result == UNKNOWN or result == DRAW:
+            return None if result == UNKNOWN else 0
+
+        strong = int(result == WHITE)
+        strong_king, weak_king = position.king(strong), position.king(strong ^ 1)
+        square = (occupied & ~position.pieces[KING]).bit_length() - 1
+        piece_type = position.squares[square] & 7
+        distance = max(abs(strong_king % 8 - weak_king % 8), abs(strong_king // 8 - weak_king // 8))
+        score = KNOWN_WIN + PIECE_VALUES[piece_type] + 20 * _EDGE[weak_king] - 10 * distance
+        if piece_type == PAWN:
+            score += 20 * (square // 8 if strong else 7 - square // 8)
+
+        return score if position.turn == strong else -score
+
+    def _order(self, moves, table_move, ply):
+        """
+        Moves sorted by table move, captures (MVV-LVA) and promotions, killers, then
+        history.
+        """
+        squares = self.position.squares
+        killers = self.killers[ply]
+        history = self.history
+        keyed = []
+        for move in moves:
+            to_square = move >> 6 & 63
+            if move == table_move:
+                key = 1 << 30
+            elif squares[to_square] or move >> 12:
+                key = (1 << 24) + 16 * PIECE_VALUES[squares[to_square] & 7] + PIECE_VALUES[move >> 12] \
+                      - (squares[move & 63] & 7)
+            elif move == killers[0]:
+                key = 1 << 23
+            elif move == killers[1]:
+                key = (1 << 23) - 1
+            else:
+                key = history[squares[move & 63]][to_square]
+            keyed.append((key, move))
+        keyed.sort(reverse=True)
+
+        return [move for key, move in keyed]
+
+    def _negamax(self, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 63 and time.perf_counter() > self.deadline:
+            raise _Timeout()
+
+        position = self.position
+        if ply > 0 and self._is_draw():
+            return 0
+        if self.bitbases is not None and ply > 0 and self._known() == 0:
+            return 0
+
+        in_check = position.is_check()
+        if in_check:
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(alpha, beta, ply)
+
+        key = position.key
+        table = self.table
+        entry = table.probe(key)
+        table_move = 0
+        if entry is not None:
+            table_move = entry[4]
+            if entry[1] >= depth and ply > 0:
+                score = entry[2]
+                if score >= MATE - MAX_PLY:
+                    score -= ply
+                elif score <= -MATE + MAX_PLY:
+                    score += ply
+                bound = entry[3]
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score
+
+        moves = position.legal_moves()
+        if not moves:
+            return -MATE + ply if in_check else 0
+
+        alpha0 = alpha
+        best_score, best_move = -INFINITY, 0
+        squares = position.squares
+        for i, move in enumerate(self._order(moves, table_move, ply)):
+            quiet = not squares[move >> 6 & 63] and not move >> 12
+            piece = squares[move & 63]
+            self._make(move)
+            if i == 0:
+                score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            else:
+                score = -self._negamax(depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta:
+                    score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            self._unmake()
+
+            if score > best_score:
+                best_score, best_move = score, move
+                if ply == 0:
+                    self.root_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if quiet:
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1], killers[0] = killers[0], move
+                            self.history[piece][move >> 6 & 63] += depth * depth
+                        break
+
+        if best_score >= beta:
+            bound = LOWER
+        elif best_score > alpha0:
+            bound = EXACT
+        else:
+            bound = UPPER
+        stored = best_score
+        if stored >= MATE - MAX_PLY:
+            stored += ply
+        elif stored <= -MATE + MAX_PLY:
+            stored -= ply
+        table.store(key, depth, stored, bound, best_move)
+
+        return best_score
+
+    def _quiescence(self, alpha, beta, ply):
+        """
+        Search captures and queen promotions only, until the position is quiet.
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 63 and time.perf_counter() > self.deadline:
+            raise _Timeout()
+
+        position = self.position
+        stand_pat = self.score if position.turn else -self.score
+        if self.bitbases is not None:
+            known = self._known()
+            if known == 0:
+                return 0
+            elif known is not None:
+                stand_pat = known
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        squares = position.squares
+        ep_square = position.ep_square
+        captures = []
+        for move in position.generate_moves():
+            to_square = move >> 6 & 63
+            promotion = move >> 12
+            if squares[to_square] or promotion == QUEEN:
+                captures.append((16 * PIECE_VALUES[squares[to_square] & 7] + PIECE_VALUES[promotion]
+                                 - (squares[move & 63] & 7), move))
+            elif to_square == ep_square and squares[move & 63] & 7 == PAWN:
+                captures.append((16 * PIECE_VALUES[PAWN] - PAWN, move))
+        captures.sort(reverse=True)
+
+        color = position.turn
+        best_score = stand_pat
+        for order, move in captures:
+            self._make(move)
+            if position.is_attacked(position.king(color), color ^ 1):
+                self._unmake()
+                continue
+            score = -self._quiescence(-beta, -alpha, ply + 1)
+            self._unmake()
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        return best_score
@@ -0,0 +1,220 @@
+import json
+import time
+import sqlite3
+
+import chesslogs
+from chesslogs import WHITE, BLACK, DRAW
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS games (
+    tournament TEXT NOT NULL,
+    job INTEGER NOT NULL,
+    white TEXT NOT NULL,
+    black TEXT NOT NULL,
+    seed INTEGER,
+    kwargs TEXT,
+    init_fen TEXT,
+    game_result TEXT,
+    winner INTEGER NOT NULL,
+    termination TEXT,
+    n_plies INTEGER NOT NULL,
+    duration REAL,
+    worker TEXT,
+    finished REAL NOT NULL,
+    PRIMARY KEY (tournament, job)
+);
+CREATE TABLE IF NOT EXISTS plies (
+    tournament TEXT NOT NULL,
+    job INTEGER NOT NULL,
+    ply INTEGER NOT NULL,
+    side TEXT NOT NULL,
+    move TEXT,
+    t REAL,
+    PRIMARY KEY (tournament, job, ply)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS games_white ON games (tournament, white, winner, termination);
+CREATE INDEX IF NOT EXISTS games_black ON games (tournament, black, winner, termination);
+'''
+
+class ResultStore:
+    """
+    Durable store of tournament results in an SQLite database: one row per game
+    (players, seed, job keywords, initial position, result, duration) and one per ply
+    (side, move, thinking time), keyed by tournament name and job index.
+
+    Games are buffered and inserted in one transaction every batch_size games or
+    flush_interval seconds, in WAL mode with synchronous=NORMAL, so a game costs a few
+    row inserts rather than a disk sync; a crash loses at most the last batch, which a
+    resumed run (see missing and chesstournament.run_tournament) plays again. Other
+    processes can open the same file and query it while a run writes to it; score
+    tables and timeout rates are answered from covering indexes on (tournament,
+    player, winner, termination), without reading the games themselves.
+
+    A store is written by one process (the one collecting the results) and used from
+    the thread that opened it.
+    """
+    def __init__(self, path, batch_size=64, flush_interval=1.):
+        """
+        path: str
+          Database file (created if needed).
+
+        batch_size: int (default: 64)
+          Max. number of games buffered before they are inserted.
+
+        flush_interval: float (default: 1.)
+          Max. time in seconds a game stays buffered.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.db = sqlite3.connect(path, timeout=30.)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(_SCHEMA)
+
+        self.game_rows = []
+        self.ply_rows = []
+        self.last_flush = time.monotonic()
+
+    def add(self, result, tournament='default', job=None):
+        """
+        Buffer one game: a result dict of chesstournament.play_job (as yielded by
+        run_tournament), with the job that produced it to record its keywords.
+        """
+        winner, termination = chesslogs.split_result(result['game_result'])
+        plies = result.get('plies', [])
+        kwargs = json.dumps(job['kwargs'], default=repr, sort_keys=True) if job is not None else None
+        self.game_rows.append((tournament, result['index'], result['white'], result['black'], result['seed'], kwargs,
+                               result.get('init_fen'), result['game_result'], winner, termination, len(plies),
+                               result.get('duration'), result.get('worker'), time.time()))
+        self.ply_rows.extend((tournament, result['index'], ply['ply'], ply['side'], ply['move'], ply['t'])
+                             for ply in plies)
+
+        if len(self.game_rows) >= self.batch_size or time.monotonic() - self.last_flush > self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Insert the buffered games in one transaction.
+        """
+        if len(self.game_rows) > 0:
+            with self.db:
+                self.db.executemany('INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                    self.game_rows)
+                self.db.executemany('INSERT OR REPLACE INTO plies VALUES (?, ?, ?, ?, ?, ?)', self.ply_rows)
+            self.game_rows, self.ply_rows = [], []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        """
+        Insert the buffered games and close the database.
+        """
+        self.flush()
+        self.db.close()
+
+    def missing(self, jobs, tournament='default'):
+        """
+        Indices of the jobs with no stored game yet, or whose stored game ended with a
+        harness error ('Error:...', e.g. a lost lease or a player that could not be set
+        up), in order; replaying such a job replaces its row.
+
+        Raises ValueError if a stored game was played by other players or with another
+        seed than its job, i.e. the store holds a different schedule under this
+        tournament name.
+        """
+        self.flush()
+        stored = {}
+        for job, white, black, seed, game_result in self.db.execute(
+                'SELECT job, white, black, seed, game_result FROM games WHERE tournament = ?', (tournament,)):
+            stored[job] = (white, black, seed, game_result)
+
+        indices = []
+        for index, job in enumerate(jobs):
+            if index not in stored:
+                indices.append(index)
+                continue
+
+            players = (job['white'].__name__, job['black'].__name__, job['seed'])
+            if stored[index][:3] != players:
+                raise ValueError(f'game {index} of tournament {tournament!r} was {stored[index][:3]}, not {players}')
+            if stored[index][3].startswith('Error:'):
+                indices.append(index)
+
+        return indices
+
+    def results(self, tournament='default'):
+        """
+        Stored games of a tournament in job order, as result dicts with the keys of
+        chesstournament.play_job (without the plies, see plies) plus 'kwargs' (JSON)
+        and 'worker'.
+        """
+        self.flush()
+        cursor = self.db.execute('SELECT job, white, black, seed, game_result, duration, init_fen, kwargs, worker '
+                                 'FROM games WHERE tournament = ? ORDER BY job', (tournament,))
+        keys = ('index', 'white', 'black', 'seed', 'game_result', 'duration', 'init_fen', 'kwargs', 'worker')
+
+        return [dict(zip(keys, row)) for row in cursor]
+
+    def plies(self, job, tournament='default'):
+        """
+        Plies of one stored game as dicts {'ply', 'side', 'move', 't'}.
+        """
+        self.flush()
+        cursor = self.db.execute('SELECT ply, side, move, t FROM plies WHERE tournament = ? AND job = ? ORDER BY ply',
+                                 (tournament, job))
+
+        return [dict(zip(('ply', 'side', 'move', 't'), row)) for row in cursor]
+
+    def _counts(self, tournament, termination=False):
+        """
+        Rows (player, side, winner[, termination], games) of the games grouped by
+        player and outcome, from the covering indexes.
+        """
+        columns = 'winner, termination' if termination else 'winner'
+        where = 'WHERE tournament = ?' if tournament is not None else ''
+        args = (tournament,) if tournament is not None else ()
+        for side in ('white', 'black'):
+            query = f'SELECT {side}, {columns}, COUNT(*) FROM games {where} GROUP BY {side}, {columns}'
+            for row in self.db.execute(query, args):
+                yield (row[0], side) + row[1:]
+
+    def score_table(self, tournament='default'):
+        """
+        Score table {name: [wins, draws, losses, points]} of a tournament (of all
+        tournaments if None), like chesstournament.score_table; games that ended with
+        a harness error are left out.
+        """
+        self.flush()
+        table = {}
+        for name, side, winner, count in self._counts(tournament):
+            if winner not in (WHITE, BLACK, DRAW):
+                continue
+            row = table.setdefault(name, [0, 0, 0, 0.])
+            if winner == DRAW:
+                row[1] += count
+                row[3] += 0.5 * count
+            elif winner == (WHITE if side == 'white' else BLACK):
+                row[0] += count
+                row[3] += count
+            else:
+                row[2] += count
+
+        return table
+
+    def timeout_rates(self, tournament='default', termination='timeout'):
+        """
+        Per player {name: [losses by termination, games, rate]} over the games of a
+        tournament (of all tournaments if None), e.g. the share of games lost on time.
+        """
+        self.flush()
+        table = {}
+        for name, side, winner, ending, count in self._counts(tournament, termination=True):
+            row = table.setdefault(name, [0, 0, 0.])
+            row[1] += count
+            if ending == termination and winner == (BLACK if side == 'white' else WHITE):
+                row[0] += count
+        for row in table.values():
+            row[2] = row[0] / row[1]
+
+        return table
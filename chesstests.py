@@ -1,11 +1,36 @@
+import os
+import sys
 import time
+import asyncio
 import chess
+import chess.pgn
+import chess.polyglot
+import tempfile
+import multiprocessing
+from multiprocessing.connection import Client
 import copy
+import json
 import numpy as np
 from func_timeout import func_timeout, FunctionTimedOut
 
+import chessanalysis
 import chessbattle
+import chessbitbase
 import chessbots
+import chesscluster
+import chessclock
+import chessengines
+import chesslogs
+import chessrating
+import chessopenings
+import chessplayout
+import chessposition
+import chessrecords
+import chessstore
+import chesssearch
+import chessreferee
+import chesstournament
+import chesstrace
 
 # Test functions
 def test_stockfish_vs_stockfish(max_time_per_move=0.1):
@@ -37,3 +62,706 @@ def test_stockfish_vs_human(max_time_per_move=0.1, seed=0):
     """
     chessbattle.play_game(chessbots.SampleStockfish, chessbots.SampleHuman,
                           max_time_per_move_white=max_time_per_move, draw_time_black=None, trash_talk_time_black=None)
+
+def test_mrbean_round_robin(n_workers=2, games_per_pair=4):
+    """
+    Mr. Bean round-robin played over a process pool
+    """
+    jobs = chesstournament.round_robin([chessbots.SampleMrBean, chessbots.SampleMrBean],
+                                       games_per_pair=games_per_pair)
+    results = list(chesstournament.run_tournament(jobs, n_workers=n_workers))
+    
+    assert len(results) == games_per_pair
+    assert sorted(result['index'] for result in results) == list(range(games_per_pair))
+    for result in results:
+        print(result['game_result'], f"{result['games_per_hour']:.0f} games/hour")
+
+def test_mrbean_worker_executor(seed=0):
+    """
+    Mr. Bean vs. Mr. Bean with persistent player workers gives the same game
+    """
+    result_func_timeout = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean,
+                                                seed=seed, executor='func_timeout').result
+    result_worker = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean,
+                                          seed=seed, executor='worker').result
+    
+    assert result_func_timeout == result_worker
+
+def test_stockfish_engine_reuse(max_time_per_move=0.05, n_games=2):
+    """
+    Stockfish vs. Stockfish several times, reusing the same pooled engines, which go
+    back to the pool even when a game fails
+    """
+    pool = chessengines.get_pool(chessengines.find_stockfish())
+    spawned = pool.stats()['spawned']
+    
+    for game in range(n_games):
+        chessbattle.play_game(chessbots.SampleStockfish, chessbots.SampleStockfish,
+                              max_time_per_move_white=max_time_per_move, max_time_per_move_black=max_time_per_move,
+                              executor='worker', seed=game)
+    
+    assert pool.stats()['spawned'] - spawned <= 2
+    
+    try:
+        chessbattle.play_game(chessbots.SampleStockfish, chessbots.SampleStockfish, adjudication={'bogus': 1})
+        assert False
+    except TypeError:
+        pass
+    engines = [pool.acquire(timeout=1) for _ in range(pool.size)]
+    for engine in engines:
+        pool.release(engine)
+
+def test_stockfish_position_modes(max_time_per_move=0.05):
+    """
+    Stockfish sent the game as root plus moves (incremental) and as a FEN per move
+    reach the same results by repetition, the fifty-move rule and insufficient material
+    """
+    class FenStockfish(chessbots.SampleStockfish):
+        incremental = False
+    
+    # Black to move has only Kh7, which repeats the position a fifth time
+    repetition = chess.Board('7k/8/5K2/8/8/8/8/R7 w - - 0 1')
+    for move in 4 * ['a1a8', 'h8h7', 'a8a1', 'h7h8'] + ['a1a8']:
+        repetition.push_uci(move)
+    
+    boards = {'Draw:threefold repetition': repetition,
+              'Draw:fifty-move rule': '7k/8/8/8/8/8/8/1R5K w - - 149 100',
+              'Draw:insufficient material': '8/8/4k3/8/8/3NK3/8/8 w - - 0 1'}
+    for game_result, board in boards.items():
+        for PlayerWhite, PlayerBlack in ((chessbots.SampleStockfish, FenStockfish),
+                                         (FenStockfish, chessbots.SampleStockfish)):
+            record = chessbattle.play_game(PlayerWhite, PlayerBlack, board=board,
+                                           max_time_per_move_white=max_time_per_move,
+                                           max_time_per_move_black=max_time_per_move)
+            assert record.result == game_result
+            assert len(record.plies) == 1
+
+def test_pondering_stockfish_vs_stockfish(max_time_per_move=0.1):
+    """
+    Pondering Stockfish vs. Stockfish
+    """
+    class PonderingStockfish(chessbots.SampleStockfish):
+        ponder = True
+    
+    chessbattle.play_game(PonderingStockfish, chessbots.SampleStockfish,
+                          max_time_per_move_white=max_time_per_move, max_time_per_move_black=max_time_per_move,
+                          verbose=True)
+
+def test_mrbean_game_record(seed=0):
+    """
+    Mr. Bean vs. Mr. Bean streamed to JSON Lines and PGN
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        game = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed,
+                                     write=os.path.join(directory, 'game.txt'),
+                                     write_record=os.path.join(directory, 'game.jsonl'),
+                                     write_pgn=os.path.join(directory, 'game.pgn'))
+        loaded = chessrecords.load_record(os.path.join(directory, 'game.jsonl'))
+        
+        assert loaded.result == game.result
+        assert loaded.moves() == game.moves()
+        with open(os.path.join(directory, 'game.txt')) as f:
+            assert loaded.to_text(fname=os.path.join(directory, 'game.txt')) == f.read()
+        with open(os.path.join(directory, 'game.pgn')) as f:
+            assert [move.uci() for move in chess.pgn.read_game(f).mainline_moves()] == game.moves()
+        
+        # A move that is not a string loses the game as an invalid move, whether or not
+        # it is recorded
+        class MoveObjectBean(chessbots.SampleMrBean):
+            def make_move(self):
+                return chess.Move.from_uci(super().make_move())
+        
+        for write_record in (None, os.path.join(directory, 'invalid.jsonl')):
+            game = chessbattle.play_game(MoveObjectBean, chessbots.SampleMrBean, seed=seed, write_record=write_record,
+                                         write_pgn=os.path.join(directory, 'invalid.pgn'))
+            assert game.result == 'Win black:invalid move'
+        assert chessrecords.load_record(write_record).result == game.result
+
+def test_game_log_index(n_games=4):
+    """
+    Columnar index over the bundled Stockfish log and a few Mr. Bean games
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        paths = ['stockfish_v_stockfish.txt']
+        games = []
+        for game in range(n_games):
+            paths.append(os.path.join(directory, f'game{game}.jsonl' if game % 2 else f'game{game}.txt'))
+            if game % 2:
+                games.append(chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean,
+                                                   seed=game, write_record=paths[-1]))
+            else:
+                games.append(chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean,
+                                                   seed=game, write=paths[-1]))
+        
+        index = chesslogs.build_index(paths, os.path.join(directory, 'index'), n_workers=1)
+        
+        assert len(index) == n_games + 1
+        assert list(index.n_plies[1:]) == [len(game.moves()) for game in games]
+        assert index.games(player='Mr. Bean').sum() == n_games
+        assert index.moves(index.games(player='Stockfish')).sum() == index.n_plies[0]
+        assert index.losses('Stockfish', 'timeout').sum() == 0
+        assert sum(row[3] for row in index.score_table().values()) == sum(game.result is not None for game in games)
+
+def test_stockfish_vs_mrbean_sprt(max_time_per_move=0.02):
+    """
+    SPRT match of Stockfish against Mr. Bean, stopped as soon as it is decided, and
+    an LLR on the games' own mean score
+    """
+    stats = chessrating.MatchStats()
+    for game in range(10):
+        stats.add(1)
+    s0, s1 = chessrating.score_from_elo(0), chessrating.score_from_elo(100)
+    assert abs(stats.llr(0, 100) - 10 * (s1 - s0) * (2 - s0 - s1) / (2 * stats.score(prior=0.5)[1])) < 1e-9
+    
+    match = chessrating.run_match(chessbots.SampleStockfish, chessbots.SampleMrBean, elo0=0, elo1=100,
+                                  max_games=50, executor='worker',
+                                  max_time_per_move_white=max_time_per_move, max_time_per_move_black=max_time_per_move)
+    
+    assert match['decision'] == 'H1'
+    assert match['games'] < 50
+
+def test_mrbean_opening_suite(n_openings=3, seed=0):
+    """
+    Mr. Bean vs. Mr. Bean from an EPD book, each opening played with both colors
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        book = os.path.join(directory, 'book.epd')
+        with open(book, 'w') as f:
+            for fen in chessopenings.random_openings(2 * n_openings, seed=seed):
+                f.write(chess.Board(fen).epd() + '\n')
+        
+        openings = chessopenings.sample_openings(chessopenings.load_book(book), n_openings, seed=seed)
+        assert len(set(openings)) == n_openings
+        
+        jobs = chesstournament.gauntlet(chessbots.SampleMrBean, [chessbots.SampleMrBean], openings=openings)
+        results = sorted(chesstournament.run_tournament(jobs, n_workers=2), key=lambda result: result['index'])
+        
+        assert len(results) == 2 * n_openings
+        for game in range(n_openings):
+            assert jobs[2 * game]['kwargs']['board'] == jobs[2 * game + 1]['kwargs']['board']
+            assert results[2 * game]['seed'] == results[2 * game + 1]['seed']
+    
+    # Fewer distinct positions than asked for, or no book at all
+    assert len(chessopenings.random_openings(20, plies=1, seed=seed)) == 20
+    for n, plies in ((2, 0), (21, 1)):
+        try:
+            chessopenings.random_openings(n, plies=plies, seed=seed)
+            assert False
+        except ValueError:
+            pass
+    assert chessopenings.sample_openings([], 0) == []
+    try:
+        chessopenings.sample_openings([], 1)
+        assert False
+    except ValueError:
+        pass
+
+def test_referee_repetition_and_results():
+    """
+    Referee gives the same results as the full board scans, incl. repetitions
+    """
+    board = chess.Board()
+    referee = chessreferee.Referee(board)
+    shuffle = ['g1f3', 'g8f6', 'f3g1', 'f6g8'] * 4
+    for ply, move in enumerate(shuffle):
+        game_result = referee.push_uci(move, ['white', 'black'][ply % 2], ['black', 'white'][ply % 2])
+        assert referee.key == chessreferee.Referee.zobrist(board)
+        assert (game_result is not None) == board.is_game_over()
+    
+    assert game_result == 'Draw:threefold repetition'
+    assert referee.counts[referee.key] == 5
+    
+    # A board handed over with a move stack brings its repetitions along
+    board = chess.Board()
+    for move in shuffle[:-1]:
+        board.push_uci(move)
+    assert chessreferee.Referee(board).push_uci(shuffle[-1], 'black', 'white') == 'Draw:threefold repetition'
+    
+    # Castling, also as king takes rook
+    for uci in ('e1g1', 'e1h1', 'e1c1', 'e1a1'):
+        board = chess.Board('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+        referee = chessreferee.Referee(board)
+        assert referee.push_uci(uci, 'white', 'black') is None
+        assert referee.key == chessreferee.Referee.zobrist(board)
+    
+    assert chessreferee.Referee(chess.Board()).push_uci('e2e5', 'white', 'black') == 'Win black:illegal move'
+    assert chessreferee.Referee(chess.Board()).push_uci('xyz', 'white', 'black') == 'Win black:invalid move'
+    assert chessreferee.Referee(chess.Board()).push_uci(None, 'white', 'black') == 'Win black:invalid move'
+
+def test_mrbean_black_to_move(seed=0):
+    """
+    Mr. Bean vs. Mr. Bean from a position with black to move, with a time control
+    """
+    fen = 'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1'
+    records = [chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, board=fen, seed=seed,
+                                     time_control_white=(1, 0), time_control_black=(1, 0), executor=executor)
+               for executor in ('worker', 'func_timeout')]
+    
+    assert records[0].moves() == records[1].moves()
+    assert records[0].result == records[1].result
+    assert [ply['side'] for ply in records[0].plies[:2]] == ['black', 'white']
+    assert all(ply['side'] != next_ply['side'] for ply, next_ply in zip(records[0].plies, records[0].plies[1:]))
+
+def test_clock_increments_and_phases():
+    """
+    Fischer and Bronstein increments, and per-phase time accounting in a game
+    """
+    fischer = chessclock.Clock(time_control=(1, 2))
+    fischer.charge_move(0.5)
+    assert fischer.total_time == 61.5
+    
+    bronstein = chessclock.Clock(max_time_per_move=2, time_control=(1, 2, 'bronstein'))
+    assert bronstein.timeout() == 2
+    bronstein.charge_move(0.5)
+    assert bronstein.total_time == 60
+    bronstein.charge_move(3)
+    assert bronstein.total_time == 59
+    
+    record = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=0, executor='worker',
+                                   time_control_white=(1, 0), time_control_black=(1, 0, 'bronstein'))
+    assert record.result is not None
+    for side in ('white', 'black'):
+        assert set(record.clocks[side]) == set(chessclock.PHASES)
+        assert record.clocks[side]['think'] > 0
+        think = sum(ply['t'] for ply in record.plies if ply['side'] == side)
+        assert abs(think - record.clocks[side]['think']) < 1e-6
+
+def test_mrbean_tracing(seed=0):
+    """
+    Mr. Bean vs. Mr. Bean with a Chrome trace and a histogram of every phase
+    """
+    histogram = chesstrace.Histogram()
+    trace = chesstrace.ChromeTrace()
+    record = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed, executor='worker',
+                                   tracer=chesstrace.Tee(histogram, trace))
+    
+    summary = histogram.summary()
+    for phase in ('move', 'receive', 'think', 'draw', 'talk'):
+        assert summary[phase]['count'] == len(record.plies)
+    assert summary['finish']['count'] == 1
+    assert summary['move']['total_ms'] >= summary['think']['total_ms']
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'trace.json')
+        trace.write(path)
+        with open(path) as f:
+            events = json.load(f)['traceEvents']
+    assert len(events) == sum(row['count'] for row in summary.values())
+    assert {event['tid'] for event in events} == {'white', 'black', 'game'}
+
+
+def test_async_games(max_time_per_move=0.1, seed=0):
+    """
+    play_game_async with a wrapped synchronous player, and async Stockfish vs. Mr.
+    Bean games run concurrently
+    """
+    record = asyncio.run(chessbattle.play_game_async(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed))
+    assert record.moves() == chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed).moves()
+    
+    jobs = [chesstournament.make_job(chessbots.AsyncStockfish, chessbots.SampleMrBean, seed=seed + game,
+                                     max_time_per_move_white=max_time_per_move, max_time_per_move_black=max_time_per_move)
+            for game in range(2)]
+    results = chesstournament.run_async_games(jobs)
+    
+    assert sorted(result['index'] for result in results) == [0, 1]
+    for result in results:
+        assert result['game_result'].startswith('Win white') or result['game_result'].startswith('Draw')
+    
+    # More games than referee engines in the pool: the others wait without blocking
+    # the event loop
+    adjudication = {'resign_cp': 300, 'resign_plies': 2, 'engine': 'stockfish', 'depth': 4}
+    pool = chessengines.get_pool(chessengines.find_stockfish())
+    jobs = [chesstournament.make_job(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed + game,
+                                     adjudication=adjudication)
+            for game in range(2 * pool.size)]
+    results = chesstournament.run_async_games(jobs)
+    assert len(results) == len(jobs)
+    for result in results:
+        assert not result['game_result'].startswith('Error')
+
+def test_sandboxed_runaway_players():
+    """
+    Players in subprocesses: a move stuck in a tight loop is killed when it loses on
+    time, a player over its CPU limit dies with a runtime error, and a draw offer that
+    misses its deadline is declined without costing the game
+    """
+    def spin(self):
+        while True:
+            pass
+    
+    def sleepy_draw(self):
+        if not hasattr(self, 'slept'):
+            self.slept = True
+            time.sleep(1)
+        return True
+    
+    Runaway = type('Runaway', (chessbots.SampleMrBean,), {'make_move': spin})
+    SleepyDraw = type('SleepyDraw', (chessbots.SampleMrBean,), {'request_draw': sleepy_draw})
+    
+    start = time.time()
+    record = chessbattle.play_game(Runaway, chessbots.SampleMrBean, executor='process', max_time_per_move_white=0.2)
+    assert record.result == 'Win black:timeout'
+    assert time.time() - start < 5
+    
+    record = chessbattle.play_game(chessbots.SampleMrBean, Runaway, executor='process', process_limits={'cpu_time': 1})
+    assert record.result == 'Win white:runtime error'
+    
+    assert len(multiprocessing.active_children()) == 0
+    
+    record = chessbattle.play_game(SleepyDraw, chessbots.SampleMrBean, executor='process', draw_time_white=0.2)
+    assert record.result.split(':')[1] not in ('timeout', 'runtime error')
+    assert record.plies[0]['events'][0] == ['white', 'draw solicitation timed out']
+    
+    record = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=1, executor='process')
+    assert record.moves() == chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=1,
+                                                   executor='process').moves()
+
+def test_random_playouts(n_games=40, max_plies=300):
+    """
+    Batched random playouts only play legal moves, see the same number of legal moves
+    as python-chess and end as python-chess would, whatever the batch size
+    """
+    fen = 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1'
+    for start in (None, fen):
+        results = chessplayout.random_playouts(n_games, seed=1, board=start, max_plies=max_plies, batch_size=16,
+                                               record_moves=True)
+        for game in range(n_games):
+            board = chess.Board(start) if start else chess.Board()
+            n_plies = results['n_plies'][game]
+            for ply in range(n_plies):
+                assert results['n_legal'][game, ply] == board.legal_moves.count()
+                assert not board.is_game_over()
+                board.push_uci(chessplayout.move_uci(int(results['moves'][game, ply])))
+            assert results['n_legal'][game, n_plies] == board.legal_moves.count()
+            
+            termination = chessplayout.TERMINATIONS[results['termination'][game]]
+            outcome = board.outcome()
+            if outcome is None:
+                assert termination == 'max plies' and n_plies == max_plies
+            else:
+                assert termination.replace('-', ' ').split()[0] == outcome.termination.name.split('_')[0].lower()
+                assert results['winner'][game] == {True: chesslogs.WHITE, False: chesslogs.BLACK,
+                                                   None: chesslogs.DRAW}[outcome.winner]
+        
+        again = chessplayout.random_playouts(n_games, seed=1, board=start, max_plies=max_plies, batch_size=n_games)
+        assert (again['n_plies'] == results['n_plies']).all()
+        assert again['plies'] == results['plies'] == results['n_plies'].sum()
+
+def test_position_perft(n_plies=100, seed=0):
+    """
+    Position agrees with python-chess on perft, legal moves, FEN and polyglot key, and
+    unmake restores the position
+    """
+    rng = np.random.default_rng(seed)
+    for fen, max_depth, nodes in chessposition.perft_positions():
+        board = chess.Board(fen)
+        position = chessposition.Position(board)
+        expected = 0
+        for move in board.legal_moves:
+            board.push(move)
+            expected += board.legal_moves.count()
+            board.pop()
+        assert position.perft(2) == expected
+        
+        for ply in range(n_plies):
+            legal = position.legal_moves()
+            assert sorted(map(chessposition.move_uci, legal)) == sorted(move.uci() for move in board.legal_moves)
+            if not legal:
+                break
+            move = legal[rng.integers(len(legal))]
+            position.make(move)
+            board.push_uci(chessposition.move_uci(move))
+            assert position.key == chess.polyglot.zobrist_hash(board)
+            assert position.fen() == board.fen()
+        
+        while position.stack:
+            position.unmake()
+        assert position.to_board().fen() == chess.Board(fen).fen()
+        assert position.key == position.zobrist()
+
+def test_alphabeta_search_and_game(max_time_per_move=0.1, seed=0):
+    """
+    Alpha-beta finds mates, reports its search, leaves the position untouched, and
+    beats Mr. Bean within its time
+    """
+    for fen, mate in (('6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1', 1), ('8/8/8/8/8/8/k7/2K4Q w - - 0 1', 2)):
+        position = chessposition.Position(fen)
+        searcher = chesssearch.Searcher(position, chesssearch.TranspositionTable(2 ** 12))
+        move, info = searcher.search(max_depth=5)
+        assert info['mate'] == mate and chessposition.move_uci(move) == info['pv'][0]
+        assert info['nodes'] > 0 and info['nps'] > 0 and info['depth'] >= 1
+        assert position.fen() == chess.Board(fen).fen() and not position.stack
+    
+    record = chessbattle.play_game(chessbots.SampleAlphaBeta, chessbots.SampleMrBean, seed=seed,
+                                   max_time_per_move_white=max_time_per_move, executor='worker')
+    assert record.result.startswith('Win white') or record.result.startswith('Draw')
+    assert record.result.split(':')[1] not in ('timeout', 'runtime error', 'illegal move', 'invalid move')
+
+def test_shared_transposition_table(depth=4):
+    """
+    A SharedTranspositionTable filled by a search in a pool worker answers the same
+    search in this process, and alpha-beta players can opt into it
+    """
+    fen = 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'
+    table = chesssearch.SharedTranspositionTable(n_entries=2 ** 14)
+    try:
+        searcher = chesssearch.Searcher(chessposition.Position(fen), chesssearch.TranspositionTable(2 ** 14))
+        with multiprocessing.Pool(1) as pool:
+            move, info = pool.apply(chesssearch.Searcher(chessposition.Position(fen), table).search, (None, None, depth))
+        assert searcher.search(max_depth=depth)[0] == move and info['depth'] == depth
+        
+        stats = table.stats()
+        assert stats['bytes'] == 64 + 16 * stats['size'] and stats['filled'] > 0
+        assert stats['shared_probes'] > 0 and stats['probes'] == 0
+        
+        shared_move, shared_info = chesssearch.Searcher(chessposition.Position(fen), table).search(max_depth=depth)
+        assert shared_move == move and shared_info['nodes'] < info['nodes'] / 10
+        assert table.stats()['hit_rate'] > 0.5
+        
+        class SharedAlphaBeta(chessbots.SampleAlphaBeta):
+            shared_table = table.path
+            table_size = 2 ** 14
+        
+        player = SharedAlphaBeta('white', chess.Board(fen), 0.1, None)
+        assert player.searcher.table is chesssearch.shared_table(table.path, 2 ** 14)
+        assert chess.Move.from_uci(player.make_move()) in chess.Board(fen).legal_moves
+    finally:
+        chesssearch.shared_table(table.path, 2 ** 14).close()
+        table.unlink()
+
+def test_adjudication(max_time_per_move=0.1, seed=0):
+    """
+    Adjudication resigns and draws on the scores of the players or of a referee engine
+    """
+    adjudicator = chessreferee.Adjudicator(resign_cp=300, resign_plies=3, draw_cp=10, draw_plies=2, draw_after=0)
+    board = chess.Board()
+    assert [adjudicator.update(board, cp) for cp in (400, None, 500, 0, 400, 400, 400)][-1] == 'Win white:adjudication'
+    assert [adjudicator.update(board, cp) for cp in (-5, None, 8)][-1] == 'Draw:adjudication'
+    assert adjudicator.info_score({'mate': 3}, False) == -chessreferee.MATE_CP
+    assert adjudicator.info_score({'cp': 25, 'depth': 4}, False) == -25 and adjudicator.info_score({}, True) is None
+    
+    for adjudication in ({'resign_cp': 500, 'resign_plies': 4},
+                         {'resign_cp': 500, 'resign_plies': 4, 'engine': 'stockfish', 'depth': 6}):
+        record = chessbattle.play_game(chessbots.SampleAlphaBeta, chessbots.SampleMrBean, seed=seed, executor='worker',
+                                       max_time_per_move_white=max_time_per_move, adjudication=adjudication)
+        assert record.result in ('Win white:adjudication', 'Win white:checkmate')
+    
+    record = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed, executor='worker',
+                                   adjudication={'draw_cp': 300, 'draw_plies': 4, 'draw_after': 5,
+                                                 'engine': 'stockfish', 'depth': 4})
+    assert record.result in ('Draw:adjudication', 'Win white:adjudication', 'Win black:adjudication')
+    assert chesslogs.split_result(record.result)[1] == 'adjudication'
+    
+    # A referee engine that dies after two searches: the game goes on unadjudicated
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'dying_engine')
+        with open(path, 'w') as f:
+            f.write(f'#!{sys.executable}\n'
+                    'import sys\n'
+                    'searches = 0\n'
+                    'for line in sys.stdin:\n'
+                    '    command = line.split()[:1]\n'
+                    "    if command == ['uci']:\n"
+                    "        print('uciok', flush=True)\n"
+                    "    elif command == ['isready']:\n"
+                    "        print('readyok', flush=True)\n"
+                    "    elif command == ['go']:\n"
+                    '        searches += 1\n'
+                    '        if searches > 2:\n'
+                    '            sys.exit()\n'
+                    "        print('info depth 1 score cp 0 pv e2e4', flush=True)\n"
+                    "        print('bestmove e2e4', flush=True)\n")
+        os.chmod(path, 0o755)
+        
+        record = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed, executor='worker',
+                                       adjudication={'draw_cp': 10, 'draw_plies': 3, 'draw_after': 0, 'engine': path})
+        assert chesslogs.split_result(record.result)[1] != 'adjudication'
+        assert chessengines.get_pool(path).stats()['discarded'] == 1
+
+def test_bitbases(n_positions=200, seed=0):
+    """
+    Endgame bitbases agree with a one-move lookahead of themselves, adjudicate at once
+    and help alpha-beta mate
+    """
+    bitbases = chessbitbase.load()
+    assert bitbases.probe(chess.Board('8/8/8/8/8/2k5/4P3/4K3 w - - 0 1')) == chesslogs.WHITE
+    assert bitbases.probe(chess.Board('8/8/8/8/8/2k5/4P3/4K3 b - - 0 1')) == chesslogs.DRAW
+    assert bitbases.probe(chess.Board('k7/8/1K6/P7/8/8/8/8 w - - 0 1')) == chesslogs.DRAW
+    assert bitbases.probe(chess.Board('8/8/8/8/8/8/4k3/4Q1K1 b - - 0 1')) == chesslogs.DRAW
+    assert bitbases.probe(chess.Board('r7/8/8/4k3/8/8/8/6K1 b - - 0 1')) == chesslogs.BLACK
+    assert bitbases.probe(chess.Board()) == chesslogs.UNKNOWN
+    
+    rng = np.random.default_rng(seed)
+    n_checked = 0
+    while n_checked < n_positions:
+        squares = rng.choice(64, 3, replace=False)
+        color = bool(rng.integers(2))
+        piece_type = (chess.PAWN, chess.ROOK, chess.QUEEN)[rng.integers(3)]
+        board = chess.Board(None)
+        board.set_piece_map({int(squares[0]): chess.Piece(chess.KING, color),
+                             int(squares[1]): chess.Piece(chess.KING, not color),
+                             int(squares[2]): chess.Piece(piece_type, color)})
+        board.turn = bool(rng.integers(2))
+        if not board.is_valid() or not any(board.legal_moves):
+            continue
+        n_checked += 1
+        
+        result = bitbases.probe(board)
+        assert bitbases.probe_position(chessposition.Position(board)) == result
+        children = []
+        for move in board.legal_moves:
+            board.push(move)
+            insufficient = chess.popcount(board.occupied) == 2 or move.promotion in (chess.KNIGHT, chess.BISHOP)
+            children.append(chesslogs.DRAW if insufficient else bitbases.probe(board))
+            board.pop()
+        winner = chesslogs.WHITE if color else chesslogs.BLACK
+        won = winner in children if board.turn == color else all(child == winner for child in children)
+        assert result == (winner if won else chesslogs.DRAW)
+    
+    record = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, board='8/8/8/3k4/8/8/8/4K2Q b - - 0 1',
+                                   executor='worker', adjudication={'bitbases': True})
+    assert record.result == 'Win white:bitbase' and len(record.plies) == 1
+    
+    class EndgameAlphaBeta(chessbots.SampleAlphaBeta):
+        use_bitbases = True
+    
+    record = chessbattle.play_game(EndgameAlphaBeta, chessbots.SampleMrBean, board='8/8/8/3k4/8/8/8/4K1Q1 w - - 0 1',
+                                   executor='worker', max_time_per_move_white=0.1)
+    assert record.result == 'Win white:checkmate' and len(record.plies) <= 40
+
+def test_batch_analysis(depth=6, seed=0):
+    """
+    Batch analysis yields every position of FENs and games in order, with MultiPV,
+    and analyses repeated positions once (also across analysers, through its file)
+    """
+    record = chessbattle.play_game(chessbots.SampleMrBean, chessbots.SampleMrBean, seed=seed, executor='worker')
+    fens = [chess.STARTING_FEN, '8/8/8/3k4/8/8/8/4K1Q1 w - - 0 1', chess.STARTING_FEN]
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, 'analysis.jsonl')
+        analyser = chessanalysis.Analyser(n_engines=2, cache_path=cache_path)
+        try:
+            results = list(analyser.analyse(fens + [record], depth=depth, multipv=2, window=3))
+        finally:
+            analyser.close()
+        
+        assert [(result['index'], result['ply']) for result in results] == \
+            [(0, None), (1, None), (2, None)] + [(3, ply) for ply in range(len(record.moves()) + 1)]
+        assert results[2]['cached'] and results[3]['cached'] and not results[0]['cached']
+        assert results[1]['bestmove'] in [move.uci() for move in chess.Board(fens[1]).legal_moves]
+        assert all(len(result['lines']) == 2 and result['lines'][0]['depth'] == depth for result in results[:3])
+        assert results[1]['lines'][0]['cp'] > 1000 and results[1]['lines'][0]['pv'][0] == results[1]['bestmove']
+        board = chess.Board()
+        for move in record.moves():
+            board.push_uci(move)
+        assert results[-1]['fen'] == board.fen()
+        assert analyser.stats()['analysed'] + analyser.stats()['cached'] == len(results)
+        
+        results = list(chessanalysis.analyse(fens, depth=depth, multipv=2, cache_path=cache_path))
+        assert all(result['cached'] for result in results)
+
+def test_distributed_tournament(games_per_pair=4):
+    """
+    Coordinator hands out game leases to worker agents over localhost, puts back the
+    leases of disconnected or silent workers, and rejects a wrong key
+    """
+    jobs = chesstournament.round_robin([chessbots.SampleMrBean, chessbots.SampleMrBean],
+                                       games_per_pair=games_per_pair)
+    coordinator = chesscluster.Coordinator(jobs, authkey='test', lease_timeout=1.)
+    try:
+        try:
+            Client(coordinator.address, authkey=b'wrong')
+            assert False
+        except multiprocessing.AuthenticationError:
+            pass
+        
+        for silent in (False, True):
+            conn = Client(coordinator.address, authkey=b'test')
+            conn.send(('hello', f'fake{silent}', {}))
+            assert conn.recv()[0] == 'ok'
+            conn.send(('lease', f'fake{silent}'))
+            kind, lease_id, index, job = conn.recv()
+            assert kind == 'job' and index == 0 # put back at the front
+            if silent:
+                time.sleep(2.)
+            else:
+                conn.close()
+                time.sleep(0.2)
+            assert coordinator.stats()['requeued'] == 1 + silent
+            assert coordinator.stats()['queued'] == len(jobs)
+        
+        workers = [multiprocessing.Process(target=chesscluster.run_worker, args=(coordinator.address, 'test'))
+                   for worker in range(2)]
+        for worker in workers:
+            worker.start()
+        results = list(coordinator.results_iter())
+        for worker in workers:
+            worker.join(10)
+            assert worker.exitcode == 0
+        
+        # The silent worker reports after all: its result comes too late to count
+        conn.send(('result', 'fakeTrue', lease_id, dict(results[0])))
+        assert conn.recv() == ('ok',)
+        conn.close()
+    finally:
+        coordinator.close()
+    
+    assert sorted(result['index'] for result in results) == list(range(games_per_pair))
+    assert all(result['game_result'].split(':')[0] in ('Win white', 'Win black', 'Draw') for result in results)
+    stats = coordinator.stats()
+    assert stats['finished'] == len(jobs) and stats['leased'] == 0
+    assert sum(worker['games'] for worker in stats['workers'].values()) == len(jobs)
+    
+    results = list(chesscluster.run_distributed(jobs, n_local_workers=2))
+    assert sorted(result['index'] for result in results) == list(range(games_per_pair))
+    print(f"{results[-1]['games_per_hour']:.0f} games/hour")
+
+def test_results_store_resume(games_per_pair=6):
+    """
+    Tournament interrupted after a few games resumes with exactly the missing ones;
+    the store's score table, timeout rates and plies match the results
+    """
+    jobs = chesstournament.round_robin([chessbots.SampleMrBean, chessbots.SampleMrBean],
+                                       games_per_pair=games_per_pair)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'results.db')
+        store = chessstore.ResultStore(path, batch_size=4)
+        first = []
+        for result in chesstournament.run_tournament(jobs, n_workers=2, store=store, tournament='t'):
+            first.append(result)
+            if len(first) == 2:
+                break
+        store.close()
+        
+        store = chessstore.ResultStore(path)
+        missing = store.missing(jobs, 't')
+        assert sorted(missing + [result['index'] for result in first]) == list(range(len(jobs)))
+        rest = list(chesstournament.run_tournament(jobs, n_workers=2, store=store, tournament='t'))
+        assert sorted(result['index'] for result in rest) == missing
+        assert store.missing(jobs, 't') == [] and store.missing(jobs, 'other') == list(range(len(jobs)))
+        
+        results = first + rest
+        reader = chessstore.ResultStore(path) # e.g. another process, while the run goes on
+        assert reader.score_table('t') == chesstournament.score_table(results)
+        assert [result['game_result'] for result in reader.results('t')] == \
+            [result['game_result'] for result in sorted(results, key=lambda result: result['index'])]
+        rates = reader.timeout_rates('t')
+        assert rates['SampleMrBean'][1] == 2 * len(jobs) and 0 <= rates['SampleMrBean'][2] <= 1
+        plies = reader.plies(results[-1]['index'], 't')
+        assert [(ply['move'], ply['t']) for ply in plies] == [(ply['move'], ply['t']) for ply in results[-1]['plies']]
+        reader.close()
+        
+        # A game lost to a harness error is played again
+        store.add(dict(results[0], game_result='Error:lease lost 3 times', init_fen=None, plies=[]), 't',
+                  jobs[results[0]['index']])
+        assert store.missing(jobs, 't') == [results[0]['index']]
+        replayed = list(chesstournament.run_tournament(jobs, n_workers=1, store=store, tournament='t'))
+        assert [result['game_result'] for result in replayed] == [results[0]['game_result']]
+        assert store.missing(jobs, 't') == [] and len(store.plies(results[0]['index'], 't')) > 0
+        
+        swapped = chesstournament.round_robin([chessbots.SampleMrBean, chessbots.SampleStockfish], games_per_pair=2)
+        try:
+            store.missing(swapped, 't')
+            assert False
+        except ValueError:
+            pass
+        store.close()
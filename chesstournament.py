@@ -0,0 +1,374 @@
+import os
+import time
+import asyncio
+import itertools
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import chessbattle
+
+def make_job(PlayerWhite, PlayerBlack, seed=0, **kwargs):
+    """
+    Build a single game job for run_tournament.
+
+    ----------
+    Parameters
+    ----------
+    PlayerWhite: Class
+      Player class corresponding to the white pieces.
+
+    PlayerBlack: Class
+      Player class corresponding to the black pieces.
+
+    seed: int (default: 0)
+      Random seed passed on to play_game.
+
+    **kwargs:
+      Any other keyword arguments of play_game (time controls, board, ...).
+    """
+    return {'white': PlayerWhite, 'black': PlayerBlack, 'seed': seed, 'kwargs': kwargs}
+
+def paired_jobs(PlayerA, PlayerB, openings, seed=0, **kwargs):
+    """
+    Two games per opening with colors swapped (A takes white in the first), both played
+    with the same seed, so that deterministic bots replay the same games.
+
+    ----------
+    Parameters
+    ----------
+    PlayerA, PlayerB: Class
+      Player classes.
+
+    openings: list of str or Board
+      Start positions, e.g. from chessopenings.sample_openings.
+
+    seed: int (default: 0)
+      Base random seed; the games of opening i are played with seed + i.
+
+    **kwargs:
+      Any other keyword arguments of play_game, shared by every game.
+    """
+    jobs = []
+    for i, opening in enumerate(openings):
+        jobs.append(make_job(PlayerA, PlayerB, seed=seed + i, board=opening, **kwargs))
+        jobs.append(make_job(PlayerB, PlayerA, seed=seed + i, board=opening, **kwargs))
+
+    return jobs
+
+def match_jobs(PlayerA, PlayerB, n_games=2, seed=0, openings=None, **kwargs):
+    """
+    Schedule a match: n_games games alternating colors, A taking white in the first
+    (the pairing schedule of round_robin and gauntlet).
+
+    ----------
+    Parameters
+    ----------
+    PlayerA, PlayerB: Class
+      Player classes.
+
+    n_games: int (default: 2)
+      Number of games.
+
+    seed: int (default: 0)
+      Base random seed; game i is played with seed + i.
+
+    openings: list of str or Board (default: None)
+      If given, the players play every opening twice with colors swapped instead (and
+      n_games is ignored), see paired_jobs.
+
+    **kwargs:
+      Any other keyword arguments of play_game, shared by every game.
+    """
+    if openings is not None:
+        return paired_jobs(PlayerA, PlayerB, openings, seed=seed, **kwargs)
+
+    jobs = []
+    for game in range(n_games):
+        if game % 2 == 0:
+            jobs.append(make_job(PlayerA, PlayerB, seed=seed + game, **kwargs))
+        else:
+            jobs.append(make_job(PlayerB, PlayerA, seed=seed + game, **kwargs))
+
+    return jobs
+
+def round_robin(players, games_per_pair=2, seed=0, openings=None, **kwargs):
+    """
+    Schedule a round-robin: every player meets every other player games_per_pair
+    times, alternating colors between consecutive games of the same pairing.
+
+    ----------
+    Parameters
+    ----------
+    players: list of Class
+      Player classes taking part in the tournament.
+
+    games_per_pair: int (default: 2)
+      Number of games played by each pair of players.
+
+    seed: int (default: 0)
+      Base random seed; game i is played with seed + i.
+
+    openings: list of str or Board (default: None)
+      If given, each pair plays every opening twice with colors swapped instead (and
+      games_per_pair is ignored), see paired_jobs.
+
+    **kwargs:
+      Any other keyword arguments of play_game, shared by every game.
+    """
+    jobs = []
+    for PlayerA, PlayerB in itertools.combinations(players, 2):
+        jobs.extend(match_jobs(PlayerA, PlayerB, games_per_pair, seed + len(jobs), openings, **kwargs))
+
+    return jobs
+
+def gauntlet(challenger, opponents, games_per_opponent=2, seed=0, openings=None, **kwargs):
+    """
+    Schedule a gauntlet: the challenger plays games_per_opponent games against each
+    opponent, alternating colors, while the opponents never meet each other.
+
+    ----------
+    Parameters
+    ----------
+    challenger: Class
+      Player class running the gauntlet.
+
+    opponents: list of Class
+      Player classes the challenger is tested against.
+
+    games_per_opponent: int (default: 2)
+      Number of games played against each opponent.
+
+    seed: int (default: 0)
+      Base random seed; game i is played with seed + i.
+
+    openings: list of str or Board (default: None)
+      If given, the challenger plays every opening twice with colors swapped against
+      each opponent instead (and games_per_opponent is ignored), see paired_jobs.
+
+    **kwargs:
+      Any other keyword arguments of play_game, shared by every game.
+    """
+    jobs = []
+    for opponent in opponents:
+        jobs.extend(match_jobs(challenger, opponent, games_per_opponent, seed + len(jobs), openings, **kwargs))
+
+    return jobs
+
+def cores_per_game(PlayerWhite, PlayerBlack):
+    """
+    Number of cores a single game keeps busy.
+
+    A Python bot thinks inside the worker process, while an engine bot thinks in its own
+    subprocess and the worker just waits on the pipe. Since the players move in turn, a
+    game needs as many cores as its hungriest player, given by the optional class attribute
+    `cores` (defaults to 1), unless a player ponders (class attribute `ponder`), in which
+    case both players can think at once.
+    """
+    cores = [getattr(PlayerWhite, 'cores', 1), getattr(PlayerBlack, 'cores', 1)]
+    if getattr(PlayerWhite, 'ponder', False) or getattr(PlayerBlack, 'ponder', False):
+        return sum(cores)
+
+    return max(cores)
+
+def default_workers(jobs, n_cores=None):
+    """
+    Number of worker processes that fills n_cores (default: all cores) without
+    oversubscribing them, given the most demanding game in jobs.
+    """
+    if n_cores is None:
+        n_cores = os.cpu_count() or 1
+
+    if len(jobs) == 0:
+        return 1
+
+    max_cores = max(cores_per_game(job['white'], job['black']) for job in jobs)
+
+    return max(1, n_cores // max_cores)
+
+def _job_result(index, job, record, start):
+    """
+    Result dict of a job (see run_tournament) whose game started at time start and
+    gave record, a GameRecord, or the exception raised if a player could not even be
+    set up.
+    """
+    if isinstance(record, Exception):
+        game_result, init_fen, plies = f'Error:{type(record).__name__}: {record}', None, []
+    else:
+        game_result, init_fen, plies = record.result, record.setup.get('init_fen'), record.plies
+
+    return {'index': index,
+            'white': job['white'].__name__,
+            'black': job['black'].__name__,
+            'seed': job['seed'],
+            'game_result': game_result,
+            'duration': time.time() - start,
+            'init_fen': init_fen,
+            'plies': plies}
+
+def play_job(index, job):
+    """
+    Play one job (in the current process; run_tournament calls it in its workers) and
+    summarize it as a result dict, see run_tournament.
+    """
+    start = time.time()
+    try:
+        record = chessbattle.play_game(job['white'], job['black'], seed=job['seed'], **job['kwargs'])
+    except Exception as e: # a player could not even be set up
+        record = e
+
+    return _job_result(index, job, record, start)
+
+def run_tournament(jobs, n_workers=None, n_cores=None, max_pending=None, store=None, tournament='default'):
+    """
+    Play a list of jobs over a pool of worker processes. Results are yielded as soon as
+    each game finishes, so this is a generator, e.g.
+
+      for result in run_tournament(round_robin([A, B, C])):
+          print(result['white'], result['black'], result['game_result'])
+
+    ----------
+    Parameters
+    ----------
+    jobs: list of dict
+      Games to play, as built by make_job, round_robin or gauntlet.
+
+    n_workers: int (default: None)
+      Number of worker processes. If None, use default_workers(jobs, n_cores).
+
+    n_cores: int (default: None)
+      Cores available to the tournament, used only if n_workers is None.
+
+    max_pending: int (default: None)
+      Max. number of games submitted to the pool at once (default: 2 * n_workers), which
+      keeps memory flat for very long schedules.
+
+    store: chessstore.ResultStore (default: None)
+      If given, every result is saved to it, and only the jobs it has no game of yet
+      (or only an errored one, see ResultStore.missing) are played, so an interrupted
+      tournament resumes where it stopped.
+
+    tournament: str (default: 'default')
+      Name of the tournament in store.
+
+    ------
+    Yields
+    ------
+    result: dict
+      Keys 'index', 'white', 'black', 'seed', 'game_result', 'duration' (sec of wall time
+      for the game), 'init_fen', 'plies' (see chessrecords.GameRecord), 'completed'
+      (games finished so far in this run) and 'games_per_hour' (running throughput of
+      this run).
+    """
+    if n_workers is None:
+        n_workers = default_workers(jobs, n_cores=n_cores)
+    if max_pending is None:
+        max_pending = 2 * n_workers
+
+    start = time.time()
+    completed = 0
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        if store is None:
+            queue = iter(enumerate(jobs))
+        else:
+            queue = ((index, jobs[index]) for index in store.missing(jobs, tournament))
+        pending = set()
+
+        try:
+            while True:
+                for index, job in itertools.islice(queue, max_pending - len(pending)):
+                    pending.add(executor.submit(play_job, index, job))
+
+                if len(pending) == 0:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    completed += 1
+
+                    result['completed'] = completed
+                    result['games_per_hour'] = 3600 * completed / (time.time() - start)
+                    if store is not None:
+                        store.add(result, tournament, jobs[result['index']])
+
+                    yield result
+        finally:
+            # If the caller stops early, drop the games that have not started yet
+            for future in pending:
+                future.cancel()
+            if store is not None:
+                store.flush()
+
+async def play_job_async(index, job):
+    """
+    play_job with chessbattle.play_game_async (an 'executor' keyword in the job is
+    ignored).
+    """
+    start = time.time()
+    kwargs = {key: value for key, value in job['kwargs'].items() if key != 'executor'}
+    try:
+        record = await chessbattle.play_game_async(job['white'], job['black'], seed=job['seed'], **kwargs)
+    except Exception as e: # a player could not even be set up
+        record = e
+
+    return _job_result(index, job, record, start)
+
+def run_async_games(jobs, max_concurrent=100):
+    """
+    Play a list of jobs concurrently on one asyncio event loop in this process (see
+    chessbattle.play_game_async), with at most max_concurrent games in flight. Suited
+    to players that wait on I/O, e.g. chessbots.AsyncStockfish, where one process can
+    referee hundreds of engine games; CPU-bound Python players gain nothing over
+    run_tournament.
+
+    -------
+    Returns
+    -------
+    results: list of dict
+      One dict per game in order of completion, with the keys of run_tournament.
+    """
+    async def run():
+        start = time.time()
+        semaphore = asyncio.Semaphore(max_concurrent)
+        results = []
+
+        async def play(index, job):
+            async with semaphore:
+                result = await play_job_async(index, job)
+            result['completed'] = len(results) + 1
+            result['games_per_hour'] = 3600 * result['completed'] / (time.time() - start)
+            results.append(result)
+
+        await asyncio.gather(*(play(index, job) for index, job in enumerate(jobs)))
+
+        return results
+
+    return asyncio.run(run())
+
+def score_table(results):
+    """
+    Tally finished games into a score table {name: [wins, draws, losses, points]}.
+    Games that ended with a harness error are left out.
+    """
+    table = {}
+    for result in results:
+        outcome = result['game_result']
+        if not (outcome.startswith('Win') or outcome.startswith('Draw')):
+            continue
+
+        for name in (result['white'], result['black']):
+            table.setdefault(name, [0, 0, 0, 0.])
+
+        if outcome.startswith('Draw'):
+            for name in (result['white'], result['black']):
+                table[name][1] += 1
+                table[name][3] += 0.5
+        else:
+            winner_side = outcome[len('Win '):].split(':')[0]
+            winner = result[winner_side]
+            loser = result['black'] if winner_side == 'white' else result['white']
+            table[winner][0] += 1
+            table[winner][3] += 1
+            table[loser][2] += 1
+
+    return table
@@ -0,0 +1,147 @@
+import json
+import math
+
+class Tracer:
+    """
+    Receiver of play_game's per-ply timings. play_game(tracer=...) calls span once per
+    phase of every ply; this base class ignores them, subclasses record them.
+
+    Phases are 'move' (the whole harness call for a move, as seen by play_game),
+    'receive' and 'think' (the player's own time inside that call), 'draw', 'talk'
+    (harness calls for draw offers/responses and trash talk), 'referee' (legality and
+    game-over checks), 'adjudicate' (scoring the position, with adjudication) and
+    'finish' (writing the record at the end of the game, ply None). Times are
+    time.perf_counter_ns() values.
+    """
+    def span(self, name, side, ply, start_ns, end_ns):
+        """
+        Phase name of ply ply, by side ('white', 'black' or None), from start_ns to
+        end_ns.
+        """
+        pass
+
+class Tee(Tracer):
+    """
+    Passes every span on to several tracers.
+    """
+    def __init__(self, *tracers):
+        self.tracers = tracers
+
+    def span(self, name, side, ply, start_ns, end_ns):
+        for tracer in self.tracers:
+            tracer.span(name, side, ply, start_ns, end_ns)
+
+class ChromeTrace(Tracer):
+    """
+    Collects spans as Chrome trace events (complete 'X' events, one thread per side),
+    to be viewed in chrome://tracing or Perfetto.
+    """
+    def __init__(self, pid=0):
+        """
+        pid: int (default: 0)
+          Process id the events are filed under, e.g. one per game when several
+          games go into the same trace.
+        """
+        self.pid = pid
+        self.events = []
+
+    def span(self, name, side, ply, start_ns, end_ns):
+        self.events.append({'name': name,
+                            'cat': 'chessbattle',
+                            'ph': 'X',
+                            'ts': start_ns / 1e3,
+                            'dur': (end_ns - start_ns) / 1e3,
+                            'pid': self.pid,
+                            'tid': side or 'game',
+                            'args': {'ply': ply}})
+
+    def to_json(self):
+        """
+        The trace as a JSON-serializable dict.
+        """
+        return {'traceEvents': self.events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path):
+        """
+        Write the trace to a .json file.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f)
+
+class Histogram(Tracer):
+    """
+    Aggregates span durations per phase into power-of-two histograms (bin i holds
+    durations in [2^(i-1), 2^i) ns), so memory stays constant however many plies are
+    played.
+    """
+    def __init__(self, n_bins=40):
+        """
+        n_bins: int (default: 40)
+          Number of bins; the last one also takes everything longer (2^39 ns is about
+          9 minutes).
+        """
+        self.n_bins = n_bins
+        self.phases = {}
+
+    def span(self, name, side, ply, start_ns, end_ns):
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = {'count': 0, 'total_ns': 0, 'max_ns': 0, 'bins': [0] * self.n_bins}
+
+        ns = end_ns - start_ns
+        stats['count'] += 1
+        stats['total_ns'] += ns
+        stats['max_ns'] = max(stats['max_ns'], ns)
+        stats['bins'][min(max(ns, 0).bit_length(), self.n_bins - 1)] += 1
+
+    def merge(self, other):
+        """
+        Add the counts of another Histogram (e.g. from another game or process).
+        """
+        for name, other_stats in other.phases.items():
+            stats = self.phases.setdefault(name, {'count': 0, 'total_ns': 0, 'max_ns': 0, 'bins': [0] * self.n_bins})
+            stats['count'] += other_stats['count']
+            stats['total_ns'] += other_stats['total_ns']
+            stats['max_ns'] = max(stats['max_ns'], other_stats['max_ns'])
+            for i, count in enumerate(other_stats['bins']):
+                stats['bins'][i] += count
+
+    def percentile(self, name, q):
+        """
+        Upper bound in ns of the q-th percentile (0-100) of phase name's durations.
+        """
+        stats = self.phases[name]
+        rank = math.ceil(q / 100 * stats['count'])
+        seen = 0
+        for i, count in enumerate(stats['bins']):
+            seen += count
+            if seen >= rank and seen > 0:
+                return min(2 ** i, stats['max_ns'])
+
+        return stats['max_ns']
+
+    def summary(self):
+        """
+        Per phase: 'count', 'total_ms', 'mean_us', 'p50_us', 'p99_us' and 'max_us'.
+        """
+        table = {}
+        for name, stats in self.phases.items():
+            table[name] = {'count': stats['count'],
+                           'total_ms': stats['total_ns'] / 1e6,
+                           'mean_us': stats['total_ns'] / max(1, stats['count']) / 1e3,
+                           'p50_us': self.percentile(name, 50) / 1e3,
+                           'p99_us': self.percentile(name, 99) / 1e3,
+                           'max_us': stats['max_ns'] / 1e3}
+
+        return table
+
+    def format(self):
+        """
+        summary() as a text table, phases sorted by total time.
+        """
+        lines = [f"{'phase':>8} {'count':>7} {'total ms':>10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9}"]
+        for name, row in sorted(self.summary().items(), key=lambda item: -item[1]['total_ms']):
+            lines.append(f"{name:>8} {row['count']:>7} {row['total_ms']:>10.1f} {row['mean_us']:>9.1f} "
+                         f"{row['p50_us']:>9.1f} {row['p99_us']:>9.1f} {row['max_us']:>9.1f}")
+
+        return '\n'.join(lines)